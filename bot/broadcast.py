@@ -0,0 +1,170 @@
+import asyncio
+import logging
+
+from aiogram import Bot
+from aiogram.exceptions import TelegramAPIError, TelegramForbiddenError, TelegramRetryAfter
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from set_main.cache import settings_cache
+from set_main.models import Broadcast, User
+from bot.db import db_read, db_write
+from bot.outbox import outbox
+
+
+def _create(text, from_chat_id, message_id):
+    return Broadcast.objects.create(text=text, from_chat_id=from_chat_id, message_id=message_id).id
+
+
+def _running_ids():
+    return list(Broadcast.objects.filter(status='running').values_list('id', flat=True))
+
+
+def _get(broadcast_id):
+    return Broadcast.objects.get(id=broadcast_id)
+
+
+def _next_chunk(last_pk, size):
+    # Keyset pagination: jadval to'liq yuklanmaydi, har safar pk bo'yicha keyingi bo'lak o'qiladi
+    return list(
+        User.objects.filter(pk__gt=last_pk, is_blocked=False)
+        .order_by('pk')
+        .values_list('pk', 'user_id')[:size]
+    )
+
+
+def _checkpoint(broadcast_id, last_pk, sent, failed, blocked_pks):
+    with transaction.atomic():
+        if blocked_pks:
+            User.objects.filter(pk__in=blocked_pks).update(is_blocked=True)
+        Broadcast.objects.filter(id=broadcast_id).update(
+            last_user_pk=last_pk,
+            sent=F('sent') + sent,
+            failed=F('failed') + failed,
+            blocked=F('blocked') + len(blocked_pks),
+        )
+
+
+def _finish(broadcast_id):
+    Broadcast.objects.filter(id=broadcast_id).update(status='done', finished_at=timezone.now())
+    return Broadcast.objects.get(id=broadcast_id)
+
+
+class BroadcastEngine:
+    """Barcha foydalanuvchilarga xabar tarqatish.
+
+    Foydalanuvchilar ``chunk_size`` bo'laklarda o'qiladi va ``workers`` ta
+    parallel yuboriladi; tezlik outbox bilan umumiy global limit bilan
+    cheklanadi. Har ``checkpoint_size`` ta foydalanuvchidan keyin checkpoint
+    yoziladi, shuning uchun qayta ishga tushganda tarqatish to'xtagan joyidan
+    davom etadi va to'xtash paytida yuborilayotgan guruhdagilargina (ko'pi
+    bilan ``checkpoint_size`` ta) xabarni qayta olishi mumkin.
+    """
+
+    def __init__(self, chunk_size: int, workers: int, checkpoint_size: int):
+        self.chunk_size = chunk_size
+        self.workers = workers
+        self.checkpoint_size = checkpoint_size
+        self._tasks: dict[int, asyncio.Task] = {}
+
+    async def start(self, bot: Bot, text: str, from_chat_id: int, message_id: int, notify_chat_id: int):
+        broadcast_id = await db_write(_create, text, from_chat_id, message_id)
+        self._launch(bot, broadcast_id, notify_chat_id)
+        return broadcast_id
+
+    async def resume(self, bot: Bot):
+        """Tugallanmagan tarqatishlarni checkpoint'dan davom ettiradi"""
+        admin_id = await settings_cache.get_admin_id()
+        for broadcast_id in await db_read(_running_ids):
+            logging.info("Xabar tarqatish #%s davom ettirilmoqda", broadcast_id)
+            self._launch(bot, broadcast_id, admin_id)
+
+    async def stop(self):
+        for task in self._tasks.values():
+            task.cancel()
+        await asyncio.gather(*self._tasks.values(), return_exceptions=True)
+
+    def _launch(self, bot, broadcast_id, notify_chat_id):
+        if broadcast_id in self._tasks:
+            return
+        task = asyncio.create_task(self._run(bot, broadcast_id, notify_chat_id))
+        self._tasks[broadcast_id] = task
+        task.add_done_callback(lambda _: self._tasks.pop(broadcast_id, None))
+
+    async def _send(self, bot, broadcast, chat_id):
+        """'sent', 'blocked' yoki 'failed' qaytaradi"""
+        while True:
+            await outbox.acquire()
+            try:
+                await bot.copy_message(chat_id, broadcast.from_chat_id, broadcast.message_id)
+                return 'sent'
+            except TelegramRetryAfter as e:
+                await outbox.pause(e.retry_after)
+            except TelegramForbiddenError:
+                return 'blocked'
+            except TelegramAPIError as e:
+                logging.warning("Xabar tarqatish: %s ga yuborilmadi: %s", chat_id, e)
+                return 'failed'
+
+    async def _send_batch(self, bot, broadcast, batch):
+        """Guruhni parallel yuboradi va natijasini checkpoint bilan yozadi"""
+        queue = asyncio.Queue()
+        for item in batch:
+            queue.put_nowait(item)
+        sent = failed = 0
+        blocked_pks = []
+
+        async def worker():
+            nonlocal sent, failed
+            while not queue.empty():
+                pk, chat_id = queue.get_nowait()
+                result = await self._send(bot, broadcast, chat_id)
+                if result == 'sent':
+                    sent += 1
+                elif result == 'blocked':
+                    blocked_pks.append(pk)
+                else:
+                    failed += 1
+
+        await asyncio.gather(*(worker() for _ in range(min(self.workers, len(batch)))))
+        await db_write(_checkpoint, broadcast.id, batch[-1][0], sent, failed, blocked_pks)
+
+    async def _run(self, bot, broadcast_id, notify_chat_id):
+        try:
+            broadcast = await db_read(_get, broadcast_id)
+            last_pk = broadcast.last_user_pk
+            while True:
+                chunk = await db_read(_next_chunk, last_pk, self.chunk_size)
+                if not chunk:
+                    break
+                for start in range(0, len(chunk), self.checkpoint_size):
+                    batch = chunk[start:start + self.checkpoint_size]
+                    await self._send_batch(bot, broadcast, batch)
+                    last_pk = batch[-1][0]
+
+            broadcast = await db_write(_finish, broadcast_id)
+            logging.info(
+                "Xabar tarqatish #%s tugadi: %s yuborildi, %s bloklagan, %s xatolik",
+                broadcast_id, broadcast.sent, broadcast.blocked, broadcast.failed,
+            )
+            if notify_chat_id:
+                await outbox.send_message(
+                    notify_chat_id,
+                    f"📢 Xabar tarqatish #{broadcast_id} tugadi!\n\n"
+                    f"Yuborildi: {broadcast.sent}\n"
+                    f"Bloklagan: {broadcast.blocked}\n"
+                    f"Xatolik: {broadcast.failed}",
+                )
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logging.error("Xabar tarqatish #%s xatoligi: %s", broadcast_id, e)
+
+
+broadcasts = BroadcastEngine(
+    chunk_size=settings.BOT_BROADCAST_CHUNK_SIZE,
+    workers=settings.BOT_BROADCAST_WORKERS,
+    checkpoint_size=settings.BOT_BROADCAST_CHECKPOINT_SIZE,
+)
@@ -0,0 +1,48 @@
+import asyncio
+import logging
+
+from django.conf import settings
+
+from set_main.cache import catalog_version, settings_cache
+from set_main.shared import shared_state
+
+
+class CacheSync:
+    """Boshqa jarayonlardagi o'zgarishlarni kuzatib, mahalliy keshlarni bekor qiladi.
+
+    Admin panel yoki boshqa worker sozlamalar/katalogni o'zgartirganda umumiy
+    holatdagi versiya oshadi; bu yerda u har ``interval`` soniyada tekshiriladi.
+    """
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self._versions: dict[str, int] | None = None
+        self._task: asyncio.Task | None = None
+
+    def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+
+    async def _run(self):
+        while True:
+            try:
+                self.apply(await asyncio.to_thread(shared_state.versions))
+            except Exception as e:
+                logging.error("Umumiy holatni o'qishda xatolik: %s", e)
+            await asyncio.sleep(self.interval)
+
+    def apply(self, versions: dict[str, int]):
+        previous, self._versions = self._versions, versions
+        if previous is None:
+            return
+        if versions.get('settings') != previous.get('settings'):
+            settings_cache.invalidate()
+        if versions.get('catalog') != previous.get('catalog'):
+            catalog_version.bump()
+
+
+cache_sync = CacheSync(settings.BOT_SHARED_STATE_INTERVAL)
@@ -0,0 +1,108 @@
+import asyncio
+import hashlib
+import logging
+
+from aiogram import Bot
+from aiogram.types import BotCommand, BotCommandScopeChat
+
+from set_main.models import ChatCommandScope
+from bot.db import db_read, db_write
+
+USER_COMMANDS = [
+    BotCommand(command="start", description="Buyurtma berishni boshlash"),
+    BotCommand(command="help", description="Yordam"),
+    BotCommand(command="cancel", description="Jarayonni bekor qilish"),
+]
+
+ADMIN_COMMANDS = USER_COMMANDS + [
+    BotCommand(command="admin", description="Admin panel (faqat admin uchun)"),
+    BotCommand(command="stats", description="Statistika (faqat admin uchun)"),
+    BotCommand(command="users", description="Foydalanuvchilar soni (faqat admin uchun)"),
+    BotCommand(command="find", description="Buyurtmalarni qidirish (faqat admin uchun)"),
+]
+
+
+def commands_hash(commands) -> str:
+    return hashlib.sha256(
+        "\n".join(f"{c.command}:{c.description}" for c in commands).encode()
+    ).hexdigest()
+
+
+ADMIN_COMMANDS_HASH = commands_hash(ADMIN_COMMANDS)
+
+
+def _load_scopes():
+    return dict(ChatCommandScope.objects.values_list('chat_id', 'commands_hash'))
+
+
+def _save_scope(chat_id, digest):
+    if digest is None:
+        ChatCommandScope.objects.filter(chat_id=chat_id).delete()
+    else:
+        ChatCommandScope.objects.update_or_create(chat_id=chat_id, defaults={'commands_hash': digest})
+
+
+class CommandScopeManager:
+    """Chat uchun alohida buyruqlar ro'yxatini faqat kerak bo'lganda o'rnatadi.
+
+    Oddiy foydalanuvchilar global buyruqlardan foydalanadi, alohida ro'yxat
+    faqat admin chatiga o'rnatiladi. Qaysi chatga qaysi ro'yxat o'rnatilgani
+    xotirada va ChatCommandScope jadvalida saqlanadi.
+    """
+
+    def __init__(self):
+        self._scopes = None
+        self._pending = set()
+        self._tasks = set()
+
+    async def _get_scopes(self):
+        if self._scopes is None:
+            self._scopes = await db_read(_load_scopes)
+        return self._scopes
+
+    async def sync(self, bot: Bot, chat_id: int, is_admin: bool):
+        scopes = await self._get_scopes()
+        digest = ADMIN_COMMANDS_HASH if is_admin else None
+        if scopes.get(chat_id) == digest:
+            return
+        if is_admin:
+            await bot.set_my_commands(ADMIN_COMMANDS, scope=BotCommandScopeChat(chat_id=chat_id))
+            scopes[chat_id] = digest
+        else:
+            await bot.delete_my_commands(scope=BotCommandScopeChat(chat_id=chat_id))
+            scopes.pop(chat_id, None)
+        await db_write(_save_scope, chat_id, digest)
+
+    async def sync_admin(self, bot: Bot, admin_id):
+        """Admin o'zgargan bo'lsa, eski admin chatlaridan ro'yxatni olib tashlaydi"""
+        scopes = await self._get_scopes()
+        for chat_id in list(scopes):
+            if chat_id != admin_id:
+                await self.sync(bot, chat_id, is_admin=False)
+        if admin_id:
+            await self.sync(bot, admin_id, is_admin=True)
+
+    def schedule(self, bot: Bot, chat_id: int, is_admin: bool):
+        """Chat buyruqlarini fonda yangilaydi (javobni kutdirmaydi)"""
+        scopes = self._scopes
+        if scopes is not None:
+            digest = ADMIN_COMMANDS_HASH if is_admin else None
+            if scopes.get(chat_id) == digest:
+                return
+        if chat_id in self._pending:
+            return
+        self._pending.add(chat_id)
+        task = asyncio.create_task(self._run(bot, chat_id, is_admin))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, bot: Bot, chat_id: int, is_admin: bool):
+        try:
+            await self.sync(bot, chat_id, is_admin)
+        except Exception as e:
+            logging.error("Chat %s buyruqlarini o'rnatishda xatolik: %s", chat_id, e)
+        finally:
+            self._pending.discard(chat_id)
+
+
+command_scopes = CommandScopeManager()
@@ -0,0 +1,108 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+
+_reader = threading.local()
+
+
+def _init_reader():
+    _reader.read_only = True
+
+
+def _set_query_only(sender, connection, **kwargs):
+    if getattr(_reader, 'read_only', False) and connection.vendor == 'sqlite':
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA query_only=ON')
+
+
+connection_created.connect(_set_query_only)
+
+# O'qishlar bir nechta faqat-o'qish ulanishlarida parallel bajariladi,
+# yozuvlar esa bitta yozuvchi oqimda ketma-ket bajariladi
+_read_executor = ThreadPoolExecutor(
+    max_workers=settings.BOT_DB_READ_THREADS, thread_name_prefix='bot-db-read', initializer=_init_reader
+)
+_write_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='bot-db-write')
+
+
+class _Gate:
+    """Baza tiklanayotganda yangi murojaatlarni kutdirib turadi"""
+
+    def __init__(self):
+        self.paused = False
+        self._active = 0
+        self._resumed: asyncio.Event | None = None
+        self._idle: asyncio.Event | None = None
+
+    async def __aenter__(self):
+        while self.paused:
+            await self._resumed.wait()
+        self._active += 1
+
+    async def __aexit__(self, *exc):
+        self._active -= 1
+        if not self._active and self._idle is not None:
+            self._idle.set()
+
+    async def pause(self):
+        self.paused = True
+        self._resumed = asyncio.Event()
+        self._idle = asyncio.Event()
+        if self._active:
+            await self._idle.wait()
+        self._idle = None
+
+    def resume(self):
+        self.paused = False
+        if self._resumed is not None:
+            self._resumed.set()
+
+
+_gate = _Gate()
+
+
+def _close_connections(barrier):
+    # Barrier har bir vazifa alohida oqimda bajarilishini kafolatlaydi
+    barrier.wait(timeout=30)
+    connections.close_all()
+
+
+async def _close_pool_connections(executor, workers):
+    barrier = threading.Barrier(workers)
+    loop = asyncio.get_running_loop()
+    await asyncio.gather(*(loop.run_in_executor(executor, _close_connections, barrier) for _ in range(workers)))
+
+
+async def pause():
+    """Yangi murojaatlarni to'xtatadi, bajarilayotganlarini kutadi va barcha ulanishlarni yopadi"""
+    await _gate.pause()
+    await close_connections()
+
+
+async def close_connections():
+    """Oqimlar pullari va umumiy oqimdagi barcha baza ulanishlarini yopadi"""
+    await _close_pool_connections(_read_executor, settings.BOT_DB_READ_THREADS)
+    await _close_pool_connections(_write_executor, 1)
+    # sync_to_async(thread_sensitive=True) ishlatadigan umumiy oqim ulanishi
+    await sync_to_async(connections.close_all)()
+
+
+def resume():
+    _gate.resume()
+
+
+async def db_read(func, *args, **kwargs):
+    """ORM o'qish funksiyasini o'quvchi oqimlar pulida bajaradi"""
+    async with _gate:
+        return await sync_to_async(func, thread_sensitive=False, executor=_read_executor)(*args, **kwargs)
+
+
+async def db_write(func, *args, **kwargs):
+    """ORM yozish funksiyasini yagona yozuvchi oqimda bajaradi"""
+    async with _gate:
+        return await sync_to_async(func, thread_sensitive=False, executor=_write_executor)(*args, **kwargs)
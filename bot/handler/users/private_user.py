@@ -1,14 +1,18 @@
 import asyncio
+import html
 import logging
 import re
+import uuid
 from datetime import datetime
 from aiogram import Router, F
-from aiogram.types import Message, CallbackQuery, BotCommand
-from aiogram.filters import Command
+from aiogram.types import Message, CallbackQuery
+from aiogram.filters import Command, CommandObject
 from aiogram.fsm.context import FSMContext
-from asgiref.sync import sync_to_async
 
-from set_main.models import User, Order, Car, Route, BotSettings
+from set_main.cache import settings_cache
+from bot import queries
+from bot.broadcast import broadcasts
+from bot.commands import command_scopes
 from bot.states.user_state import Form, AdminStates
 from bot.keyboards.inline import (
     get_direction_kb, get_trip_type_kb, get_car_kb, 
@@ -19,6 +23,26 @@ from bot.keyboards.reply import get_main_menu, get_cancel_kb
 
 router = Router()
 
+# Telegram bitta xabarda 4096 belgidan ortig'ini qabul qilmaydi
+MESSAGE_LIMIT = 4096
+# /find natijasidagi manzil qisqartiriladi: bitta buyurtma doim bitta xabarga sig'adi
+FIND_ADDRESS_LIMIT = 200
+
+
+def shorten(text, limit):
+    return text if len(text) <= limit else text[:limit - 1] + '…'
+
+
+def split_message(header, blocks, limit=MESSAGE_LIMIT):
+    """Bloklarni (bo'lib yubormasdan) ``limit`` dan oshmaydigan xabarlarga joylaydi"""
+    chunks = [header]
+    for block in blocks:
+        if len(chunks[-1]) + 2 + len(block) > limit:
+            chunks.append(block)
+        else:
+            chunks[-1] += "\n\n" + block
+    return chunks
+
 # --- VALIDATORS ---
 def is_valid_date(date_text):
     try:
@@ -33,47 +57,30 @@ def is_valid_phone(phone):
 # --- COMMANDS ---
 @router.message(Command("start"))
 async def start(message: Message, state: FSMContext):
-    logging.info(f"/start from user_id={message.from_user.id}")
+    logging.debug("/start from user_id=%s", message.from_user.id)
     await state.clear()
     
     # Add user to database
-    user, created = await sync_to_async(User.objects.get_or_create)(
-        user_id=message.from_user.id,
-        defaults={'full_name': message.from_user.full_name}
-    )
+    user, created = await queries.register_user(message.from_user.id, message.from_user.full_name)
     
     if created:
-        logging.info(f"User registered: {message.from_user.id} {message.from_user.full_name}")
+        logging.info("User registered: %s %s", message.from_user.id, message.from_user.full_name)
     
-    # Set commands based on user role
-    settings = await sync_to_async(BotSettings.objects.first)()
-    admin_id = settings.admin_id if settings else None
-    if message.from_user.id == admin_id:
-        commands = [
-            BotCommand(command="start", description="Buyurtma berishni boshlash"),
-            BotCommand(command="help", description="Yordam"),
-            BotCommand(command="cancel", description="Jarayonni bekor qilish"),
-            BotCommand(command="admin", description="Admin panel (faqat admin uchun)"),
-            BotCommand(command="stats", description="Statistika (faqat admin uchun)"),
-            BotCommand(command="users", description="Foydalanuvchilar soni (faqat admin uchun)")
-        ]
-    else:
-        commands = [
-            BotCommand(command="start", description="Buyurtma berishni boshlash"),
-            BotCommand(command="help", description="Yordam"),
-            BotCommand(command="cancel", description="Jarayonni bekor qilish")
-        ]
-    await message.bot.set_my_commands(commands, scope={"type": "chat", "chat_id": message.chat.id})
-
     await message.answer(
         "Assalomu alaykum!\n\nBuyurtma berish uchun yo'nalishni tanlang ",
         reply_markup=await get_direction_kb()
     )
+    # Buyurtmani takroriy tasdiqlashdan himoya qiluvchi forma kaliti
+    await state.update_data(form_id=uuid.uuid4().hex)
+
+    # Set commands based on user role (in background, only if changed)
+    admin_id = await settings_cache.get_admin_id()
+    command_scopes.schedule(message.bot, message.chat.id, message.from_user.id == admin_id)
     await state.set_state(Form.direction)
 
 @router.message(Command("help"))
 async def help_cmd(message: Message, state: FSMContext):
-    logging.info(f"/help from user_id={message.from_user.id}")
+    logging.debug("/help from user_id=%s", message.from_user.id)
     await message.answer(
         "Bot yordamchisi:\n\n"
         "/start — Buyurtma berishni boshlash\n"
@@ -84,37 +91,27 @@ async def help_cmd(message: Message, state: FSMContext):
 
 @router.message(Command("cancel"))
 async def cancel_cmd(message: Message, state: FSMContext):
-    logging.info(f"/cancel from user_id={message.from_user.id}")
+    logging.debug("/cancel from user_id=%s", message.from_user.id)
     await state.clear()
     await message.answer("Buyurtma bekor qilindi. /start orqali yangidan boshlang.")
 
 @router.message(Command("stats"))
 async def stats_cmd(message: Message):
-    logging.info(f"/stats from user_id={message.from_user.id}")
+    logging.debug("/stats from user_id=%s", message.from_user.id)
     
-    # Get admin ID from settings
-    try:
-        settings = await sync_to_async(BotSettings.objects.first)()
-        admin_id = settings.admin_id if settings else None
-    except:
-        admin_id = None
+    admin_id = await settings_cache.get_admin_id()
     
     if message.from_user.id == admin_id:
-        orders_count = await sync_to_async(Order.objects.count)()
+        orders_count = await queries.count_orders()
         await message.answer(f"Jami buyurtmalar: {orders_count}")
     else:
         await message.answer("Bu buyruq faqat admin uchun.")
 
 @router.message(Command("adminhelp"))
 async def admin_help(message: Message):
-    logging.info(f"/adminhelp from user_id={message.from_user.id}")
+    logging.debug("/adminhelp from user_id=%s", message.from_user.id)
     
-    # Get admin ID from settings
-    try:
-        settings = await sync_to_async(BotSettings.objects.first)()
-        admin_id = settings.admin_id if settings else None
-    except:
-        admin_id = None
+    admin_id = await settings_cache.get_admin_id()
     
     if message.from_user.id == admin_id:
         await message.answer(
@@ -122,40 +119,60 @@ async def admin_help(message: Message):
             "/admin — Admin panel\n"
             "/adminhelp — Admin uchun yordam\n"
             "/stats — Buyurtmalar statistikasi\n"
-            "/users — Foydalanuvchilar soni\n\n"
-            "Panelda: Mashina va marshrutlarni qo'shish/o'chirish/ko'rish."
+            "/users — Foydalanuvchilar soni\n"
+            "/find — Buyurtmalarni qidirish (ism, telefon, manzil, izoh)\n\n"
+            "Panelda: Mashina va marshrutlarni qo'shish/o'chirish/ko'rish, barcha foydalanuvchilarga xabar yuborish."
         )
     else:
         await message.answer("Bu buyruq faqat admin uchun.")
 
 @router.message(Command("users"))
 async def users_count(message: Message):
-    logging.info(f"/users from user_id={message.from_user.id}")
+    logging.debug("/users from user_id=%s", message.from_user.id)
     
-    # Get admin ID from settings
-    try:
-        settings = await sync_to_async(BotSettings.objects.first)()
-        admin_id = settings.admin_id if settings else None
-    except:
-        admin_id = None
+    admin_id = await settings_cache.get_admin_id()
     
     if message.from_user.id == admin_id:
-        count = await sync_to_async(User.objects.count)()
+        count = await queries.count_users()
         await message.answer(f"Jami foydalanuvchilar: {count}")
     else:
         await message.answer("Bu buyruq faqat admin uchun.")
 
+@router.message(Command("find"))
+async def find_orders(message: Message, command: CommandObject):
+    logging.debug("/find from user_id=%s", message.from_user.id)
+    
+    admin_id = await settings_cache.get_admin_id()
+    
+    if message.from_user.id != admin_id:
+        await message.answer("Bu buyruq faqat admin uchun.")
+        return
+    
+    query = (command.args or '').strip()
+    if not query:
+        await message.answer("Qidiruv matnini kiriting: /find <ism, telefon, manzil...>")
+        return
+    
+    orders = await queries.find_orders(query)
+    if not orders:
+        await message.answer("Hech narsa topilmadi (so'zlar kamida 3 ta belgidan iborat bo'lishi kerak).")
+        return
+    
+    lines = [
+        f"#{order.id} · {order.date} · {html.escape(order.direction)}\n"
+        f"👤 {html.escape(order.user.full_name)} · 📞 {html.escape(order.phone)}\n"
+        f"📍 {html.escape(shorten(order.address, FIND_ADDRESS_LIMIT))}"
+        for order in orders
+    ]
+    for text in split_message("🔎 Topilgan buyurtmalar:", lines):
+        await message.answer(text)
+
 # --- ADMIN PANEL ---
 @router.message(Command("admin"))
 async def admin_panel(message: Message, state: FSMContext):
-    logging.info(f"/admin from user_id={message.from_user.id}")
+    logging.debug("/admin from user_id=%s", message.from_user.id)
     
-    # Get admin ID from settings
-    try:
-        settings = await sync_to_async(BotSettings.objects.first)()
-        admin_id = settings.admin_id if settings else None
-    except:
-        admin_id = None
+    admin_id = await settings_cache.get_admin_id()
     
     if message.from_user.id != admin_id:
         await message.answer("Bu bo'lim faqat admin uchun.")
@@ -165,14 +182,9 @@ async def admin_panel(message: Message, state: FSMContext):
 
 @router.callback_query(F.data.startswith("admin_"))
 async def admin_actions(callback: CallbackQuery, state: FSMContext):
-    logging.info(f"Admin action: {callback.data} from user_id={callback.from_user.id}")
+    logging.info("Admin action: %s from user_id=%s", callback.data, callback.from_user.id)
     
-    # Get admin ID from settings
-    try:
-        settings = await sync_to_async(BotSettings.objects.first)()
-        admin_id = settings.admin_id if settings else None
-    except:
-        admin_id = None
+    admin_id = await settings_cache.get_admin_id()
     
     if callback.from_user.id != admin_id:
         await callback.answer("Faqat admin uchun!", show_alert=True)
@@ -188,36 +200,39 @@ async def admin_actions(callback: CallbackQuery, state: FSMContext):
         await safe_answer("Yangi mashina nomini kiriting:")
         await state.set_state(AdminStates.add_car)
     elif callback.data == "admin_del_car":
-        cars = await sync_to_async(list)(Car.objects.all())
+        cars = await queries.list_car_names()
         if not cars:
             await safe_answer("Mashinalar ro'yxati bo'sh.")
             return
-        text = "O'chirmoqchi bo'lgan mashina nomini kiriting (aniq nom):\n" + ", ".join([car.name for car in cars])
+        text = "O'chirmoqchi bo'lgan mashina nomini kiriting (aniq nom):\n" + ", ".join(cars)
         await safe_answer(text)
         await state.set_state(AdminStates.del_car)
     elif callback.data == "admin_list_car":
-        cars = await sync_to_async(list)(Car.objects.all())
+        cars = await queries.list_car_names()
         if not cars:
             await safe_answer("Mashinalar ro'yxati bo'sh.")
         else:
-            await safe_answer("Mashinalar ro'yxati:\n" + ", ".join([car.name for car in cars]))
+            await safe_answer("Mashinalar ro'yxati:\n" + ", ".join(cars))
     elif callback.data == "admin_add_route":
         await safe_answer("Yangi marshrut nomini kiriting:")
         await state.set_state(AdminStates.add_route)
     elif callback.data == "admin_del_route":
-        routes = await sync_to_async(list)(Route.objects.all())
+        routes = await queries.list_route_names()
         if not routes:
             await safe_answer("Marshrutlar ro'yxati bo'sh.")
             return
-        text = "O'chirmoqchi bo'lgan marshrut nomini kiriting (aniq nom):\n" + ", ".join([route.name for route in routes])
+        text = "O'chirmoqchi bo'lgan marshrut nomini kiriting (aniq nom):\n" + ", ".join(routes)
         await safe_answer(text)
         await state.set_state(AdminStates.del_route)
     elif callback.data == "admin_list_route":
-        routes = await sync_to_async(list)(Route.objects.all())
+        routes = await queries.list_route_names()
         if not routes:
             await safe_answer("Marshrutlar ro'yxati bo'sh.")
         else:
-            await safe_answer("Marshrutlar ro'yxati:\n" + ", ".join([route.name for route in routes]))
+            await safe_answer("Marshrutlar ro'yxati:\n" + ", ".join(routes))
+    elif callback.data == "admin_broadcast":
+        await safe_answer("Barcha foydalanuvchilarga yuboriladigan xabarni yuboring:")
+        await state.set_state(AdminStates.broadcast)
 
 @router.message(AdminStates.add_car)
 async def admin_add_car(message: Message, state: FSMContext):
@@ -226,8 +241,7 @@ async def admin_add_car(message: Message, state: FSMContext):
         await message.answer("Mashina nomi bo'sh bo'lishi mumkin emas.")
         return
     
-    car, created = await sync_to_async(Car.objects.get_or_create)(name=car_name)
-    if created:
+    if await queries.add_car(car_name):
         await message.answer(f"Mashina '{car_name}' qo'shildi!")
     else:
         await message.answer(f"Mashina '{car_name}' allaqachon mavjud.")
@@ -237,11 +251,9 @@ async def admin_add_car(message: Message, state: FSMContext):
 @router.message(AdminStates.del_car)
 async def admin_del_car(message: Message, state: FSMContext):
     car_name = message.text.strip()
-    try:
-        car = await sync_to_async(Car.objects.get)(name=car_name)
-        await sync_to_async(car.delete)()
+    if await queries.delete_car(car_name):
         await message.answer(f"Mashina '{car_name}' o'chirildi!")
-    except Car.DoesNotExist:
+    else:
         await message.answer(f"Mashina '{car_name}' topilmadi.")
     
     await state.clear()
@@ -253,8 +265,7 @@ async def admin_add_route(message: Message, state: FSMContext):
         await message.answer("Marshrut nomi bo'sh bo'lishi mumkin emas.")
         return
     
-    route, created = await sync_to_async(Route.objects.get_or_create)(name=route_name)
-    if created:
+    if await queries.add_route(route_name):
         await message.answer(f"Marshrut '{route_name}' qo'shildi!")
     else:
         await message.answer(f"Marshrut '{route_name}' allaqachon mavjud.")
@@ -264,15 +275,25 @@ async def admin_add_route(message: Message, state: FSMContext):
 @router.message(AdminStates.del_route)
 async def admin_del_route(message: Message, state: FSMContext):
     route_name = message.text.strip()
-    try:
-        route = await sync_to_async(Route.objects.get)(name=route_name)
-        await sync_to_async(route.delete)()
+    if await queries.delete_route(route_name):
         await message.answer(f"Marshrut '{route_name}' o'chirildi!")
-    except Route.DoesNotExist:
+    else:
         await message.answer(f"Marshrut '{route_name}' topilmadi.")
     
     await state.clear()
 
+@router.message(AdminStates.broadcast)
+async def admin_broadcast(message: Message, state: FSMContext):
+    broadcast_id = await broadcasts.start(
+        message.bot,
+        text=message.text or message.caption or '',
+        from_chat_id=message.chat.id,
+        message_id=message.message_id,
+        notify_chat_id=message.chat.id,
+    )
+    await message.answer(f"📢 Xabar tarqatish #{broadcast_id} boshlandi. Tugagach natija yuboriladi.")
+    await state.clear()
+
 # --- FORM HANDLERS ---
 @router.callback_query(Form.direction)
 async def choose_direction(callback: CallbackQuery, state: FSMContext):
@@ -324,9 +345,8 @@ async def choose_day(callback: CallbackQuery, state: FSMContext):
     data = await state.get_data()
     year = data.get('year')
     month = data.get('month')
-    await state.update_data(day=day)
     date_str = f"{year}-{month:02d}-{day:02d}"
-    await state.update_data(date=date_str)
+    await state.update_data(day=day, date=date_str)
     await callback.message.edit_text(
         f"✅ Tanlangan sana: <b>{date_str}</b>",
         parse_mode="HTML"
@@ -404,8 +424,7 @@ async def enter_address(message: Message, state: FSMContext):
 
 @router.callback_query(Form.comment, F.data == "no_comment")
 async def no_comment_callback(callback: CallbackQuery, state: FSMContext):
-    await state.update_data(comment="")
-    data = await state.get_data()
+    data = await state.update_data(comment="")
     trip_type_text = "Odam" if data['trip_type'] == 'person' else "Pochta"
     summary = f"""
 📋 Buyurtma ma'lumotlari:
@@ -427,9 +446,7 @@ Tasdiqlaysizmi?
 @router.message(Form.comment)
 async def enter_comment(message: Message, state: FSMContext):
     comment = message.text.strip()
-    await state.update_data(comment=comment)
-    
-    data = await state.get_data()
+    data = await state.update_data(comment=comment)
     
     # Format order summary
     trip_type_text = "Odam" if data['trip_type'] == 'person' else "Pochta"
@@ -461,33 +478,19 @@ async def confirm_order(callback: CallbackQuery, state: FSMContext):
     except Exception:
         pass
 
-    # Get user
-    user = await sync_to_async(User.objects.get)(user_id=callback.from_user.id)
-    
-    # Create order
-    order = await sync_to_async(Order.objects.create)(
-        user=user,
-        direction=data['direction'],
-        date=data['date'],
-        phone=data['phone'],
-        trip_type=data['trip_type'],
-        car=data['car'],
-        address=data['address'],
-        comment=data['comment'] if data['comment'] else ''
-    )
-    
-    # Send confirmation to user (without order number)
-    await callback.message.answer(
-        f"✅ Buyurtma tasdiqlandi!\n\nTez orada siz bilan bog'lanishadi."
-    )
-    
-    # Send notification to admin (with order number)
     try:
-        settings = await sync_to_async(BotSettings.objects.first)()
-        admin_id = settings.admin_id if settings else None
+        admin_id = await settings_cache.get_admin_id()
+    except Exception as e:
+        logging.error("Error reading admin id: %s", e)
+        admin_id = None
+    tg_username = getattr(callback.from_user, 'username', None)
+    trip_type_text = "Odam" if data['trip_type'] == 'person' else "Pochta"
+
+    def notifications(user, order):
+        # Send confirmation to user (without order number)
+        messages = [(callback.message.chat.id, "✅ Buyurtma tasdiqlandi!\n\nTez orada siz bilan bog'lanishadi.", '')]
+        # Notification to admin (with order number)
         if admin_id:
-            trip_type_text = "Odam" if data['trip_type'] == 'person' else "Pochta"
-            tg_username = getattr(callback.from_user, 'username', None)
             if tg_username:
                 user_link = f"<a href='https://t.me/{tg_username}'>{user.full_name}</a>"
             else:
@@ -506,10 +509,17 @@ async def confirm_order(callback: CallbackQuery, state: FSMContext):
 
 Buyurtma raqami: #{order.id}
 """
-            await callback.bot.send_message(admin_id, admin_message, parse_mode="HTML")
-    except Exception as e:
-        logging.error(f"Error sending admin notification: {e}")
-    
+            messages.append((admin_id, admin_message, "HTML"))
+        return messages
+
+    # Get user and create order
+    user, order, created = await queries.create_order(
+        callback.from_user.id, callback.from_user.full_name, data, notifications
+    )
+    if not created:
+        # Shu forma allaqachon tasdiqlangan (takroriy bosish yoki qayta yuborilgan update)
+        logging.info("Order #%s already confirmed for form %s", order.id, data.get('form_id'))
+
     await state.clear()
     await callback.answer()
 
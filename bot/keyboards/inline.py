@@ -1,20 +1,30 @@
 from aiogram.types import InlineKeyboardButton, InlineKeyboardMarkup
-from asgiref.sync import sync_to_async
+from django.conf import settings
+from bot.db import db_read
+from set_main.cache import catalog_version
 from set_main.models import Car, Route
 import datetime
+import time
 
-async def get_direction_kb():
-    routes = await sync_to_async(list)(Route.objects.all())
-    if not routes:
-        # Default routes if db is empty
-        default_routes = ["Xorazmdan Buxoroga", "Buxorodan Xorazmga"]
-        for route_name in default_routes:
-            await sync_to_async(Route.objects.get_or_create)(name=route_name)
-        routes = await sync_to_async(list)(Route.objects.all())
-    
-    buttons = [InlineKeyboardButton(text=route.name, callback_data=route.name) for route in routes]
+# key -> (catalog versiyasi, muddati, klaviatura)
+_catalog_kb_cache = {}
+
+async def _get_catalog_kb(key, build):
+    version = catalog_version.value
+    cached = _catalog_kb_cache.get(key)
+    if cached and cached[0] == version and cached[1] > time.monotonic():
+        return cached[2]
+    kb = await db_read(build)
+    _catalog_kb_cache[key] = (version, time.monotonic() + settings.BOT_CATALOG_CACHE_TTL, kb)
+    return kb
+
+def _build_direction_kb():
+    buttons = [InlineKeyboardButton(text=name, callback_data=name) for name in Route.objects.values_list('name', flat=True)]
     return InlineKeyboardMarkup(inline_keyboard=[[b] for b in buttons])
 
+async def get_direction_kb():
+    return await _get_catalog_kb('direction', _build_direction_kb)
+
 def get_trip_type_kb():
     return InlineKeyboardMarkup(
         inline_keyboard=[
@@ -23,24 +33,20 @@ def get_trip_type_kb():
         ]
     )
 
-async def get_car_kb():
-    cars = await sync_to_async(list)(Car.objects.all())
-    if not cars:
-        # Default cars if db is empty
-        default_cars = ["Kaptiva", "Malibu", "Cobalt", "Gentra", "Largus", "Lasetti"]
-        for car_name in default_cars:
-            await sync_to_async(Car.objects.get_or_create)(name=car_name)
-        cars = await sync_to_async(list)(Car.objects.all())
-    
+def _build_car_kb():
+    cars = list(Car.objects.values_list('name', flat=True))
     rows = []
     for i in range(0, len(cars), 2):
         row = []
         for j in range(2):
             if i + j < len(cars):
-                row.append(InlineKeyboardButton(text=cars[i + j].name, callback_data=cars[i + j].name))
+                row.append(InlineKeyboardButton(text=cars[i + j], callback_data=cars[i + j]))
         rows.append(row)
     return InlineKeyboardMarkup(inline_keyboard=rows)
 
+async def get_car_kb():
+    return await _get_catalog_kb('car', _build_car_kb)
+
 def get_confirm_kb():
     return InlineKeyboardMarkup(
         inline_keyboard=[
@@ -57,7 +63,8 @@ def get_admin_kb():
             [InlineKeyboardButton(text="🚗 Mashinalar ro'yxati", callback_data="admin_list_car")],
             [InlineKeyboardButton(text="➕ Marshrut qo'shish", callback_data="admin_add_route")],
             [InlineKeyboardButton(text="➖ Marshrut o'chirish", callback_data="admin_del_route")],
-            [InlineKeyboardButton(text="🛣 Marshrutlar ro'yxati", callback_data="admin_list_route")]
+            [InlineKeyboardButton(text="🛣 Marshrutlar ro'yxati", callback_data="admin_list_route")],
+            [InlineKeyboardButton(text="📢 Xabar yuborish", callback_data="admin_broadcast")]
         ]
     )
 
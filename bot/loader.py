@@ -1,84 +1,191 @@
+import functools
 import logging
 import os
 import django
 from aiogram import Bot, Dispatcher
 from aiogram.client.bot import DefaultBotProperties
 from asgiref.sync import sync_to_async
+from django.conf import settings as django_settings
 
+from set_main.cache import settings_cache
+from set_main.catalog import seed_default_catalog
 from set_main.models import BotSettings
+from set_main.shared import shared_state
+from bot.broadcast import broadcasts
+from bot.cache_sync import cache_sync
+from bot.commands import USER_COMMANDS, command_scopes
+from bot.db import db_read
 from bot.handler.users.private_user import router
+from bot.logs import setup_logging
+from bot.metrics import start_metrics_server
+from bot.middlewares.dedup import UpdateDedupMiddleware
+from bot.middlewares.fsm import FSMBufferMiddleware
+from bot.middlewares.metrics import ApiMetricsMiddleware, MetricsMiddleware
+from bot.middlewares.throttling import ThrottlingMiddleware
+from bot.middlewares.update_log import UpdateLogMiddleware
+from bot.outbox import outbox
+from bot.restore_guard import restore_guard
+from bot.storage import ChatLockIsolation, SQLiteStorage
+from bot.webhook import get_webhook_secret, run_webhook, run_worker_server
 
 # Setup Django
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'set_app.settings')
 django.setup()
 
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s [%(levelname)s] %(message)s',
-    handlers=[
-        logging.FileHandler("bot.log", encoding="utf-8"),
-        logging.StreamHandler()
-    ]
-)
+# Bot jarayonida sozlamalar ham boshqa o'qishlar kabi db_read orqali o'qiladi:
+# restore_db pauzasida eski faylga ulanish ochilmaydi
+settings_cache.loader = functools.partial(db_read, BotSettings.objects.first)
 
 async def get_bot_settings():
     try:
-        settings = await sync_to_async(BotSettings.objects.first)()
+        settings = await settings_cache.get()
         if not settings:
             raise ValueError("Bot sozlamalari topilmadi. Iltimos, admin panelida sozlamalarni kiriting.")
         return settings
     except Exception as e:
         raise ValueError(f"Bot sozlamalarini o'qishda xatolik: {e}")
 
-async def on_startup(bot: Bot):
+async def on_startup(bot: Bot, worker=None):
     logging.info("Bot ishga tushdi!")
+    restore_guard.start(worker.index if worker else None)
+    cache_sync.start()
+    if worker:
+        # Webhook, buyruqlar va standart katalog supervisor tomonidan o'rnatiladi
+        outbox.shared = shared_state
+        await outbox.start(bot, owns=worker.owns)
+        # Tarqatish admin chati tegishli workerda boshlanadi va davom ettiriladi
+        if worker.owns(await settings_cache.get_admin_id()):
+            await broadcasts.resume(bot)
+        return
+    await sync_to_async(seed_default_catalog)()
+    await outbox.start(bot)
+    await broadcasts.resume(bot)
     try:
         settings = await get_bot_settings()
         if settings.webhook_url:
-            await bot.set_webhook(settings.webhook_url)
-            logging.info(f"Webhook o'rnatildi: {settings.webhook_url}")
+            await bot.set_webhook(
+                settings.webhook_url,
+                secret_token=get_webhook_secret(settings),
+                max_connections=django_settings.BOT_WEBHOOK_MAX_CONCURRENCY,
+            )
+            logging.info("Webhook o'rnatildi: %s", settings.webhook_url)
+        else:
+            # Polling ishlashi uchun eski webhook olib tashlanadi
+            await bot.delete_webhook()
     except Exception as e:
-        logging.error(f"Webhook o'rnatishda xatolik: {e}")
+        logging.error("Webhook o'rnatishda xatolik: %s", e)
 
-async def on_shutdown(bot: Bot):
+async def on_shutdown(bot: Bot, worker=None):
     logging.info("Bot to'xtatildi!")
+    await broadcasts.stop()
+    await outbox.stop()
+    await cache_sync.stop()
+    await restore_guard.stop()
+    if worker:
+        return
     try:
         await bot.delete_webhook()
         logging.info("Webhook o'chirildi")
     except Exception as e:
-        logging.error(f"Webhook o'chirishda xatolik: {e}")
+        logging.error("Webhook o'chirishda xatolik: %s", e)
 
 async def set_bot_commands(bot: Bot):
-    commands = [
-        ("start", "Buyurtma berishni boshlash"),
-        ("help", "Yordam"),
-        ("cancel", "Jarayonni bekor qilish"),
-        ("admin", "Admin panel (faqat admin uchun)"),
-        ("stats", "Statistika (faqat admin uchun)"),
-        ("users", "Foydalanuvchilar soni (faqat admin uchun)")
-    ]
-    
-    from aiogram.types import BotCommand
-    bot_commands = [BotCommand(command=cmd[0], description=cmd[1]) for cmd in commands]
-    await bot.set_my_commands(bot_commands)
+    # Global ro'yxat oddiy foydalanuvchilar uchun, admin chatiga alohida ro'yxat o'rnatiladi
+    await bot.set_my_commands(USER_COMMANDS)
+    try:
+        await command_scopes.sync_admin(bot, await settings_cache.get_admin_id())
+    except Exception as e:
+        logging.error("Admin buyruqlarini o'rnatishda xatolik: %s", e)
+
+def create_dispatcher(storage) -> Dispatcher:
+    # Bitta chat update'lari ketma-ket: ikki marta bosilgan tugma holatni ikki marta o'qimaydi
+    return Dispatcher(storage=storage, events_isolation=ChatLockIsolation(django_settings.BOT_CHAT_LOCKS))
+
+def setup_dispatcher(dp: Dispatcher):
+    """Middleware'lar va handlerlarni ulaydi (bot va bench_load uchun umumiy)"""
+    dp.update.outer_middleware(UpdateDedupMiddleware(dp.storage, django_settings.BOT_DEDUP_SIZE))
+    # Dispatcherning FSM middleware'idan keyin bo'lishi kerak
+    dp.update.outer_middleware(FSMBufferMiddleware())
+    # Handlerdan (va log/metrikalardan) oldin: tashlangan update hech narsaga tegmaydi
+    throttling = ThrottlingMiddleware({
+        'block': (django_settings.BOT_THROTTLE_BLOCK_RATE, django_settings.BOT_THROTTLE_BLOCK_BURST),
+        'text': (django_settings.BOT_THROTTLE_TEXT_RATE, django_settings.BOT_THROTTLE_TEXT_BURST),
+        'callback': (django_settings.BOT_THROTTLE_CALLBACK_RATE, django_settings.BOT_THROTTLE_CALLBACK_BURST),
+    }, django_settings.BOT_THROTTLE_SWEEP_INTERVAL)
+    dp.message.middleware(throttling)
+    dp.callback_query.middleware(throttling)
+    update_log = UpdateLogMiddleware()
+    dp.message.middleware(update_log)
+    dp.callback_query.middleware(update_log)
+    update_metrics = MetricsMiddleware()
+    dp.message.middleware(update_metrics)
+    dp.callback_query.middleware(update_metrics)
 
-async def main():
+    dp.include_router(router)
+
+def worker_log_file(index: int) -> str:
+    # Bir faylni bir nechta jarayon rotatsiya qila olmaydi
+    root, ext = os.path.splitext(str(django_settings.BOT_LOG_FILE))
+    return f'{root}-worker{index}{ext}'
+
+async def main(worker=None):
+    """``worker`` (bot.supervisor.Worker) berilsa, supervisor ortida worker sifatida ishlaydi"""
+    listener = setup_logging(worker_log_file(worker.index) if worker else None)
     try:
         settings = await get_bot_settings()
         bot = Bot(token=settings.bot_token, default=DefaultBotProperties(parse_mode='HTML'))
-        dp = Dispatcher()
-
-        dp.include_router(router)
+        bot.session.middleware(ApiMetricsMiddleware())
+        storage = SQLiteStorage(
+            django_settings.BOT_FSM_STORAGE_PATH,
+            flush_interval=django_settings.BOT_FSM_FLUSH_INTERVAL,
+            ttl=django_settings.BOT_FSM_TTL,
+        )
+        dp = create_dispatcher(storage)
+        setup_dispatcher(dp)
 
         dp.startup.register(on_startup)
         dp.shutdown.register(on_shutdown)
+
+        if worker:
+            dp['worker'] = worker
+            logging.info("Bot worker %s/%s sifatida ishga tushmoqda...", worker.index, worker.count)
+            metrics_runner = None
+            if django_settings.BOT_METRICS_PORT:
+                metrics_runner = await start_metrics_server(
+                    django_settings.BOT_METRICS_HOST, django_settings.BOT_METRICS_PORT + worker.index
+                )
+            try:
+                await run_worker_server(dp, bot, worker)
+            finally:
+                if metrics_runner:
+                    await metrics_runner.cleanup()
+            return
         
         # Set bot commands
         await set_bot_commands(bot)
         
-        logging.info("Bot polling rejimida ishga tushmoqda...")
-        await dp.start_polling(bot)
+        # /metrics webhook serverida emas, alohida (odatda localhost'dagi) portda beriladi
+        metrics_runner = None
+        if django_settings.BOT_METRICS_PORT:
+            metrics_runner = await start_metrics_server(
+                django_settings.BOT_METRICS_HOST, django_settings.BOT_METRICS_PORT
+            )
+            logging.info(
+                "Metrikalar: http://%s:%s/metrics", django_settings.BOT_METRICS_HOST, django_settings.BOT_METRICS_PORT
+            )
+        try:
+            if settings.webhook_url:
+                logging.info("Bot webhook rejimida ishga tushmoqda...")
+                await run_webhook(dp, bot, settings)
+            else:
+                logging.info("Bot polling rejimida ishga tushmoqda...")
+                await dp.start_polling(bot)
+        finally:
+            if metrics_runner:
+                await metrics_runner.cleanup()
         
     except Exception as e:
-        logging.error(f"Bot ishga tushirishda xatolik: {e}")
-        raise
\ No newline at end of file
+        logging.error("Bot ishga tushirishda xatolik: %s", e)
+        raise
+    finally:
+        listener.stop()
\ No newline at end of file
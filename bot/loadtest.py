@@ -0,0 +1,306 @@
+"""Yuklama testi: soxta Telegram Bot API serveri va Form oqimini o'tadigan foydalanuvchilar.
+
+Bot haqiqiy dispatcher, middleware'lar va handlerlar bilan polling rejimida
+ishlaydi, lekin so'rovlarini mahalliy aiohttp serverga yuboradi. Har bir
+simulyatsiya qilingan foydalanuvchi /start dan tasdiqlashgacha bo'lgan
+qadamlarni ketma-ket bajaradi; qadam davomiyligi update navbatga qo'yilgan
+paytdan uning handleri (FSM yozuvi bilan) tugagunigacha o'lchanadi.
+"""
+import asyncio
+import itertools
+import json
+import math
+import time
+from collections import defaultdict
+from dataclasses import dataclass, field
+
+from aiogram import Bot
+from aiogram.client.bot import DefaultBotProperties
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.client.telegram import TelegramAPIServer
+from aiohttp import web
+
+from bot.loader import create_dispatcher, setup_dispatcher
+from bot.outbox import outbox
+
+BOT_ID = 100000001
+FAKE_TOKEN = f'{BOT_ID}:LOADTEST'
+# Haqiqiy Telegram ID'lari bilan to'qnashmasligi uchun
+USER_ID_BASE = 9_000_000_000_000
+
+# (qadam, update turi, qiymat): message uchun matn, callback uchun tugma
+# callback_data'si (None - klaviaturadagi birinchi tugma)
+FORM_FLOW = (
+    ('start', 'message', '/start'),
+    ('direction', 'callback', None),
+    ('year', 'callback', None),
+    ('month', 'callback', None),
+    ('day', 'callback', None),
+    ('phone', 'message', '+998901234567'),
+    ('trip_type', 'callback', 'person'),
+    ('car', 'callback', None),
+    ('address', 'message', 'Yunusobod, 4-mavze, 12-uy'),
+    ('comment', 'callback', 'no_comment'),
+    ('confirm', 'callback', 'confirm'),
+)
+
+
+def percentile(values, p):
+    """Saralangan ro'yxatdan nearest-rank usulida percentil"""
+    if not values:
+        return 0.0
+    return values[max(0, math.ceil(p / 100 * len(values)) - 1)]
+
+
+class FakeBotAPI:
+    """Bot API'ning yuklama testi uchun kerakli qismi.
+
+    ``getUpdates`` navbatdagi update'larni long polling bilan beradi, qolgan
+    metodlar ``latency`` soniya kutib javob qaytaradi. Har bir chatdagi inline
+    klaviaturalar saqlanadi, shunda foydalanuvchi keyingi tugmani tanlay oladi.
+    """
+
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        self.calls = defaultdict(int)
+        self._updates: list[dict] = []
+        self._update_ids = itertools.count(1)
+        self._message_ids = itertools.count(1)
+        self._has_updates = asyncio.Event()
+        # chat_id -> {message_id: reply_markup}
+        self._keyboards: dict[int, dict[int, dict]] = defaultdict(dict)
+        self._runner: web.AppRunner | None = None
+        self.url = None
+
+    async def start(self, host='127.0.0.1', port=0):
+        app = web.Application()
+        app.router.add_post('/bot{token}/{method}', self._handle)
+        self._runner = web.AppRunner(app)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, host=host, port=port).start()
+        host, port = self._runner.addresses[0][:2]
+        self.url = f'http://{host}:{port}'
+
+    async def stop(self):
+        if self._runner:
+            await self._runner.cleanup()
+
+    # --- Update'lar ---
+    def push(self, kind: str, payload: dict) -> int:
+        update_id = next(self._update_ids)
+        self._updates.append({'update_id': update_id, kind: payload})
+        self._has_updates.set()
+        return update_id
+
+    def keyboard(self, chat_id: int):
+        """Chatdagi eng oxirgi inline klaviatura va u biriktirilgan xabar id'si"""
+        keyboards = self._keyboards[chat_id]
+        if not keyboards:
+            return None, None
+        message_id = max(keyboards)
+        return message_id, keyboards[message_id]
+
+    # --- HTTP ---
+    async def _handle(self, request):
+        method = request.match_info['method']
+        params = dict(await request.post())
+        self.calls[method] += 1
+        if method == 'getUpdates':
+            result = await self._get_updates(params)
+        else:
+            if self.latency:
+                await asyncio.sleep(self.latency)
+            handler = getattr(self, f'_{method}', None)
+            result = handler(params) if handler else True
+        return web.json_response({'ok': True, 'result': result})
+
+    async def _get_updates(self, params):
+        offset = int(params.get('offset') or 0)
+        limit = int(params.get('limit') or 100)
+        # offset'dan oldingi update'lar tasdiqlangan hisoblanadi
+        self._updates = [update for update in self._updates if update['update_id'] >= offset]
+        if not self._updates:
+            self._has_updates.clear()
+            try:
+                await asyncio.wait_for(self._has_updates.wait(), float(params.get('timeout') or 0))
+            except TimeoutError:
+                pass
+        return self._updates[:limit]
+
+    def _message(self, chat_id, text):
+        return {
+            'message_id': next(self._message_ids),
+            'date': int(time.time()),
+            'chat': {'id': chat_id, 'type': 'private'},
+            'from': {'id': BOT_ID, 'is_bot': True, 'first_name': 'LoadTest'},
+            'text': text,
+        }
+
+    def _set_keyboard(self, chat_id, message_id, params):
+        markup = json.loads(params['reply_markup']) if params.get('reply_markup') else None
+        if markup and markup.get('inline_keyboard'):
+            self._keyboards[chat_id][message_id] = markup
+        else:
+            self._keyboards[chat_id].pop(message_id, None)
+
+    def _getMe(self, params):
+        return {'id': BOT_ID, 'is_bot': True, 'first_name': 'LoadTest', 'username': 'loadtest_bot'}
+
+    def _sendMessage(self, params):
+        chat_id = int(params['chat_id'])
+        message = self._message(chat_id, params.get('text', ''))
+        self._set_keyboard(chat_id, message['message_id'], params)
+        return message
+
+    def _editMessageText(self, params):
+        chat_id, message_id = int(params['chat_id']), int(params['message_id'])
+        self._set_keyboard(chat_id, message_id, params)
+        return {**self._message(chat_id, params.get('text', '')), 'message_id': message_id}
+
+    def _editMessageReplyMarkup(self, params):
+        chat_id, message_id = int(params['chat_id']), int(params['message_id'])
+        self._set_keyboard(chat_id, message_id, params)
+        return True
+
+
+class LoadTestError(Exception):
+    pass
+
+
+@dataclass
+class LoadTestResult:
+    users: int
+    completed: int
+    elapsed: float
+    # qadam -> soniyalardagi davomiyliklar
+    steps: dict[str, list[float]] = field(default_factory=lambda: defaultdict(list))
+    errors: list[str] = field(default_factory=list)
+    api_calls: dict[str, int] = field(default_factory=dict)
+
+    @property
+    def orders_per_second(self) -> float:
+        return self.completed / self.elapsed if self.elapsed else 0.0
+
+    def summary(self):
+        """(qadam, soni, p50, p95, p99) - millisekundlarda, FORM_FLOW tartibida"""
+        rows = []
+        for step, _, _ in FORM_FLOW:
+            values = sorted(self.steps.get(step, ()))
+            rows.append((step, len(values), *(percentile(values, p) * 1000 for p in (50, 95, 99))))
+        return rows
+
+
+class LoadTest:
+    """``users`` ta foydalanuvchini bir vaqtda Form oqimidan o'tkazadi"""
+
+    def __init__(self, users: int, storage, latency: float = 0.0, think: float = 0.0, timeout: float = 30.0):
+        self.users = users
+        self.storage = storage
+        self.api = FakeBotAPI(latency)
+        self.think = think
+        self.timeout = timeout
+        self._pending: dict[int, asyncio.Future] = {}
+
+    async def _track(self, handler, event, data):
+        # Eng tashqi middleware: FSM yozuvi ham tugagach qadam yakunlangan hisoblanadi
+        try:
+            return await handler(event, data)
+        finally:
+            future = self._pending.pop(event.update_id, None)
+            if future and not future.done():
+                future.set_result(None)
+
+    def _user(self, user_id):
+        return {'id': user_id, 'is_bot': False, 'first_name': 'Load', 'last_name': str(user_id - USER_ID_BASE)}
+
+    def _update(self, user_id, kind, value):
+        user = self._user(user_id)
+        if kind == 'message':
+            message = {
+                'message_id': next(self.api._message_ids),
+                'date': int(time.time()),
+                'chat': {'id': user_id, 'type': 'private'},
+                'from': user,
+                'text': value,
+            }
+            if value.startswith('/'):
+                message['entities'] = [{'type': 'bot_command', 'offset': 0, 'length': len(value.split()[0])}]
+            return 'message', message
+
+        message_id, markup = self.api.keyboard(user_id)
+        if markup is None:
+            raise LoadTestError('tanlash uchun klaviatura yo\'q')
+        buttons = [button['callback_data'] for row in markup['inline_keyboard'] for button in row]
+        data = value if value is not None else buttons[0]
+        if data not in buttons:
+            raise LoadTestError(f'"{data}" tugmasi klaviaturada yo\'q')
+        return 'callback_query', {
+            'id': f'{user_id}-{message_id}-{data}',
+            'from': user,
+            'chat_instance': str(user_id),
+            'data': data,
+            'message': {
+                'message_id': message_id,
+                'date': int(time.time()),
+                'chat': {'id': user_id, 'type': 'private'},
+                'from': {'id': BOT_ID, 'is_bot': True, 'first_name': 'LoadTest'},
+                'text': '...',
+            },
+        }
+
+    async def _run_user(self, user_id, result: LoadTestResult):
+        loop = asyncio.get_running_loop()
+        for step, kind, value in FORM_FLOW:
+            try:
+                update_kind, payload = self._update(user_id, kind, value)
+            except LoadTestError as e:
+                result.errors.append(f'{user_id} {step}: {e}')
+                return
+            future = loop.create_future()
+            started = time.perf_counter()
+            self._pending[self.api.push(update_kind, payload)] = future
+            try:
+                await asyncio.wait_for(future, self.timeout)
+            except TimeoutError:
+                result.errors.append(f'{user_id} {step}: {self.timeout:.0f} soniyada javob yo\'q')
+                return
+            result.steps[step].append(time.perf_counter() - started)
+            if self.think:
+                await asyncio.sleep(self.think)
+        result.completed += 1
+
+    async def run(self) -> LoadTestResult:
+        await self.api.start()
+        bot = Bot(
+            token=FAKE_TOKEN,
+            session=AiohttpSession(api=TelegramAPIServer.from_base(self.api.url)),
+            default=DefaultBotProperties(parse_mode='HTML'),
+        )
+        dp = create_dispatcher(self.storage)
+        dp.update.outer_middleware(self._track)
+        setup_dispatcher(dp)
+
+        polling = asyncio.create_task(dp.start_polling(bot, handle_signals=False, polling_timeout=1))
+        # Bazada kutayotgan haqiqiy xabarlar soxta serverga yuborilmasligi kerak
+        await outbox.start(bot, load_pending=False)
+        result = LoadTestResult(users=self.users, completed=0, elapsed=0.0)
+        try:
+            started = time.perf_counter()
+            await asyncio.gather(*(self._run_user(USER_ID_BASE + i, result) for i in range(self.users)))
+            result.elapsed = time.perf_counter() - started
+            await self._drain_outbox()
+        finally:
+            await outbox.stop()
+            await dp.stop_polling()
+            await polling
+            await self.api.stop()
+        result.api_calls = dict(self.api.calls)
+        return result
+
+    async def _drain_outbox(self):
+        # Tasdiqlash xabarlari ham fon navbatidan yuborib bo'linguncha kutiladi:
+        # ularning Bot API chaqiruvlari natijaga kiradi
+        deadline = time.monotonic() + self.timeout
+        while outbox.metrics()['queue_depth'] and time.monotonic() < deadline:
+            await asyncio.sleep(0.05)
+
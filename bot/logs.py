@@ -0,0 +1,72 @@
+"""Bot loglari: event loop disk yozuvini kutmasligi uchun navbat orqali.
+
+Handlerlar faqat ``QueueHandler`` ga yozuv qo'yadi; fayl (rotatsiya bilan)
+va konsolga yozish ``QueueListener`` oqimida bajariladi. Xabar matni
+(``msg % args``) standart ``prepare()`` orqali event loop oqimida yasaladi:
+argumentlar keyin o'zgarsa ham logga yozuv paytidagi qiymat tushadi. Xabarlar
+%-uslubda beriladi, shuning uchun daraja o'chirilgan bo'lsa matn umuman yasalmaydi.
+"""
+import json
+import logging
+import logging.handlers
+import queue
+
+from django.conf import settings
+
+TEXT_FORMAT = '%(asctime)s [%(levelname)s] %(message)s'
+# JSON'ga qo'shiladigan qo'shimcha maydonlar (logging.info(..., extra={...}))
+EXTRA_FIELDS = ('update_id', 'handler', 'state', 'latency_ms', 'user_id')
+
+
+class JsonFormatter(logging.Formatter):
+    """Har bir yozuvni bitta JSON qator sifatida chiqaradi"""
+
+    def format(self, record):
+        data = {
+            'time': self.formatTime(record),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        for field in EXTRA_FIELDS:
+            value = getattr(record, field, None)
+            if value is not None:
+                data[field] = value
+        if record.exc_info:
+            data['exc_info'] = self.formatException(record.exc_info)
+        return json.dumps(data, ensure_ascii=False)
+
+
+def build_sinks(log_file, json_output=False, max_bytes=10 * 1024 * 1024, backup_count=5, console=True):
+    formatter = JsonFormatter() if json_output else logging.Formatter(TEXT_FORMAT)
+    handlers = [logging.handlers.RotatingFileHandler(
+        log_file, maxBytes=max_bytes, backupCount=backup_count, encoding='utf-8'
+    )]
+    if console:
+        handlers.append(logging.StreamHandler())
+    for handler in handlers:
+        handler.setFormatter(formatter)
+    return handlers
+
+
+def setup_logging(log_file=None):
+    """Root loggerni navbatga ulaydi; to'xtatish uchun QueueListener qaytaradi"""
+    log_queue = queue.SimpleQueue()
+    listener = logging.handlers.QueueListener(
+        log_queue,
+        *build_sinks(
+            log_file or settings.BOT_LOG_FILE,
+            json_output=settings.BOT_LOG_JSON,
+            max_bytes=settings.BOT_LOG_MAX_BYTES,
+            backup_count=settings.BOT_LOG_BACKUP_COUNT,
+        ),
+        respect_handler_level=True,
+    )
+    root = logging.getLogger()
+    root.handlers = [logging.handlers.QueueHandler(log_queue)]
+    root.setLevel(settings.BOT_LOG_LEVEL)
+    # Har bir update haqidagi yozuvni UpdateLogMiddleware beradi
+    logging.getLogger('aiogram.event').setLevel(logging.WARNING)
+    listener.start()
+    return listener
+
@@ -0,0 +1,169 @@
+"""Bot jarayoni metrikalari va ularni Prometheus matn formatida berish.
+
+Metrikalar jarayon xotirasida yig'iladi (tashqi kutubxonasiz) va
+``/metrics`` orqali BOT_METRICS_PORT portidagi alohida kichik serverda
+beriladi (odatda 127.0.0.1): ochiq webhook serverida metrikalar yo'q.
+"""
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from dataclasses import dataclass
+
+from aiohttp import web
+from django.db.backends.signals import connection_created
+
+from bot.outbox import outbox
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21)
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+def _labels(names, values):
+    def escape(value):
+        return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+    return ','.join(f'{name}="{escape(value)}"' for name, value in zip(names, values))
+
+
+class Counter:
+    def __init__(self, name: str, documentation: str, labels: tuple = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labels = labels
+        self._values: dict[tuple, float] = {}
+
+    def inc(self, labels: tuple = (), amount: float = 1):
+        self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self):
+        yield f'# HELP {self.name} {self.documentation}'
+        yield f'# TYPE {self.name} counter'
+        for labels, value in sorted(self._values.items()):
+            yield f'{self.name}{{{_labels(self.labels, labels)}}} {value}'
+
+
+class Histogram:
+    def __init__(self, name: str, documentation: str, labels: tuple = (), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labels = labels
+        self.buckets = buckets
+        # labels -> [har bir bucket uchun son (+Inf bilan), yig'indi, jami]
+        self._series: dict[tuple, list] = {}
+
+    def observe(self, labels: tuple, value: float):
+        series = self._series.get(labels)
+        if series is None:
+            series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+        series[0][bisect_left(self.buckets, value)] += 1
+        series[1] += value
+        series[2] += 1
+
+    def render(self):
+        yield f'# HELP {self.name} {self.documentation}'
+        yield f'# TYPE {self.name} histogram'
+        for labels, (counts, total, count) in sorted(self._series.items()):
+            prefix = _labels(self.labels, labels)
+            prefix = prefix + ',' if prefix else ''
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + ('+Inf',), counts):
+                cumulative += bucket_count
+                yield f'{self.name}_bucket{{{prefix}le="{bound}"}} {cumulative}'
+            yield f'{self.name}_sum{{{prefix[:-1]}}} {total}'
+            yield f'{self.name}_count{{{prefix[:-1]}}} {count}'
+
+
+class BotMetrics:
+    def __init__(self):
+        self.handler_latency = Histogram(
+            'bot_handler_latency_seconds', 'Update handler davomiyligi', ('handler',))
+        self.state_latency = Histogram(
+            'bot_state_latency_seconds', 'FSM holati bo\'yicha update davomiyligi', ('state',))
+        self.db_queries = Histogram(
+            'bot_update_db_queries', 'Bitta update davomidagi SQL so\'rovlar soni', ('handler',), QUERY_BUCKETS)
+        self.db_time = Histogram(
+            'bot_update_db_seconds', 'Bitta update davomidagi SQL so\'rovlar vaqti', ('handler',))
+        self.api_latency = Histogram(
+            'bot_api_request_seconds', 'Telegram Bot API so\'rovlari davomiyligi', ('method',))
+        self.errors = Counter(
+            'bot_handler_errors_total', 'Handlerdagi xatoliklar', ('handler', 'error'))
+        self.api_errors = Counter(
+            'bot_api_errors_total', 'Telegram Bot API xatoliklari', ('method', 'error'))
+        self.duplicates = Counter(
+            'bot_duplicate_updates_total', 'Qayta kelgani uchun tashlab yuborilgan update\'lar')
+        self.throttled = Counter(
+            'bot_throttled_updates_total', 'Cheklov tufayli tashlab yuborilgan update\'lar', ('group',))
+        self.started_at = time.time()
+
+    def render(self) -> str:
+        lines = []
+        for metric in (self.handler_latency, self.state_latency, self.db_queries, self.db_time,
+                       self.api_latency, self.errors, self.api_errors, self.duplicates, self.throttled):
+            lines.extend(metric.render())
+        outbox_metrics = outbox.metrics()
+        lines += [
+            '# HELP bot_outbox_queue_depth Yuborilishini kutayotgan xabarlar',
+            '# TYPE bot_outbox_queue_depth gauge',
+            f'bot_outbox_queue_depth {outbox_metrics["queue_depth"]}',
+        ]
+        for key in ('sent', 'failed', 'retried'):
+            lines += [
+                f'# HELP bot_outbox_{key}_total Outbox: {key}',
+                f'# TYPE bot_outbox_{key}_total counter',
+                f'bot_outbox_{key}_total {outbox_metrics[key]}',
+            ]
+        lines += [
+            '# HELP bot_start_time_seconds Jarayon ishga tushgan vaqt',
+            '# TYPE bot_start_time_seconds gauge',
+            f'bot_start_time_seconds {self.started_at}',
+        ]
+        return '\n'.join(lines) + '\n'
+
+
+metrics = BotMetrics()
+
+
+# --- Update davomidagi SQL so'rovlar ---
+@dataclass
+class UpdateDBStats:
+    queries: int = 0
+    seconds: float = 0.0
+
+
+# sync_to_async kontekstni oqimga ko'chiradi, shuning uchun db_read/db_write
+# ichidagi so'rovlar ham shu update'ga yoziladi
+current_update_db: ContextVar[UpdateDBStats | None] = ContextVar('current_update_db', default=None)
+
+
+def _count_query(execute, sql, params, many, context):
+    stats = current_update_db.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        stats.queries += 1
+        stats.seconds += time.perf_counter() - started
+
+
+def _install_query_counter(sender, connection, **kwargs):
+    connection.execute_wrappers.append(_count_query)
+
+
+connection_created.connect(_install_query_counter)
+
+
+# --- HTTP ---
+async def metrics_view(request):
+    return web.Response(body=metrics.render().encode(), headers={'Content-Type': CONTENT_TYPE})
+
+
+async def start_metrics_server(host: str, port: int) -> web.AppRunner:
+    """Faqat /metrics beradigan server (webhook serveridan alohida)"""
+    app = web.Application()
+    app.router.add_get('/metrics', metrics_view)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    await web.TCPSite(runner, host=host, port=port).start()
+    return runner
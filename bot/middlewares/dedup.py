@@ -0,0 +1,45 @@
+import logging
+from collections import OrderedDict
+
+from aiogram import BaseMiddleware
+
+from bot.metrics import metrics
+
+
+class UpdateDedupMiddleware(BaseMiddleware):
+    """Qayta kelgan update'larni (bir xil update_id yoki callback query id) tashlab yuboradi.
+
+    Telegram javobsiz qolgan update'ni qayta yuboradi (webhook xatosi, polling
+    offset'i tasdiqlanmay bot to'xtashi). Oxirgi ``size`` ta belgi xotirada
+    saqlanadi; storage ``add_seen_update`` ni qo'llasa (SQLiteStorage), belgilar
+    faylga ham yoziladi va qayta ishga tushganda yuklanadi.
+    """
+
+    def __init__(self, storage, size: int = 10000):
+        self.storage = storage
+        self.size = size
+        self.persistent = hasattr(storage, 'add_seen_update')
+        self._seen: OrderedDict[str, None] = OrderedDict()
+        self._loaded = not self.persistent
+
+    async def __call__(self, handler, event, data):
+        if not self._loaded:
+            self._loaded = True
+            for key in await self.storage.load_seen_updates(self.size):
+                self._seen[key] = None
+
+        keys = [f'u:{event.update_id}']
+        if event.callback_query:
+            keys.append(f'cb:{event.callback_query.id}')
+        if any(key in self._seen for key in keys):
+            metrics.duplicates.inc()
+            logging.debug("Takroriy update %s tashlab yuborildi", event.update_id)
+            return None
+
+        for key in keys:
+            self._seen[key] = None
+            if self.persistent:
+                self.storage.add_seen_update(key)
+        while len(self._seen) > self.size:
+            self._seen.popitem(last=False)
+        return await handler(event, data)
@@ -0,0 +1,100 @@
+import logging
+from copy import copy
+from typing import Any, Mapping
+
+from aiogram import BaseMiddleware
+from aiogram.exceptions import DataNotDictLikeError
+from aiogram.fsm.context import FSMContext
+from aiogram.fsm.state import State
+from aiogram.fsm.storage.base import StateType
+
+
+class BufferedFSMContext(FSMContext):
+    """Update davomidagi o'zgarishlarni xotirada yig'adi va commit() da bir marta yozadi"""
+
+    def __init__(self, storage, key, state: str | None):
+        super().__init__(storage=storage, key=key)
+        self._state = state
+        self._data = None
+        self._state_changed = False
+        self._data_changed = False
+
+    async def _load_data(self) -> dict[str, Any]:
+        if self._data is None:
+            self._data = await self.storage.get_data(key=self.key)
+        return self._data
+
+    async def set_state(self, state: StateType = None) -> None:
+        self._state = state.state if isinstance(state, State) else state
+        self._state_changed = True
+
+    async def get_state(self) -> str | None:
+        return self._state
+
+    async def set_data(self, data: Mapping[str, Any]) -> None:
+        if not isinstance(data, dict):
+            msg = f"Data must be a dict or dict-like object, got {type(data).__name__}"
+            raise DataNotDictLikeError(msg)
+        self._data = data.copy()
+        self._data_changed = True
+
+    async def get_data(self) -> dict[str, Any]:
+        return (await self._load_data()).copy()
+
+    async def get_value(self, key: str, default: Any | None = None) -> Any | None:
+        return copy((await self._load_data()).get(key, default))
+
+    async def update_data(self, data: Mapping[str, Any] | None = None, **kwargs: Any) -> dict[str, Any]:
+        if data:
+            kwargs.update(data)
+        current = await self._load_data()
+        current.update(kwargs)
+        self._data_changed = True
+        return current.copy()
+
+    async def clear(self) -> None:
+        self._state = None
+        self._data = {}
+        self._state_changed = True
+        self._data_changed = True
+
+    @property
+    def changed(self) -> bool:
+        return self._state_changed or self._data_changed
+
+    async def commit(self):
+        if self._state_changed and self._data_changed and hasattr(self.storage, 'set_record'):
+            await self.storage.set_record(self.key, self._state, self._data)
+        else:
+            if self._state_changed:
+                await self.storage.set_state(key=self.key, state=self._state)
+            if self._data_changed:
+                await self.storage.set_data(key=self.key, data=self._data)
+        self._state_changed = False
+        self._data_changed = False
+
+
+class FSMBufferMiddleware(BaseMiddleware):
+    """Handlerga BufferedFSMContext beradi va handler muvaffaqiyatli tugagach o'zgarishlarni saqlaydi.
+
+    Handler xatolik bilan tugasa, yarim qolgan o'zgarishlar tashlab yuboriladi:
+    foydalanuvchi oldingi qadamda qoladi va uni qayta urinishi mumkin.
+
+    Dispatcherning FSM middleware'idan keyin (update.outer_middleware) ro'yxatdan
+    o'tkaziladi, shuning uchun allaqachon o'qilgan ``raw_state`` qayta ishlatiladi.
+    """
+
+    async def __call__(self, handler, event, data):
+        context = data.get("state")
+        if context is None:
+            return await handler(event, data)
+        buffered = BufferedFSMContext(context.storage, context.key, data.get("raw_state"))
+        data["state"] = buffered
+        try:
+            result = await handler(event, data)
+        except Exception:
+            if buffered.changed:
+                logging.warning("Chat %s: handler xatolik bilan tugadi, FSM o'zgarishlari saqlanmadi", context.key.chat_id)
+            raise
+        await buffered.commit()
+        return result
@@ -0,0 +1,49 @@
+import time
+
+from aiogram import BaseMiddleware
+from aiogram.client.session.middlewares.base import BaseRequestMiddleware
+
+from bot.metrics import UpdateDBStats, current_update_db, metrics
+
+
+class MetricsMiddleware(BaseMiddleware):
+    """Handler va FSM holati bo'yicha davomiylik, SQL so'rovlar soni/vaqti va xatoliklarni yozadi.
+
+    Handler nomi ma'lum bo'lishi uchun message/callback_query inner middleware
+    sifatida ro'yxatdan o'tkaziladi.
+    """
+
+    async def __call__(self, handler, event, data):
+        handler_object = data.get('handler')
+        name = handler_object.callback.__name__ if handler_object else 'unknown'
+        state = data.get('raw_state') or 'none'
+        stats = UpdateDBStats()
+        token = current_update_db.set(stats)
+        started = time.perf_counter()
+        try:
+            return await handler(event, data)
+        except Exception as e:
+            metrics.errors.inc((name, type(e).__name__))
+            raise
+        finally:
+            elapsed = time.perf_counter() - started
+            current_update_db.reset(token)
+            metrics.handler_latency.observe((name,), elapsed)
+            metrics.state_latency.observe((state,), elapsed)
+            metrics.db_queries.observe((name,), stats.queries)
+            metrics.db_time.observe((name,), stats.seconds)
+
+
+class ApiMetricsMiddleware(BaseRequestMiddleware):
+    """Bot API so'rovlari davomiyligi va xatoliklari (bot.session.middleware)"""
+
+    async def __call__(self, make_request, bot, method):
+        name = type(method).__name__
+        started = time.perf_counter()
+        try:
+            return await make_request(bot, method)
+        except Exception as e:
+            metrics.api_errors.inc((name, type(e).__name__))
+            raise
+        finally:
+            metrics.api_latency.observe((name,), time.perf_counter() - started)
@@ -0,0 +1,89 @@
+import logging
+import time
+from array import array
+
+from aiogram import BaseMiddleware
+from aiogram.types import CallbackQuery
+
+from bot.metrics import metrics
+from set_main.cache import settings_cache
+
+# Formadagi har qanday matnga "Iltimos, tugmalardan foydalaning!" deb javob beruvchi handlerlar
+BLOCK_HANDLERS = frozenset({'block_text', 'block_trip_type', 'block_car_text', 'block_confirm'})
+
+
+class ThrottlingMiddleware(BaseMiddleware):
+    """Foydalanuvchi bo'yicha token bucket: limitdan oshgan update'lar jimgina tashlab yuboriladi.
+
+    Handler guruhi (``block``, ``text``, ``callback``) ma'lum bo'lishi uchun
+    message/callback_query inner middleware sifatida ro'yxatdan o'tkaziladi va
+    handlerdan oldin ishlaydi, shuning uchun tashlangan update bazaga ham,
+    Telegram'ga ham yetmaydi. ``limits`` - guruh -> (soniyasiga token, sig'im);
+    tezligi 0 bo'lgan guruh cheklanmaydi.
+
+    Har bir foydalanuvchi uchun bitta ``array('d')``: guruhlar bo'yicha
+    [tokenlar, oxirgi vaqt] juftliklari. To'lib bo'lgan bucket yangisidan farq
+    qilmaydi, shuning uchun bunday foydalanuvchilar har ``sweep_interval``
+    soniyada lug'atdan o'chiriladi.
+    """
+
+    def __init__(self, limits: dict[str, tuple[float, float]], sweep_interval: float = 60):
+        self.groups = {name: index for index, name in enumerate(limits)}
+        self.rates = array('d', (rate for rate, _ in limits.values()))
+        self.capacities = array('d', (capacity for _, capacity in limits.values()))
+        self.sweep_interval = sweep_interval
+        self._buckets: dict[int, array] = {}
+        self._next_sweep = time.monotonic() + sweep_interval
+
+    @staticmethod
+    def group_of(handler_name, event) -> str:
+        if handler_name in BLOCK_HANDLERS:
+            return 'block'
+        return 'callback' if isinstance(event, CallbackQuery) else 'text'
+
+    def take(self, user_id: int, group: str, now: float) -> bool:
+        index = self.groups[group]
+        rate = self.rates[index]
+        if rate <= 0:
+            return True
+        bucket = self._buckets.get(user_id)
+        if bucket is None:
+            bucket = self._buckets[user_id] = array('d', [0.0, now] * len(self.groups))
+            for i, capacity in enumerate(self.capacities):
+                bucket[2 * i] = capacity
+        tokens = min(self.capacities[index], bucket[2 * index] + (now - bucket[2 * index + 1]) * rate)
+        bucket[2 * index + 1] = now
+        if tokens < 1:
+            bucket[2 * index] = tokens
+            return False
+        bucket[2 * index] = tokens - 1
+        return True
+
+    def _is_full(self, bucket: array, now: float) -> bool:
+        return all(
+            rate <= 0 or bucket[2 * i] + (now - bucket[2 * i + 1]) * rate >= self.capacities[i]
+            for i, rate in enumerate(self.rates)
+        )
+
+    def sweep(self, now: float):
+        for user_id in [user_id for user_id, bucket in self._buckets.items() if self._is_full(bucket, now)]:
+            del self._buckets[user_id]
+        self._next_sweep = now + self.sweep_interval
+
+    async def __call__(self, handler, event, data):
+        user = data.get('event_from_user')
+        if user is None:
+            return await handler(event, data)
+        now = time.monotonic()
+        if now >= self._next_sweep:
+            self.sweep(now)
+        handler_object = data.get('handler')
+        group = self.group_of(handler_object.callback.__name__ if handler_object else None, event)
+        if self.take(user.id, group, now):
+            return await handler(event, data)
+        # Admin cheklanmaydi; keshdagi admin_id faqat tashlash oldidan tekshiriladi
+        if user.id == await settings_cache.get_admin_id():
+            return await handler(event, data)
+        metrics.throttled.inc((group,))
+        logging.debug("Foydalanuvchi %s update'i cheklandi (%s)", user.id, group)
+        return None
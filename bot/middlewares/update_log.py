@@ -0,0 +1,40 @@
+import logging
+import time
+
+from aiogram import BaseMiddleware
+from django.conf import settings
+
+
+class UpdateLogMiddleware(BaseMiddleware):
+    """Har bir update uchun bitta yozuv: update_id, handler, FSM holati va davomiyligi.
+
+    Handler nomi ma'lum bo'lishi uchun message/callback_query inner middleware
+    sifatida ro'yxatdan o'tkaziladi. Daraja BOT_LOG_UPDATE_LEVEL bilan beriladi;
+    u o'chirilgan bo'lsa, middleware hech narsa hisoblamaydi.
+    """
+
+    def __init__(self, level=None):
+        self.level = logging.getLevelName(level or settings.BOT_LOG_UPDATE_LEVEL)
+        self.logger = logging.getLogger('bot.updates')
+
+    async def __call__(self, handler, event, data):
+        if not self.logger.isEnabledFor(self.level):
+            return await handler(event, data)
+        started = time.perf_counter()
+        try:
+            return await handler(event, data)
+        finally:
+            latency_ms = round((time.perf_counter() - started) * 1000, 2)
+            handler_object = data.get('handler')
+            name = handler_object.callback.__name__ if handler_object else None
+            update = data.get('event_update')
+            update_id = update.update_id if update else None
+            state = data.get('raw_state')
+            user = data.get('event_from_user')
+            self.logger.log(
+                self.level, 'update %s handled by %s (state=%s) in %.2f ms', update_id, name, state, latency_ms,
+                extra={
+                    'update_id': update_id, 'handler': name, 'state': state, 'latency_ms': latency_ms,
+                    'user_id': user.id if user else None,
+                },
+            )
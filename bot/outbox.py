@@ -0,0 +1,252 @@
+import asyncio
+import logging
+import time
+from collections import deque
+from dataclasses import dataclass
+
+from aiogram import Bot
+from aiogram.exceptions import TelegramAPIError, TelegramNetworkError, TelegramRetryAfter, TelegramServerError
+from django.conf import settings
+
+from set_main.models import OutboundMessage
+from bot.db import db_read, db_write
+
+
+class TokenBucket:
+    """rate token/soniya tezlikda to'ladigan, capacity sig'imli chelak"""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated_at = time.monotonic()
+
+    def take(self) -> float:
+        """Token olinsa 0, aks holda token paydo bo'lguncha kutish vaqtini qaytaradi"""
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+    @property
+    def idle(self) -> bool:
+        return self.tokens + (time.monotonic() - self.updated_at) * self.rate >= self.capacity
+
+
+@dataclass
+class _Message:
+    id: int
+    chat_id: int
+    text: str
+    parse_mode: str
+    attempts: int = 0
+
+
+def _load_pending():
+    return [
+        _Message(m.id, m.chat_id, m.text, m.parse_mode, m.attempts)
+        for m in OutboundMessage.objects.order_by('id')
+    ]
+
+
+def create_message(chat_id, text, parse_mode='') -> _Message:
+    """Xabarni jadvalga yozadi (chaqiruvchining tranzaksiyasi ichida); navbatga ``Outbox.push`` qo'yadi"""
+    message_id = OutboundMessage.objects.create(chat_id=chat_id, text=text, parse_mode=parse_mode).id
+    return _Message(message_id, chat_id, text, parse_mode)
+
+
+def _set_attempts(message_id, attempts):
+    OutboundMessage.objects.filter(id=message_id).update(attempts=attempts)
+
+
+def _delete(message_id):
+    OutboundMessage.objects.filter(id=message_id).delete()
+
+
+class Outbox:
+    """Chiquvchi xabarlar navbati.
+
+    Xabarlar avval OutboundMessage jadvaliga yoziladi, so'ng workerlar ularni
+    global va har bir chat uchun token bucket'lar bo'yicha yuboradi. 429 javobida
+    ``retry_after`` kutiladi, tarmoq/server xatolarida xabar qayta urinishga
+    qo'yiladi. Yuborilmagan xabarlar qayta ishga tushganda jadvaldan yuklanadi.
+
+    Har bir chat xabarlari o'z navbatida (FIFO) turadi, asosiy navbatda esa
+    chatlar aylanadi: bir chatga bir vaqtda faqat bitta worker yuboradi va
+    kechiktirilgan xabardan keyingilari ham u bilan birga kutadi, shuning uchun
+    chat ichidagi tartib saqlanadi.
+    """
+
+    def __init__(self, global_rate: float, chat_rate: float, chat_burst: float, workers: int, max_attempts: int):
+        self.global_bucket = TokenBucket(global_rate, global_rate)
+        self.chat_rate = chat_rate
+        self.chat_burst = chat_burst
+        self.workers = workers
+        self.max_attempts = max_attempts
+        self._chat_buckets: dict[int, TokenBucket] = {}
+        # Navbatdagi chat_id'lar; har bir chat unda (yoki kechiktirilgan) ko'pi bilan bir marta bo'ladi
+        self._queue: asyncio.Queue | None = None
+        self._chats: dict[int, deque[_Message]] = {}
+        self._pending = 0
+        self._paused_until = 0.0
+        self._bot: Bot | None = None
+        self._tasks: list[asyncio.Task] = []
+        # Supervisor rejimida global limit barcha workerlar uchun umumiy (SharedState)
+        self.shared = None
+        self.sent = 0
+        self.failed = 0
+        self.retried = 0
+
+    async def start(self, bot: Bot, load_pending: bool = True, owns=None):
+        """``owns(chat_id)`` berilsa, kutayotgan xabarlardan faqat shu workerga tegishlilari yuklanadi"""
+        self._bot = bot
+        self._queue = asyncio.Queue()
+        self._chats = {}
+        self._pending = 0
+        if load_pending:
+            for message in await db_read(_load_pending):
+                if owns is None or owns(message.chat_id):
+                    self._enqueue(message)
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def send_message(self, chat_id: int, text: str, parse_mode: str = ''):
+        """Xabarni navbatga qo'yadi va darhol qaytadi"""
+        self._enqueue(await db_write(create_message, chat_id, text, parse_mode))
+
+    def push(self, messages):
+        """``create_message`` bilan jadvalga yozilgan xabarlarni navbatga qo'yadi"""
+        for message in messages:
+            self._enqueue(message)
+
+    def metrics(self) -> dict:
+        return {
+            'queue_depth': self._pending,
+            'sent': self.sent,
+            'failed': self.failed,
+            'retried': self.retried,
+        }
+
+    async def acquire(self):
+        """Umumiy (bot bo'yicha) limitdan bitta xabar uchun ruxsat kutadi"""
+        while True:
+            wait = self._paused_until - time.monotonic()
+            if wait <= 0:
+                if self.shared is not None:
+                    bucket = self.global_bucket
+                    wait = await asyncio.to_thread(self.shared.take, 'outbox', bucket.rate, bucket.capacity)
+                else:
+                    wait = self.global_bucket.take()
+                if not wait:
+                    return
+            await asyncio.sleep(wait)
+
+    async def pause(self, seconds: float):
+        """429 javobidan keyin barcha yuborishlarni to'xtatib turadi"""
+        self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+        if self.shared is not None:
+            try:
+                await asyncio.to_thread(self.shared.pause, 'outbox', seconds)
+            except Exception as e:
+                # Mahalliy pauza baribir ishlaydi; boshqa workerlar 429 olib, o'zlari to'xtaydi
+                logging.error("Umumiy pauzani yozishda xatolik: %s", e)
+
+    def _enqueue(self, message: _Message):
+        pending = self._chats.get(message.chat_id)
+        if pending is None:
+            pending = self._chats[message.chat_id] = deque()
+            self._queue.put_nowait(message.chat_id)
+        pending.append(message)
+        self._pending += 1
+
+    def _reschedule(self, chat_id: int, delay: float | None):
+        """``delay`` None bo'lsa, birinchi xabar tugagan; aks holda u shuncha kutib qayta yuboriladi"""
+        pending = self._chats[chat_id]
+        if delay is None:
+            pending.popleft()
+            self._pending -= 1
+            if not pending:
+                del self._chats[chat_id]
+                return
+            # Chat navbat oxiriga qaytadi - boshqa chatlar ham navbat oladi
+            self._queue.put_nowait(chat_id)
+            return
+        asyncio.get_running_loop().call_later(delay, self._queue.put_nowait, chat_id)
+
+    def _chat_bucket(self, chat_id: int) -> TokenBucket:
+        bucket = self._chat_buckets.get(chat_id)
+        if bucket is None:
+            if len(self._chat_buckets) > 10000:
+                self._chat_buckets = {k: b for k, b in self._chat_buckets.items() if not b.idle}
+            bucket = self._chat_buckets[chat_id] = TokenBucket(self.chat_rate, self.chat_burst)
+        return bucket
+
+    async def _worker(self):
+        while True:
+            chat_id = await self._queue.get()
+            message = self._chats[chat_id][0]
+            delay = None
+            try:
+                delay = await self._process(message)
+            except Exception as e:
+                # Xabar navbat boshida qoladi (jadvaldagi qatori ham): keyingilari undan oldin ketmaydi
+                message.attempts += 1
+                delay = min(2 ** message.attempts, 60)
+                logging.error("Outbox xatoligi (xabar #%s, %s soniyadan keyin qayta): %s", message.id, delay, e)
+            finally:
+                self._queue.task_done()
+            self._reschedule(chat_id, delay)
+
+    async def _process(self, message: _Message) -> float | None:
+        """Xabarni yuboradi; qayta urinish kerak bo'lsa kutish vaqtini, aks holda None qaytaradi"""
+        # Chat limiti to'lgan bo'lsa, workerni band qilmasdan keyinroq qaytariladi
+        wait = self._chat_bucket(message.chat_id).take()
+        if wait:
+            return wait
+        await self.acquire()
+
+        try:
+            # parse_mode berilmagan bo'lsa, Bot'ning standart parse_mode'i ishlatiladi
+            kwargs = {'parse_mode': message.parse_mode} if message.parse_mode else {}
+            await self._bot.send_message(message.chat_id, message.text, **kwargs)
+        except TelegramRetryAfter as e:
+            await self.pause(e.retry_after)
+            self.retried += 1
+            return e.retry_after
+        except (TelegramNetworkError, TelegramServerError) as e:
+            message.attempts += 1
+            if message.attempts < self.max_attempts:
+                self.retried += 1
+                await db_write(_set_attempts, message.id, message.attempts)
+                return min(2 ** message.attempts, 60)
+            logging.error("Xabar #%s yuborilmadi (%s urinish): %s", message.id, message.attempts, e)
+            self.failed += 1
+        except TelegramAPIError as e:
+            # Bloklangan chat, noto'g'ri so'rov va h.k. - qayta urinish foydasiz
+            logging.error("Xabar #%s yuborilmadi: %s", message.id, e)
+            self.failed += 1
+        else:
+            self.sent += 1
+        try:
+            await db_write(_delete, message.id)
+        except Exception as e:
+            # Xabar yuborilgan: qayta urinish uni ikki marta yuboradi
+            logging.error("Xabar #%s jadvaldan o'chirilmadi: %s", message.id, e)
+        return None
+
+
+outbox = Outbox(
+    global_rate=settings.BOT_OUTBOX_GLOBAL_RATE,
+    chat_rate=settings.BOT_OUTBOX_CHAT_RATE,
+    chat_burst=settings.BOT_OUTBOX_CHAT_BURST,
+    workers=settings.BOT_OUTBOX_WORKERS,
+    max_attempts=settings.BOT_OUTBOX_MAX_ATTEMPTS,
+)
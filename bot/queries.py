@@ -0,0 +1,133 @@
+"""Bot handlerlari uchun ma'lumotlar bazasi amallari.
+
+Har bir funksiya handlerga kerak bo'lgan barcha so'rovlarni bitta sinxron
+blokda bajaradi va uni ``bot.db`` oqimlar puliga bitta o'tish bilan yuboradi.
+Django'ning ``acount``/``acreate`` kabi async metodlari ichida
+``sync_to_async(thread_sensitive=True)`` ishlatadi, ya'ni har bir so'rov
+alohida o'tish bilan yagona umumiy oqimga tushadi.
+"""
+from django.db import transaction
+
+from set_main import search, stats
+from set_main.models import Car, Order, Route, User
+from bot.db import db_read, db_write
+from bot.outbox import create_message, outbox
+
+
+# --- User ---
+def _register_user(user_id, full_name):
+    user, created = User.objects.get_or_create(user_id=user_id, defaults={'full_name': full_name})
+    if user.is_blocked:
+        # /start yuborgan bo'lsa, botni blokdan chiqargan
+        user.is_blocked = False
+        user.save(update_fields=['is_blocked'])
+    return user, created
+
+
+async def register_user(user_id, full_name):
+    """(user, created) qaytaradi"""
+    return await db_write(_register_user, user_id, full_name)
+
+
+async def count_users():
+    return (await db_read(stats.totals))['users']
+
+
+# --- Order ---
+def _create_order(user_id, full_name, data, notify=None):
+    """(user, order, messages) qaytaradi; buyurtma avval yaratilgan bo'lsa messages None"""
+    key = data.get('form_id')
+    with transaction.atomic():
+        user, _ = User.objects.get_or_create(user_id=user_id, defaults={'full_name': full_name})
+        # Yozuv tranzaksiyasi boshidanoq qulf oladi (IMMEDIATE), shuning uchun tekshiruv va yaratish orasida poyga yo'q
+        existing = Order.objects.filter(idempotency_key=key).first() if key else None
+        if existing:
+            return user, existing, None
+        order = Order.objects.create(
+            user=user,
+            direction=data['direction'],
+            date=data['date'],
+            phone=data['phone'],
+            trip_type=data['trip_type'],
+            car=data['car'],
+            route_ref_id=Route.objects.filter(name=data['direction']).values('id')[:1],
+            car_ref_id=Car.objects.filter(name=data['car']).values('id')[:1],
+            address=data['address'],
+            comment=data['comment'] if data['comment'] else '',
+            idempotency_key=key,
+        )
+        # Xabarlar buyurtma bilan bitta tranzaksiyada yoziladi: orada to'xtagan bot ularni yo'qotmaydi
+        messages = [create_message(*message) for message in notify(user, order)] if notify else []
+    return user, order, messages
+
+
+async def create_order(user_id, full_name, data, notify=None):
+    """Foydalanuvchini topadi (yo'q bo'lsa yaratadi) va buyurtma yaratadi; (user, order, created) qaytaradi.
+
+    Shu forma (``data['form_id']``) bo'yicha buyurtma allaqachon bo'lsa, o'sha qaytariladi.
+    ``notify(user, order)`` - [(chat_id, text, parse_mode), ...]; bu xabarlar
+    buyurtma bilan birga yoziladi va outbox navbatiga qo'yiladi.
+    """
+    user, order, messages = await db_write(_create_order, user_id, full_name, data, notify)
+    if messages:
+        outbox.push(messages)
+    return user, order, messages is not None
+
+
+async def count_orders():
+    return (await db_read(stats.totals))['orders']
+
+
+def _find_orders(query, limit):
+    ids = search.search_order_ids(query, limit=limit)
+    orders = Order.objects.select_related('user').in_bulk(ids)
+    return [orders[i] for i in ids if i in orders]
+
+
+async def find_orders(query, limit=10):
+    """To'liq matnli qidiruv; eng mos buyurtmalar birinchi"""
+    return await db_read(_find_orders, query, limit)
+
+
+# --- Car / Route ---
+def _names(model):
+    return list(model.objects.values_list('name', flat=True))
+
+
+async def list_car_names():
+    return await db_read(_names, Car)
+
+
+async def list_route_names():
+    return await db_read(_names, Route)
+
+
+def _add(model, name):
+    return model.objects.get_or_create(name=name)[1]
+
+
+def _delete(model, name):
+    # Signal'lar (catalog versiyasi) ishlashi uchun obyekt orqali o'chiriladi
+    obj = model.objects.filter(name=name).first()
+    if obj is None:
+        return False
+    obj.delete()
+    return True
+
+
+async def add_car(name):
+    """Yangi mashina qo'shilgan bo'lsa True qaytaradi"""
+    return await db_write(_add, Car, name)
+
+
+async def delete_car(name):
+    """Mashina topilib o'chirilgan bo'lsa True qaytaradi"""
+    return await db_write(_delete, Car, name)
+
+
+async def add_route(name):
+    return await db_write(_add, Route, name)
+
+
+async def delete_route(name):
+    return await db_write(_delete, Route, name)
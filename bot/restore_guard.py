@@ -0,0 +1,78 @@
+import asyncio
+import logging
+import os
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import connections
+
+from set_main.backup import bot_pid_path, remove_quietly, restore_ack_path, restore_lock_path
+from set_main.cache import catalog_version, settings_cache
+from bot import db
+
+
+class RestoreGuard:
+    """``restore_db`` bilan kelishuv.
+
+    Bot ishga tushganda pid faylini yozadi. restore_db lock faylini
+    yaratsa, bot bazaga yangi murojaatlarni to'xtatadi, bajarilayotganlarini
+    kutadi, barcha ulanishlarni yopadi va buni ack fayli bilan bildiradi.
+    Lock fayli o'chirilgach, keshlarni tozalab ishni davom ettiradi.
+    """
+
+    def __init__(self, db_path, interval: float = 0.5):
+        self.lock_path = restore_lock_path(db_path)
+        self.ack_path = restore_ack_path(db_path)
+        self.pid_path = bot_pid_path(db_path)
+        self.interval = interval
+        self.paused = False
+        self._task: asyncio.Task | None = None
+
+    def start(self, worker_index: int | None = None):
+        if worker_index is None:
+            with open(self.pid_path, 'w') as f:
+                f.write(str(os.getpid()))
+        else:
+            # Supervisor rejimida pid faylini supervisor yozadi va barcha
+            # workerlarning ack fayllari yig'ilgach umumiy ack'ni beradi
+            self.pid_path = None
+            self.ack_path = f'{self.ack_path}.{worker_index}'
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+        if self.paused:
+            self._resume()
+        if self.pid_path:
+            remove_quietly(self.pid_path)
+
+    async def _run(self):
+        while True:
+            try:
+                locked = os.path.exists(self.lock_path)
+                if locked and not self.paused:
+                    logging.info("Baza tiklanmoqda: murojaatlar to'xtatildi")
+                    await db.pause()
+                    self.paused = True
+                    with open(self.ack_path, 'w') as f:
+                        f.write(str(os.getpid()))
+                elif not locked and self.paused:
+                    await sync_to_async(connections.close_all)()
+                    self._resume()
+                    logging.info("Baza tiklandi: ish davom ettirilmoqda")
+            except Exception as e:
+                logging.error("RestoreGuard xatoligi: %s", e)
+            await asyncio.sleep(self.interval)
+
+    def _resume(self):
+        remove_quietly(self.ack_path)
+        self.paused = False
+        # Tiklangan bazada sozlamalar va katalog boshqacha bo'lishi mumkin
+        settings_cache.invalidate()
+        catalog_version.bump()
+        db.resume()
+
+
+restore_guard = RestoreGuard(settings.DATABASES['default']['NAME'])
@@ -5,6 +5,7 @@ class AdminStates(StatesGroup):
     del_car = State()
     add_route = State()
     del_route = State()
+    broadcast = State()
 
 class Form(StatesGroup):
     direction = State()
@@ -0,0 +1,249 @@
+import asyncio
+import json
+import logging
+import sqlite3
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from typing import Any, Mapping
+
+from aiogram.exceptions import DataNotDictLikeError
+from aiogram.fsm.state import State
+from aiogram.fsm.storage.base import BaseEventIsolation, BaseStorage, DefaultKeyBuilder, StateType, StorageKey
+
+
+@dataclass
+class _Record:
+    state: str | None = None
+    data: dict[str, Any] = field(default_factory=dict)
+    touched_at: float = field(default_factory=time.time)
+
+
+class SQLiteStorage(BaseStorage):
+    """FSM holatini alohida SQLite faylida saqlaydigan storage.
+
+    O'qishlar xotiradagi yozuvlardan beriladi, o'zgarishlar esa har
+    ``flush_interval`` soniyada bitta tranzaksiyada yoziladi (write-behind).
+    ``ttl`` soniyadan beri tegilmagan yozuvlar o'chiriladi.
+
+    Qayta ishlangan update'lar belgilari (UpdateDedupMiddleware) ham shu
+    tranzaksiyada yoziladi: qayta ishga tushgandan keyin holat va belgi
+    birga saqlangan yoki birga yo'qolgan bo'ladi.
+    """
+
+    def __init__(self, path, flush_interval: float = 1.0, ttl: float = 86400):
+        self.path = str(path)
+        self.flush_interval = flush_interval
+        self.ttl = ttl
+        self.key_builder = DefaultKeyBuilder(with_bot_id=True, with_destiny=True)
+        self._records: dict[str, _Record] = {}
+        self._dirty: set[str] = set()
+        self._seen: list[tuple[str, float]] = []
+        self._flush_task: asyncio.Task | None = None
+        self._last_sweep = 0.0
+        # Barcha SQLite amallari bitta oqimda bajariladi
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="fsm-storage")
+        self._conn = None
+        self._executor.submit(self._connect).result()
+
+    # --- SQLite (executor oqimida) ---
+    def _connect(self):
+        self._conn = sqlite3.connect(self.path)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS fsm_state ("
+            " key TEXT PRIMARY KEY,"
+            " state TEXT,"
+            " data TEXT NOT NULL,"
+            " updated_at REAL NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS seen_update (key TEXT PRIMARY KEY, seen_at REAL NOT NULL)"
+        )
+        self._conn.commit()
+
+    def _load(self, key: str):
+        return self._conn.execute(
+            "SELECT state, data, updated_at FROM fsm_state WHERE key = ?", (key,)
+        ).fetchone()
+
+    def _load_seen(self, limit):
+        return [row[0] for row in self._conn.execute(
+            "SELECT key FROM seen_update ORDER BY seen_at DESC LIMIT ?", (limit,)
+        )][::-1]
+
+    def _write(self, upserts, deletes, expire_before, seen=()):
+        with self._conn:
+            if seen:
+                self._conn.executemany("INSERT OR IGNORE INTO seen_update (key, seen_at) VALUES (?, ?)", seen)
+            if upserts:
+                self._conn.executemany(
+                    "INSERT INTO fsm_state (key, state, data, updated_at) VALUES (?, ?, ?, ?) "
+                    "ON CONFLICT(key) DO UPDATE SET state = excluded.state, "
+                    "data = excluded.data, updated_at = excluded.updated_at",
+                    upserts,
+                )
+            if deletes:
+                self._conn.executemany("DELETE FROM fsm_state WHERE key = ?", [(k,) for k in deletes])
+            if expire_before:
+                self._conn.execute("DELETE FROM fsm_state WHERE updated_at < ?", (expire_before,))
+                self._conn.execute("DELETE FROM seen_update WHERE seen_at < ?", (expire_before,))
+
+    def _close_conn(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    async def _run(self, func, *args):
+        return await asyncio.get_running_loop().run_in_executor(self._executor, func, *args)
+
+    # --- Xotiradagi yozuvlar ---
+    async def _get_record(self, key: StorageKey) -> _Record:
+        storage_key = self.key_builder.build(key)
+        record = self._records.get(storage_key)
+        if record is None:
+            row = await self._run(self._load, storage_key)
+            # Yuklash paytida boshqa korutina yozuv yaratgan bo'lishi mumkin
+            record = self._records.get(storage_key)
+            if record is None:
+                if row and row[2] >= time.time() - self.ttl:
+                    record = _Record(state=row[0], data=json.loads(row[1]), touched_at=row[2])
+                else:
+                    record = _Record()
+                self._records[storage_key] = record
+        return record
+
+    def _mark_dirty(self, key: StorageKey, record: _Record):
+        record.touched_at = time.time()
+        self._dirty.add(self.key_builder.build(key))
+        self._schedule_flush()
+
+    def _schedule_flush(self):
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.create_task(self._flush_loop())
+
+    # --- Qayta ishlangan update'lar ---
+    async def load_seen_updates(self, limit: int) -> list[str]:
+        """Oxirgi ``limit`` ta belgi (eskisidan yangisiga)"""
+        return await self._run(self._load_seen, limit)
+
+    def add_seen_update(self, key: str):
+        self._seen.append((key, time.time()))
+        self._schedule_flush()
+
+    # --- BaseStorage ---
+    async def set_state(self, key: StorageKey, state: StateType = None) -> None:
+        record = await self._get_record(key)
+        record.state = state.state if isinstance(state, State) else state
+        self._mark_dirty(key, record)
+
+    async def get_state(self, key: StorageKey) -> str | None:
+        return (await self._get_record(key)).state
+
+    async def set_data(self, key: StorageKey, data: Mapping[str, Any]) -> None:
+        if not isinstance(data, dict):
+            msg = f"Data must be a dict or dict-like object, got {type(data).__name__}"
+            raise DataNotDictLikeError(msg)
+        record = await self._get_record(key)
+        record.data = data.copy()
+        self._mark_dirty(key, record)
+
+    async def get_data(self, key: StorageKey) -> dict[str, Any]:
+        return (await self._get_record(key)).data.copy()
+
+    async def set_record(self, key: StorageKey, state: StateType, data: Mapping[str, Any]) -> None:
+        """Holat va ma'lumotni bitta o'zgarish sifatida yozadi"""
+        record = await self._get_record(key)
+        record.state = state.state if isinstance(state, State) else state
+        record.data = dict(data)
+        self._mark_dirty(key, record)
+
+    async def flush(self):
+        """Yig'ilgan o'zgarishlarni bitta tranzaksiyada yozadi va eskirgan yozuvlarni tozalaydi"""
+        now = time.time()
+        expire_before = None
+        if now - self._last_sweep >= min(self.ttl, 600):
+            expire_before = now - self.ttl
+            self._last_sweep = now
+            for storage_key, record in list(self._records.items()):
+                if record.touched_at < expire_before and storage_key not in self._dirty:
+                    del self._records[storage_key]
+
+        dirty, self._dirty = self._dirty, set()
+        seen, self._seen = self._seen, []
+        upserts, deletes = [], []
+        for storage_key in dirty:
+            record = self._records.get(storage_key)
+            if record is None or (record.state is None and not record.data):
+                deletes.append(storage_key)
+            else:
+                upserts.append((storage_key, record.state, json.dumps(record.data), record.touched_at))
+        if not (upserts or deletes or expire_before or seen):
+            return
+        try:
+            await self._run(self._write, upserts, deletes, expire_before, seen)
+        except Exception as e:
+            self._dirty |= dirty
+            self._seen = seen + self._seen
+            logging.error("FSM holatini yozishda xatolik: %s", e)
+
+    async def _flush_loop(self):
+        while self._dirty or self._seen:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush()
+
+    async def close(self) -> None:
+        if self._flush_task is not None:
+            self._flush_task.cancel()
+            self._flush_task = None
+        await self.flush()
+        await self._run(self._close_conn)
+        self._executor.shutdown(wait=True)
+
+
+class ChatLockIsolation(BaseEventIsolation):
+    """Bitta chat (FSM kaliti) update'larini ketma-ket qayta ishlaydi.
+
+    aiogram'ning SimpleEventIsolation'idan farqi - qulflar jadvali cheklangan:
+    ``max_size`` dan oshganda eng uzoq ishlatilmagan bo'sh qulflar o'chiriladi.
+    Band yoki kutilayotgan qulflar o'chirilmaydi.
+    """
+
+    def __init__(self, max_size: int = 10000):
+        self.max_size = max_size
+        # key -> [qulf, uni ushlab turgan yoki kutayotganlar soni]
+        self._locks: OrderedDict[StorageKey, list] = OrderedDict()
+
+    @asynccontextmanager
+    async def lock(self, key: StorageKey):
+        entry = self._locks.get(key)
+        if entry is None:
+            entry = self._locks[key] = [asyncio.Lock(), 1]
+            self._evict()
+        else:
+            self._locks.move_to_end(key)
+            entry[1] += 1
+        try:
+            async with entry[0]:
+                yield
+        finally:
+            entry[1] -= 1
+
+    def _evict(self):
+        excess = len(self._locks) - self.max_size
+        if excess <= 0:
+            return
+        idle = []
+        for key, (_, users) in self._locks.items():
+            if not users:
+                idle.append(key)
+                if len(idle) == excess:
+                    break
+        for key in idle:
+            del self._locks[key]
+
+    async def close(self) -> None:
+        self._locks.clear()
@@ -0,0 +1,228 @@
+"""Supervisor rejimi: bitta webhook qabul qiluvchi va N ta worker jarayoni.
+
+Supervisor Telegram'dan kelgan update'ni ``chat_id`` xeshi bo'yicha doim bir
+xil workerga unix socket orqali uzatadi. Shu sababli bitta chatning FSM holati
+va update'lar tartibi faqat bitta jarayonda bo'ladi. Sozlamalar va katalog
+keshlari hamda umumiy yuborish limiti ``set_main.shared`` orqali kelishiladi.
+"""
+import asyncio
+import json
+import logging
+import os
+import shutil
+import signal
+import sys
+import tempfile
+import time
+import zlib
+from dataclasses import dataclass
+
+from aiogram import Bot
+from aiogram.client.bot import DefaultBotProperties
+from aiohttp import ClientError, ClientSession, UnixConnector, web
+from asgiref.sync import sync_to_async
+from django.conf import settings as django_settings
+
+from set_main.backup import bot_pid_path, remove_quietly, restore_ack_path, restore_lock_path
+from set_main.catalog import seed_default_catalog
+from bot.db import close_connections
+from bot.loader import get_bot_settings, set_bot_commands
+from bot.logs import setup_logging
+from bot.webhook import WORKER_UPDATE_PATH, get_webhook_secret
+
+
+def shard_of(chat_id, workers: int) -> int:
+    # crc32 barcha jarayonlarda bir xil (hash() kabi tasodifiy emas)
+    if chat_id is None:
+        return 0
+    return zlib.crc32(str(chat_id).encode()) % workers
+
+
+def update_chat_id(update: dict):
+    """Update tegishli chat (bo'lmasa foydalanuvchi) id'si - FSM kaliti bilan bir xil"""
+    for key, payload in update.items():
+        if key == 'update_id' or not isinstance(payload, dict):
+            continue
+        chat = payload.get('chat') or (payload.get('message') or {}).get('chat')
+        if chat:
+            return chat['id']
+        user = payload.get('from') or payload.get('user')
+        if user:
+            return user['id']
+    return None
+
+
+def worker_socket_path(directory, index: int) -> str:
+    return os.path.join(directory, f'worker-{index}.sock')
+
+
+@dataclass
+class Worker:
+    index: int
+    count: int
+    socket_path: str
+
+    def owns(self, chat_id) -> bool:
+        return shard_of(chat_id, self.count) == self.index
+
+
+class Supervisor:
+    def __init__(self, workers: int):
+        self.workers = workers
+        self.directory = None
+        self.secret = None
+        self._processes: list[asyncio.subprocess.Process | None] = [None] * workers
+        self._sessions: list[ClientSession] = []
+        self._stopping = False
+
+    def socket_path(self, index: int) -> str:
+        return worker_socket_path(self.directory, index)
+
+    async def _spawn(self, index: int):
+        # Alohida sessiyada: terminaldagi Ctrl+C faqat supervisor'ga keladi,
+        # workerlarni u o'zi tartib bilan to'xtatadi
+        return await asyncio.create_subprocess_exec(
+            sys.executable, str(django_settings.BASE_DIR / 'manage.py'), 'bot',
+            '--worker-index', str(index), '--workers', str(self.workers), '--socket-dir', self.directory,
+            start_new_session=True,
+        )
+
+    async def _watch(self, index: int):
+        """Workerni ishga tushiradi va to'xtab qolsa, qayta ishga tushiradi"""
+        delay = 1
+        while not self._stopping:
+            started = time.monotonic()
+            process = self._processes[index] = await self._spawn(index)
+            code = await process.wait()
+            if self._stopping:
+                return
+            delay = 1 if time.monotonic() - started > 60 else min(delay * 2, 30)
+            logging.error("Worker %s to'xtadi (kod %s), %s soniyadan keyin qayta ishga tushiriladi", index, code, delay)
+            await asyncio.sleep(delay)
+
+    async def _wait_ready(self, timeout: float = 60):
+        deadline = time.monotonic() + timeout
+        while not all(os.path.exists(self.socket_path(i)) for i in range(self.workers)):
+            if time.monotonic() > deadline:
+                raise RuntimeError(f"Workerlar {timeout:.0f} soniya ichida ishga tushmadi")
+            await asyncio.sleep(0.1)
+
+    async def _forward(self, request: web.Request) -> web.Response:
+        if request.headers.get('X-Telegram-Bot-Api-Secret-Token') != self.secret:
+            return web.Response(status=401)
+        body = await request.read()
+        try:
+            update = json.loads(body)
+        except ValueError:
+            return web.Response(status=400)
+        index = shard_of(update_chat_id(update), self.workers)
+        try:
+            async with self._sessions[index].post(
+                f'http://worker{WORKER_UPDATE_PATH}', data=body, headers={'Content-Type': 'application/json'}
+            ) as response:
+                return web.Response(status=response.status, body=await response.read(), content_type='application/json')
+        except ClientError as e:
+            # Telegram update'ni keyinroq qayta yuboradi
+            logging.warning("Worker %s ga update uzatilmadi: %s", index, e)
+            return web.Response(status=503)
+
+    async def _relay_restore(self, db_path):
+        """restore_db bilan kelishuv: barcha workerlar bazadan uzilgach umumiy ack beriladi"""
+        lock_path, ack_path = restore_lock_path(db_path), restore_ack_path(db_path)
+        while True:
+            if os.path.exists(lock_path):
+                if not os.path.exists(ack_path) and all(
+                    os.path.exists(f'{ack_path}.{i}') for i in range(self.workers)
+                ):
+                    with open(ack_path, 'w') as f:
+                        f.write(str(os.getpid()))
+            elif os.path.exists(ack_path):
+                remove_quietly(ack_path)
+            await asyncio.sleep(0.2)
+
+    async def run(self):
+        settings = await get_bot_settings()
+        if not settings.webhook_url:
+            raise ValueError("Supervisor rejimi faqat webhook bilan ishlaydi. Admin panelida webhook URL kiriting.")
+        self.secret = get_webhook_secret(settings)
+        bot = Bot(token=settings.bot_token, default=DefaultBotProperties(parse_mode='HTML'))
+        db_path = str(django_settings.DATABASES['default']['NAME'])
+        await sync_to_async(seed_default_catalog)()
+        try:
+            await set_bot_commands(bot)
+        except Exception:
+            await bot.session.close()
+            raise
+        # Supervisor bundan keyin bazaga murojaat qilmaydi va restore_db pauzasida
+        # qatnashmaydi: ochiq qolgan ulanish almashtirilgan faylning WAL'ini o'chirib yuborishi mumkin
+        await close_connections()
+
+        self.directory = tempfile.mkdtemp(prefix='bot-workers-')
+        with open(bot_pid_path(db_path), 'w') as f:
+            f.write(str(os.getpid()))
+        self._sessions = [
+            ClientSession(connector=UnixConnector(path=self.socket_path(i))) for i in range(self.workers)
+        ]
+        tasks = [asyncio.create_task(self._watch(i)) for i in range(self.workers)]
+        tasks.append(asyncio.create_task(self._relay_restore(db_path)))
+
+        app = web.Application()
+        app.router.add_post(settings.webhook_path, self._forward)
+        runner = web.AppRunner(app)
+        stop = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for signum in (signal.SIGTERM, signal.SIGINT):
+            loop.add_signal_handler(signum, stop.set)
+        try:
+            await self._wait_ready()
+            await runner.setup()
+            await web.TCPSite(runner, host=settings.webapp_host, port=settings.webapp_port).start()
+            await bot.set_webhook(
+                settings.webhook_url,
+                secret_token=self.secret,
+                max_connections=django_settings.BOT_WEBHOOK_MAX_CONCURRENCY,
+            )
+            logging.info(
+                "Supervisor %s:%s%s da tinglamoqda, %s ta worker",
+                settings.webapp_host, settings.webapp_port, settings.webhook_path, self.workers,
+            )
+            await stop.wait()
+        finally:
+            self._stopping = True
+            try:
+                await bot.delete_webhook()
+            except Exception as e:
+                logging.error("Webhook o'chirishda xatolik: %s", e)
+            await runner.cleanup()
+            await self._stop_workers()
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            for session in self._sessions:
+                await session.close()
+            await bot.session.close()
+            remove_quietly(bot_pid_path(db_path))
+            shutil.rmtree(self.directory, ignore_errors=True)
+            logging.info("Supervisor to'xtatildi")
+
+    async def _stop_workers(self, timeout: float = 30):
+        processes = [p for p in self._processes if p is not None and p.returncode is None]
+        for process in processes:
+            process.terminate()
+        try:
+            await asyncio.wait_for(asyncio.gather(*(p.wait() for p in processes)), timeout)
+        except TimeoutError:
+            for process in processes:
+                if process.returncode is None:
+                    process.kill()
+
+
+async def run_supervisor(workers: int):
+    listener = setup_logging()
+    try:
+        await Supervisor(workers).run()
+    except Exception as e:
+        logging.error("Supervisor xatoligi: %s", e)
+        raise
+    finally:
+        listener.stop()
@@ -0,0 +1,92 @@
+import asyncio
+import hashlib
+import logging
+import signal
+
+from aiogram import Bot, Dispatcher
+from aiogram.webhook.aiohttp_server import SimpleRequestHandler, setup_application
+from aiohttp import web
+from django.conf import settings as django_settings
+
+# Supervisor rejimida worker update'larni shu yo'l bo'yicha unix socket orqali oladi
+WORKER_UPDATE_PATH = '/update'
+
+
+def get_webhook_secret(settings) -> str:
+    """Webhook uchun maxfiy token (admin kiritmagan bo'lsa, bot tokenidan hosil qilinadi)"""
+    if settings.webhook_secret:
+        return settings.webhook_secret
+    return hashlib.sha256(settings.bot_token.encode()).hexdigest()[:64]
+
+
+class BoundedRequestHandler(SimpleRequestHandler):
+    """Update'larni fonda, lekin cheklangan parallellik bilan qayta ishlaydi.
+
+    Limit to'lganda javob kechiktiriladi, shuning uchun Telegram
+    yangi update'larni yuborishni sekinlashtiradi.
+    """
+
+    def __init__(self, dispatcher: Dispatcher, bot: Bot, max_concurrency: int, **kwargs):
+        super().__init__(dispatcher=dispatcher, bot=bot, handle_in_background=True, **kwargs)
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def _handle_request_background(self, bot: Bot, request: web.Request) -> web.Response:
+        update = await request.json(loads=bot.session.json_loads)
+        await self._semaphore.acquire()
+        task = asyncio.create_task(self._background_feed_update(bot=bot, update=update))
+        self._background_feed_update_tasks.add(task)
+        task.add_done_callback(self._background_feed_update_tasks.discard)
+        task.add_done_callback(lambda _: self._semaphore.release())
+        return web.json_response({}, dumps=bot.session.json_dumps)
+
+
+async def run_webhook(dp: Dispatcher, bot: Bot, settings):
+    app = web.Application()
+    BoundedRequestHandler(
+        dispatcher=dp,
+        bot=bot,
+        max_concurrency=django_settings.BOT_WEBHOOK_MAX_CONCURRENCY,
+        secret_token=get_webhook_secret(settings),
+    ).register(app, path=settings.webhook_path)
+    setup_application(app, dp, bot=bot)
+
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, host=settings.webapp_host, port=settings.webapp_port)
+    await site.start()
+    logging.info(
+        "Webhook server %s:%s%s da tinglamoqda", settings.webapp_host, settings.webapp_port, settings.webhook_path
+    )
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await runner.cleanup()
+
+
+async def run_worker_server(dp: Dispatcher, bot: Bot, worker):
+    """Supervisor yuborgan update'larni ``worker.socket_path`` unix socketida qabul qiladi.
+
+    Maxfiy token supervisor'da tekshiriladi; socket faqat shu foydalanuvchi
+    o'qiy oladigan vaqtinchalik katalogda yaratiladi.
+    """
+    app = web.Application()
+    BoundedRequestHandler(
+        dispatcher=dp,
+        bot=bot,
+        max_concurrency=django_settings.BOT_WEBHOOK_MAX_CONCURRENCY,
+    ).register(app, path=WORKER_UPDATE_PATH)
+    setup_application(app, dp, bot=bot)
+
+    runner = web.AppRunner(app)
+    await runner.setup()
+    await web.UnixSite(runner, worker.socket_path).start()
+    logging.info("Worker %s/%s %s da tinglamoqda", worker.index, worker.count, worker.socket_path)
+
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for signum in (signal.SIGTERM, signal.SIGINT):
+        loop.add_signal_handler(signum, stop.set)
+    try:
+        await stop.wait()
+    finally:
+        await runner.cleanup()
@@ -14,3 +14,9 @@ from django.core.asgi import get_asgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'set_app.settings')
 
 application = get_asgi_application()
+
+# restore_db web jarayoni ishlab turganda bazani almashtirmaydi
+from django.conf import settings  # noqa: E402
+from set_main.backup import register_web_process  # noqa: E402
+
+register_web_process(settings.DATABASES['default']['NAME'])
@@ -79,6 +79,18 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        'OPTIONS': {
+            # Yozuvchi tranzaksiyalar boshidanoq qulf oladi (SQLITE_BUSY'siz kutadi)
+            'transaction_mode': 'IMMEDIATE',
+            # WAL: o'quvchilar yozuvchini, yozuvchi o'quvchilarni bloklamaydi
+            'init_command': (
+                'PRAGMA journal_mode=WAL;'
+                'PRAGMA synchronous=NORMAL;'
+                'PRAGMA busy_timeout=5000;'
+                'PRAGMA mmap_size=134217728;'
+                'PRAGMA cache_size=-16000;'
+            ),
+        },
     }
 }
 
@@ -164,3 +176,71 @@ LOGGING = {
         },
     },
 }
+
+# Bot runtime settings
+# Webhook rejimida bir vaqtda qayta ishlanadigan update'lar soni
+BOT_WEBHOOK_MAX_CONCURRENCY = int(os.environ.get('BOT_WEBHOOK_MAX_CONCURRENCY', 40))
+# BotSettings keshining yashash vaqti (soniya)
+BOT_SETTINGS_CACHE_TTL = int(os.environ.get('BOT_SETTINGS_CACHE_TTL', 60))
+# Mashina/marshrut klaviaturalari keshining yashash vaqti (boshqa jarayondagi o'zgarishlar uchun)
+BOT_CATALOG_CACHE_TTL = int(os.environ.get('BOT_CATALOG_CACHE_TTL', 300))
+# FSM holati (yarim to'ldirilgan buyurtmalar) saqlanadigan SQLite fayl
+BOT_FSM_STORAGE_PATH = os.environ.get('BOT_FSM_STORAGE_PATH', BASE_DIR / 'fsm.sqlite3')
+BOT_FSM_FLUSH_INTERVAL = float(os.environ.get('BOT_FSM_FLUSH_INTERVAL', 1.0))
+# Tashlab ketilgan formalar shu vaqtdan keyin o'chiriladi (soniya)
+BOT_FSM_TTL = int(os.environ.get('BOT_FSM_TTL', 24 * 60 * 60))
+# Bot ORM o'qishlari uchun ajratilgan oqimlar (faqat o'qish uchun ulanishlar) soni
+BOT_DB_READ_THREADS = int(os.environ.get('BOT_DB_READ_THREADS', 4))
+# Chiquvchi xabarlar navbati (Telegram limitlari: ~30 xabar/s umumiy, 1 xabar/s bitta chatga)
+BOT_OUTBOX_GLOBAL_RATE = float(os.environ.get('BOT_OUTBOX_GLOBAL_RATE', 30))
+BOT_OUTBOX_CHAT_RATE = float(os.environ.get('BOT_OUTBOX_CHAT_RATE', 1))
+BOT_OUTBOX_CHAT_BURST = float(os.environ.get('BOT_OUTBOX_CHAT_BURST', 3))
+BOT_OUTBOX_WORKERS = int(os.environ.get('BOT_OUTBOX_WORKERS', 8))
+BOT_OUTBOX_MAX_ATTEMPTS = int(os.environ.get('BOT_OUTBOX_MAX_ATTEMPTS', 5))
+# Barcha foydalanuvchilarga xabar tarqatish (tezlik BOT_OUTBOX_GLOBAL_RATE bilan cheklanadi)
+BOT_BROADCAST_CHUNK_SIZE = int(os.environ.get('BOT_BROADCAST_CHUNK_SIZE', 500))
+BOT_BROADCAST_WORKERS = int(os.environ.get('BOT_BROADCAST_WORKERS', 30))
+# Shuncha foydalanuvchidan keyin checkpoint: bot to'xtasa, ko'pi bilan shuncha xabar qayta yuboriladi
+BOT_BROADCAST_CHECKPOINT_SIZE = int(os.environ.get('BOT_BROADCAST_CHECKPOINT_SIZE', 50))
+# /api/stats/ javoblari keshi (kalit ma'lumotlar versiyasiga bog'langan, TTL faqat xotirani cheklaydi)
+STATS_API_CACHE_TTL = int(os.environ.get('STATS_API_CACHE_TTL', 300))
+# Inkremental zaxiralar katalogi va saqlash siyosati (backup_db --incremental)
+BACKUP_DIR = os.environ.get('BACKUP_DIR', BASE_DIR / 'backups')
+BACKUP_KEEP_HOURLY = int(os.environ.get('BACKUP_KEEP_HOURLY', 24))
+BACKUP_KEEP_DAILY = int(os.environ.get('BACKUP_KEEP_DAILY', 7))
+# Shuncha zaxiradan keyin yangi to'liq zaxira olinadi (tiklash zanjiri uzunligi)
+BACKUP_MAX_CHAIN = int(os.environ.get('BACKUP_MAX_CHAIN', 24))
+# Bot loglari (navbat orqali, rotatsiyali fayl). BOT_LOG_JSON=1 - har bir qator JSON
+BOT_LOG_FILE = os.environ.get('BOT_LOG_FILE', BASE_DIR / 'bot.log')
+BOT_LOG_MAX_BYTES = int(os.environ.get('BOT_LOG_MAX_BYTES', 10 * 1024 * 1024))
+BOT_LOG_BACKUP_COUNT = int(os.environ.get('BOT_LOG_BACKUP_COUNT', 5))
+BOT_LOG_JSON = os.environ.get('BOT_LOG_JSON', '0') == '1'
+BOT_LOG_LEVEL = os.environ.get('BOT_LOG_LEVEL', 'INFO')
+# Har bir update haqidagi yozuv darajasi (masalan DEBUG - oddiy ishda yozilmaydi)
+BOT_LOG_UPDATE_LEVEL = os.environ.get('BOT_LOG_UPDATE_LEVEL', 'INFO')
+# /metrics (Prometheus) beriladigan port; 0 - o'chirilgan. Webhook rejimida ham
+# ochiq webhook serverida emas, shu (standart bo'yicha localhost) portda beriladi
+BOT_METRICS_HOST = os.environ.get('BOT_METRICS_HOST', '127.0.0.1')
+BOT_METRICS_PORT = int(os.environ.get('BOT_METRICS_PORT', 0))
+# Supervisor rejimi (manage.py bot --workers N): webhook qabul qiluvchi update'larni
+# chat_id bo'yicha N ta worker jarayoniga taqsimlaydi
+BOT_WORKERS = int(os.environ.get('BOT_WORKERS', 1))
+# Jarayonlar orasidagi umumiy holat: kesh versiyalari va umumiy yuborish limiti
+BOT_SHARED_STATE_PATH = os.environ.get('BOT_SHARED_STATE_PATH', BASE_DIR / 'bot-shared.sqlite3')
+# Kesh versiyalari shu oraliqda tekshiriladi (soniya)
+BOT_SHARED_STATE_INTERVAL = float(os.environ.get('BOT_SHARED_STATE_INTERVAL', 0.5))
+# Chatlar bo'yicha qulflar jadvali hajmi (eng uzoq ishlatilmaganlari o'chiriladi)
+BOT_CHAT_LOCKS = int(os.environ.get('BOT_CHAT_LOCKS', 10000))
+# Takroriy update'larni aniqlash uchun eslab qolinadigan oxirgi update'lar soni
+BOT_DEDUP_SIZE = int(os.environ.get('BOT_DEDUP_SIZE', 10000))
+# Foydalanuvchi bo'yicha cheklov (token bucket): soniyasiga RATE ta, ketma-ket BURST tagacha.
+# block - "tugmalardan foydalaning" javoblari, text - boshqa xabarlar, callback - tugmalar.
+# RATE=0 - guruh cheklanmaydi
+BOT_THROTTLE_BLOCK_RATE = float(os.environ.get('BOT_THROTTLE_BLOCK_RATE', 0.1))
+BOT_THROTTLE_BLOCK_BURST = int(os.environ.get('BOT_THROTTLE_BLOCK_BURST', 2))
+BOT_THROTTLE_TEXT_RATE = float(os.environ.get('BOT_THROTTLE_TEXT_RATE', 1))
+BOT_THROTTLE_TEXT_BURST = int(os.environ.get('BOT_THROTTLE_TEXT_BURST', 5))
+BOT_THROTTLE_CALLBACK_RATE = float(os.environ.get('BOT_THROTTLE_CALLBACK_RATE', 2))
+BOT_THROTTLE_CALLBACK_BURST = int(os.environ.get('BOT_THROTTLE_CALLBACK_BURST', 10))
+# To'lgan bucket'lar shu oraliqda xotiradan tozalanadi (soniya)
+BOT_THROTTLE_SWEEP_INTERVAL = float(os.environ.get('BOT_THROTTLE_SWEEP_INTERVAL', 60))
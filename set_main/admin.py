@@ -1,5 +1,28 @@
 from django.contrib import admin
-from .models import Car, Route, User, Order, BotSettings
+from django.contrib.admin.views.main import ORDER_VAR
+from django.core.paginator import Paginator
+from django.db.models import Case, IntegerField, Value, When
+from django.utils.functional import cached_property
+from . import search, stats
+from .models import Car, Route, User, Order, BotSettings, Broadcast
+
+
+class CounterPaginator(Paginator):
+    """Filtrsiz ro'yxatda COUNT(*) o'rniga statistika hisoblagichidan foydalanadi"""
+    counter_name = 'orders'
+
+    @cached_property
+    def count(self):
+        query = getattr(self.object_list, 'query', None)
+        if query is not None and not query.where:
+            return stats.totals()[self.counter_name]
+        return super().count
+
+
+# Admin qidiruvida moslik darajasi bo'yicha tartiblanadigan eng yaxshi natijalar soni;
+# qolganlari ulardan keyin yangi buyurtmalar birinchi tartibida chiqadi
+SEARCH_RANKED_LIMIT = 500
+
 
 @admin.register(Car)
 class CarAdmin(admin.ModelAdmin):
@@ -15,7 +38,8 @@ class RouteAdmin(admin.ModelAdmin):
 
 @admin.register(User)
 class UserAdmin(admin.ModelAdmin):
-    list_display = ['user_id', 'full_name', 'phone', 'created_at']
+    list_display = ['user_id', 'full_name', 'phone', 'is_blocked', 'created_at']
+    list_filter = ['is_blocked']
     search_fields = ['user_id', 'full_name', 'phone']
     ordering = ['-created_at']
     readonly_fields = ['user_id', 'created_at']
@@ -23,10 +47,17 @@ class UserAdmin(admin.ModelAdmin):
 @admin.register(Order)
 class OrderAdmin(admin.ModelAdmin):
     list_display = ['id', 'user', 'direction', 'date', 'trip_type', 'car', 'created_at']
+    list_select_related = ['user']
     list_filter = ['trip_type', 'date', 'created_at']
+    date_hierarchy = 'created_at'
+    paginator = CounterPaginator
+    # Filtrlanganda jami sonini alohida COUNT(*) bilan hisoblamaslik uchun
+    show_full_result_count = False
+    raw_id_fields = ['user']
     search_fields = ['user__full_name', 'direction', 'car', 'phone']
     ordering = ['-created_at']
     readonly_fields = ['created_at']
+    search_help_text = 'Ism, telefon, manzil, izoh, mashina yoki yo\'nalish bo\'yicha (kamida 3 ta belgi)'
     fieldsets = (
         ('Asosiy ma\'lumotlar', {
             'fields': ('user', 'direction', 'date', 'phone')
@@ -40,6 +71,22 @@ class OrderAdmin(admin.ModelAdmin):
         }),
     )
 
+    def get_search_results(self, request, queryset, search_term):
+        # FTS5 indeksidan qidiriladi; juda qisqa so'zlarda odatiy LIKE qidiruvi ishlaydi
+        expression = search.match_expression(search_term)
+        if expression is None:
+            return super().get_search_results(request, queryset, search_term)
+        ranked = search.search_order_ids(search_term, limit=SEARCH_RANKED_LIMIT)
+        rank = Case(
+            *(When(id=order_id, then=Value(position)) for position, order_id in enumerate(ranked)),
+            default=Value(len(ranked)), output_field=IntegerField(),
+        )
+        queryset = queryset.filter(id__in=search.matching_ids(expression))
+        if ORDER_VAR not in request.GET:
+            # Ustun bo'yicha tartib tanlanmagan bo'lsa eng mos buyurtmalar birinchi
+            queryset = queryset.order_by(rank, '-created_at', '-pk')
+        return queryset, False
+
 @admin.register(BotSettings)
 class BotSettingsAdmin(admin.ModelAdmin):
     list_display = ['bot_token', 'admin_id', 'webhook_url']
@@ -48,7 +95,7 @@ class BotSettingsAdmin(admin.ModelAdmin):
             'fields': ('bot_token', 'admin_id')
         }),
         ('Webhook sozlamalari', {
-            'fields': ('webhook_url', 'webhook_path', 'webapp_host', 'webapp_port'),
+            'fields': ('webhook_url', 'webhook_path', 'webhook_secret', 'webapp_host', 'webapp_port'),
             'classes': ('collapse',)
         }),
     )
@@ -56,3 +103,9 @@ class BotSettingsAdmin(admin.ModelAdmin):
     def has_add_permission(self, request):
         # Faqat bitta sozlama bo'lishi mumkin
         return not BotSettings.objects.exists()
+
+@admin.register(Broadcast)
+class BroadcastAdmin(admin.ModelAdmin):
+    list_display = ['id', 'status', 'sent', 'blocked', 'failed', 'created_at', 'finished_at']
+    list_filter = ['status']
+    readonly_fields = ['from_chat_id', 'message_id', 'last_user_pk', 'sent', 'failed', 'blocked', 'created_at', 'finished_at']
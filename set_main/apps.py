@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class SetMainConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'set_main'
+
+    def ready(self):
+        from . import signals  # noqa: F401
@@ -0,0 +1,394 @@
+"""SQLite ma'lumotlar bazasini ishlab turgan holatda zaxiralash va tiklash yordamchilari.
+
+Nusxa ``sqlite3.Connection.backup`` bilan sahifama-sahifa olinadi. Manba
+ulanishida butun nusxa davomida o'qish tranzaksiyasi ochiq turadi: WAL
+rejimida bu yozuvchilarni to'xtatmaydi, lekin nusxa bitta izchil holatdan
+olinadi va boshqa ulanishlar yozganda backup qaytadan boshlanib ketmaydi.
+
+Inkremental zaxiralar (``BackupSet``) shu nusxaning sahifalarini xeshlaydi
+va faqat oldingi zaxiradan beri o'zgargan sahifalarni saqlaydi. Zanjir
+(to'liq zaxira + inkrementlar) ``manifest.json`` faylida yoziladi.
+"""
+import atexit
+import gzip
+import hashlib
+import json
+import os
+import shutil
+import sqlite3
+import struct
+import time
+from dataclasses import dataclass
+from datetime import datetime
+
+COMPRESSIONS = ('gzip', 'zstd')
+EXTENSIONS = {'gzip': '.gz', 'zstd': '.zst'}
+CHUNK_SIZE = 1024 * 1024
+
+
+@dataclass
+class BackupResult:
+    pages: int
+    page_size: int
+    elapsed: float
+
+    @property
+    def size(self) -> int:
+        return self.pages * self.page_size
+
+    @property
+    def throughput(self) -> float:
+        """MB/s"""
+        return self.size / (1024 * 1024) / self.elapsed if self.elapsed else 0.0
+
+
+def _zstd():
+    try:
+        import zstandard
+    except ImportError:
+        raise RuntimeError("zstd siqish uchun 'zstandard' paketini o'rnating: pip install zstandard")
+    return zstandard
+
+
+def check_compression(compression):
+    """Siqish turi uchun kerakli paket o'rnatilganini nusxa olishdan oldin tekshiradi"""
+    if compression == 'zstd':
+        _zstd()
+
+
+def copy_database(db_path, dest_path, step_pages=1024, progress=None):
+    """Bazaning izchil nusxasini ``dest_path`` ga yozadi.
+
+    ``progress(copied, total)`` har bir qadamdan keyin chaqiriladi.
+    """
+    source = sqlite3.connect(f'file:{db_path}?mode=ro', uri=True, isolation_level=None)
+    dest = sqlite3.connect(dest_path)
+    started = time.monotonic()
+    try:
+        # Snapshot: nusxa davomida manba shu holatda "muzlatiladi"
+        source.execute('BEGIN')
+        page_size = source.execute('PRAGMA page_size').fetchone()[0]
+        source.execute('SELECT count(*) FROM sqlite_master').fetchone()
+        total = 0
+
+        def on_step(status, remaining, pages):
+            nonlocal total
+            total = pages
+            if progress:
+                progress(pages - remaining, pages)
+
+        source.backup(dest, pages=step_pages, progress=on_step)
+        source.execute('COMMIT')
+        # Zaxira WAL faylsiz, bitta fayl bo'lib qolishi uchun
+        dest.execute('PRAGMA journal_mode=DELETE')
+    finally:
+        dest.close()
+        source.close()
+    return BackupResult(pages=total, page_size=page_size, elapsed=time.monotonic() - started)
+
+
+def check_schema(path):
+    """(xatolar, ogohlantirishlar): zaxira shu loyiha bazasi ekanini va kod bilan mosligini tekshiradi"""
+    from django.apps import apps
+    from django.db.migrations.loader import MigrationLoader
+
+    connection = sqlite3.connect(f'file:{path}?mode=ro', uri=True)
+    try:
+        tables = {row[0] for row in connection.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+        if 'django_migrations' not in tables:
+            return ['django_migrations jadvali yo\'q - bu loyiha bazasi emas'], []
+        applied = set(connection.execute('SELECT app, name FROM django_migrations'))
+    finally:
+        connection.close()
+
+    errors = []
+    known = set(MigrationLoader(None, ignore_no_migrations=True).disk_migrations)
+    for app, name in sorted(applied - known):
+        errors.append(f'Noma\'lum migratsiya {app}.{name}: zaxira yangiroq kod bilan olingan')
+    warnings = [
+        f'{model._meta.db_table} jadvali yo\'q: tiklangandan keyin "manage.py migrate" bajaring'
+        for model in apps.get_app_config('set_main').get_models()
+        if model._meta.db_table not in tables
+    ]
+    return errors, warnings
+
+
+def integrity_check(path):
+    """Xatolar ro'yxatini qaytaradi (bo'sh ro'yxat - baza butun)"""
+    connection = sqlite3.connect(f'file:{path}?mode=ro', uri=True)
+    try:
+        rows = [row[0] for row in connection.execute('PRAGMA integrity_check')]
+    finally:
+        connection.close()
+    return [] if rows == ['ok'] else rows
+
+
+def _open_write(path, compression):
+    if compression == 'gzip':
+        return gzip.open(path, 'wb', compresslevel=6)
+    if compression == 'zstd':
+        return _zstd().ZstdCompressor(threads=-1).stream_writer(open(path, 'wb'), closefd=True)
+    if compression is None:
+        return open(path, 'wb')
+    raise ValueError(f"Noma'lum siqish turi: {compression}")
+
+
+def compress_file(src_path, dest_path, compression):
+    """Faylni bo'laklab (butunicha xotiraga o'qimasdan) siqadi"""
+    with open(src_path, 'rb') as src, _open_write(dest_path, compression) as dest:
+        shutil.copyfileobj(src, dest, CHUNK_SIZE)
+
+
+def compression_of(path):
+    """Fayl kengaytmasidan siqish turini aniqlaydi (siqilmagan bo'lsa None)"""
+    for compression, extension in EXTENSIONS.items():
+        if str(path).endswith(extension):
+            return compression
+    return None
+
+
+def open_backup(path):
+    """Zaxira faylni (siqilgan bo'lsa ochib) o'qish uchun oqim qaytaradi"""
+    compression = compression_of(path)
+    if compression == 'gzip':
+        return gzip.open(path, 'rb')
+    if compression == 'zstd':
+        return _zstd().ZstdDecompressor().stream_reader(open(path, 'rb'), closefd=True)
+    return open(path, 'rb')
+
+
+# --- Inkremental zaxira ---
+HASH_SIZE = 16
+INCREMENT_MAGIC = b'SQLINCR1'
+INCREMENT_HEADER = struct.Struct('>II')  # page_size, page_count
+PAGE_NUMBER = struct.Struct('>I')
+
+
+def page_hashes(path, page_size):
+    """Har bir sahifaning blake2b xeshlari (ketma-ket, HASH_SIZE baytdan)"""
+    digests = bytearray()
+    with open(path, 'rb') as f:
+        while page := f.read(page_size):
+            digests += hashlib.blake2b(page, digest_size=HASH_SIZE).digest()
+    return bytes(digests)
+
+
+def write_increment(snapshot_path, dest_path, page_size, old_hashes, compression=None):
+    """Oldingi xeshlardan farq qiladigan sahifalarni yozadi; (yangi xeshlar, o'zgargan sahifalar soni)"""
+    digests = bytearray()
+    changed = 0
+    page_count = os.path.getsize(snapshot_path) // page_size
+    with open(snapshot_path, 'rb') as src, _open_write(dest_path, compression) as dest:
+        dest.write(INCREMENT_MAGIC + INCREMENT_HEADER.pack(page_size, page_count))
+        for number in range(page_count):
+            page = src.read(page_size)
+            digest = hashlib.blake2b(page, digest_size=HASH_SIZE).digest()
+            digests += digest
+            if old_hashes[number * HASH_SIZE:(number + 1) * HASH_SIZE] != digest:
+                dest.write(PAGE_NUMBER.pack(number) + page)
+                changed += 1
+    return bytes(digests), changed
+
+
+def apply_increment(db_path, increment_path):
+    """Inkrement sahifalarini ``db_path`` fayliga yozadi va hajmini moslaydi"""
+    with open_backup(increment_path) as src, open(db_path, 'r+b') as db:
+        if src.read(len(INCREMENT_MAGIC)) != INCREMENT_MAGIC:
+            raise ValueError(f'Inkremental zaxira fayli emas: {increment_path}')
+        page_size, page_count = INCREMENT_HEADER.unpack(src.read(INCREMENT_HEADER.size))
+        while number := src.read(PAGE_NUMBER.size):
+            db.seek(PAGE_NUMBER.unpack(number)[0] * page_size)
+            db.write(src.read(page_size))
+        db.truncate(page_count * page_size)
+
+
+class BackupSet:
+    """Katalogdagi to'liq va inkremental zaxiralar zanjiri.
+
+    Har bir yozuv: name, type (full/incremental), parent, created_at, file,
+    hashes, page_size, pages, changed, size. Inkrement o'zidan oldingi
+    zaxiraga nisbatan olinadi, shuning uchun tiklashda to'liq zaxiradan
+    boshlab zanjir ketma-ket qo'llanadi.
+    """
+
+    def __init__(self, directory):
+        self.directory = str(directory)
+        self.manifest_path = os.path.join(self.directory, 'manifest.json')
+        self.entries = []
+        if os.path.exists(self.manifest_path):
+            with open(self.manifest_path) as f:
+                self.entries = json.load(f)['backups']
+
+    def path(self, filename):
+        return os.path.join(self.directory, filename)
+
+    def save(self):
+        os.makedirs(self.directory, exist_ok=True)
+        tmp_path = self.manifest_path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump({'backups': self.entries}, f, indent=2)
+        os.replace(tmp_path, self.manifest_path)
+
+    def get(self, name):
+        return next(entry for entry in self.entries if entry['name'] == name)
+
+    def chain(self, entry):
+        """Yozuvni tiklash uchun kerakli zaxiralar (to'liqdan boshlab)"""
+        chain = [entry]
+        while chain[0]['parent']:
+            chain.insert(0, self.get(chain[0]['parent']))
+        return chain
+
+    def at(self, moment):
+        """``moment`` gacha olingan eng oxirgi zaxira (yo'q bo'lsa None)"""
+        candidates = [entry for entry in self.entries if datetime.fromisoformat(entry['created_at']) <= moment]
+        return candidates[-1] if candidates else None
+
+    def add(self, snapshot_path, created_at, page_size, compression=None, max_chain=24):
+        """Nusxadan to'liq yoki inkremental zaxira yaratadi va manifestga qo'shadi"""
+        os.makedirs(self.directory, exist_ok=True)
+        parent = self.entries[-1] if self.entries else None
+        if parent and (parent['page_size'] != page_size or len(self.chain(parent)) >= max_chain):
+            parent = None
+        name = created_at.strftime('%Y%m%d_%H%M%S')
+        if any(entry['name'] == name for entry in self.entries):
+            name = f"{name}_{len(self.entries)}"
+        extension = EXTENSIONS[compression] if compression else ''
+
+        if parent is None:
+            filename = f'full_{name}.sqlite3{extension}'
+            compress_file(snapshot_path, self.path(filename + '.part'), compression)
+            hashes = page_hashes(snapshot_path, page_size)
+            changed = len(hashes) // HASH_SIZE
+        else:
+            filename = f'incr_{name}.pages{extension}'
+            with open(self.path(parent['hashes']), 'rb') as f:
+                old_hashes = f.read()
+            hashes, changed = write_increment(
+                snapshot_path, self.path(filename + '.part'), page_size, old_hashes, compression
+            )
+        os.replace(self.path(filename + '.part'), self.path(filename))
+        hashes_name = f'{name}.hashes'
+        with open(self.path(hashes_name), 'wb') as f:
+            f.write(hashes)
+
+        entry = {
+            'name': name,
+            'type': 'incremental' if parent else 'full',
+            'parent': parent['name'] if parent else None,
+            'created_at': created_at.isoformat(),
+            'file': filename,
+            'hashes': hashes_name,
+            'page_size': page_size,
+            'pages': len(hashes) // HASH_SIZE,
+            'changed': changed,
+            'size': os.path.getsize(self.path(filename)),
+        }
+        self.entries.append(entry)
+        self.save()
+        return entry
+
+    def restore(self, entry, dest_path):
+        """Zanjirni ``dest_path`` fayliga qayta tiklaydi"""
+        chain = self.chain(entry)
+        with open_backup(self.path(chain[0]['file'])) as src, open(dest_path, 'wb') as dest:
+            shutil.copyfileobj(src, dest, CHUNK_SIZE)
+        for increment in chain[1:]:
+            apply_increment(dest_path, self.path(increment['file']))
+        return chain
+
+    def prune(self, keep_hourly, keep_daily, tz=None):
+        """Har soat/kun uchun eng oxirgi zaxiralarni (va ular bog'liq zanjirni) qoldirib, qolganini o'chiradi"""
+        keep = set()
+        for bucket_format, count in (('%Y%m%d%H', keep_hourly), ('%Y%m%d', keep_daily)):
+            buckets = set()
+            for entry in reversed(self.entries):
+                if len(buckets) >= count:
+                    break
+                bucket = datetime.fromisoformat(entry['created_at']).astimezone(tz).strftime(bucket_format)
+                if bucket not in buckets:
+                    buckets.add(bucket)
+                    keep.update(e['name'] for e in self.chain(entry))
+        if self.entries:
+            keep.update(e['name'] for e in self.chain(self.entries[-1]))
+
+        removed = [entry for entry in self.entries if entry['name'] not in keep]
+        self.entries = [entry for entry in self.entries if entry['name'] in keep]
+        # Avval manifest yoziladi: fayl o'chirilib, manifest yozilmay qolsa zanjir buzilmasligi uchun
+        self.save()
+        for entry in removed:
+            remove_quietly(self.path(entry['file']))
+            remove_quietly(self.path(entry['hashes']))
+        return removed
+
+
+# --- Ishlab turgan bot bilan kelishuv (restore_db) ---
+def restore_lock_path(db_path):
+    """Mavjud bo'lsa, bot bazaga murojaatni to'xtatadi"""
+    return f'{db_path}.restore-lock'
+
+
+def restore_ack_path(db_path):
+    """Bot to'xtaganini va barcha ulanishlarini yopganini bildiradi"""
+    return f'{db_path}.restore-paused'
+
+
+def bot_pid_path(db_path):
+    return f'{db_path}.bot-pid'
+
+
+def running_bot_pid(db_path):
+    """Shu baza bilan ishlayotgan bot jarayoni pid'i (bot ishlamayotgan bo'lsa None)"""
+    try:
+        with open(bot_pid_path(db_path)) as f:
+            pid = int(f.read().strip())
+        os.kill(pid, 0)
+    except (FileNotFoundError, ValueError, ProcessLookupError):
+        return None
+    except PermissionError:
+        pass
+    return pid
+
+
+def web_pids_dir(db_path):
+    """Web (WSGI/ASGI) jarayonlari shu katalogga pid nomli fayl yozadi"""
+    return f'{db_path}.web-pids'
+
+
+def register_web_process(db_path):
+    """Web jarayonini ro'yxatga oladi; u ishlab turganda restore_db bazani almashtirmaydi"""
+    directory = web_pids_dir(db_path)
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, str(os.getpid()))
+    open(path, 'w').close()
+    atexit.register(remove_quietly, path)
+
+
+def running_web_pids(db_path):
+    """Shu baza bilan ishlayotgan web jarayonlari pid'lari (to'xtaganlarining fayllari o'chiriladi)"""
+    directory = web_pids_dir(db_path)
+    try:
+        names = os.listdir(directory)
+    except FileNotFoundError:
+        return []
+    pids = []
+    for name in names:
+        try:
+            pid = int(name)
+            os.kill(pid, 0)
+        except ValueError:
+            continue
+        except ProcessLookupError:
+            remove_quietly(os.path.join(directory, name))
+            continue
+        except PermissionError:
+            pass
+        pids.append(pid)
+    return sorted(pids)
+
+
+def remove_quietly(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
@@ -0,0 +1,56 @@
+import time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+
+from .models import BotSettings
+
+
+class BotSettingsCache:
+    """BotSettings qatorini xotirada saqlaydi va TTL tugaganda qayta o'qiydi.
+
+    ``loader`` - qatorni o'qiydigan korutina funksiyasi; bot uni o'zining
+    db_read'i bilan almashtiradi (restore_db pauzasida eski faylga ulanish ochilmaydi).
+    """
+
+    def __init__(self, ttl: float, loader=None):
+        self.ttl = ttl
+        self.loader = loader or sync_to_async(BotSettings.objects.first)
+        self._settings = None
+        self._expires_at = 0.0
+        self._generation = 0
+
+    async def get(self):
+        if time.monotonic() >= self._expires_at:
+            generation = self._generation
+            bot_settings = await self.loader()
+            # Yuklash paytida invalidate() chaqirilgan bo'lsa, eski qiymat saqlanmaydi
+            if generation == self._generation:
+                self._settings = bot_settings
+                self._expires_at = time.monotonic() + self.ttl
+            return bot_settings
+        return self._settings
+
+    async def get_admin_id(self):
+        bot_settings = await self.get()
+        return bot_settings.admin_id if bot_settings else None
+
+    def invalidate(self):
+        self._generation += 1
+        self._expires_at = 0.0
+
+
+settings_cache = BotSettingsCache(ttl=settings.BOT_SETTINGS_CACHE_TTL)
+
+
+class CatalogVersion:
+    """Car yoki Route jadvali o'zgarganda oshiriladigan hisoblagich"""
+
+    def __init__(self):
+        self.value = 0
+
+    def bump(self):
+        self.value += 1
+
+
+catalog_version = CatalogVersion()
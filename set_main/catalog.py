@@ -0,0 +1,14 @@
+from .models import Car, Route
+
+DEFAULT_CARS = ["Kaptiva", "Malibu", "Cobalt", "Gentra", "Largus", "Lasetti"]
+DEFAULT_ROUTES = ["Xorazmdan Buxoroga", "Buxorodan Xorazmga"]
+
+
+def seed_default_catalog():
+    """Jadval bo'sh bo'lsa, standart mashina va marshrutlarni qo'shadi"""
+    if not Route.objects.exists():
+        for route_name in DEFAULT_ROUTES:
+            Route.objects.get_or_create(name=route_name)
+    if not Car.objects.exists():
+        for car_name in DEFAULT_CARS:
+            Car.objects.get_or_create(name=car_name)
@@ -0,0 +1,106 @@
+"""Buyurtmalarni CSV/JSONL ko'rinishida oqim bilan eksport qilish.
+
+Buyurtmalar ``id`` bo'yicha keyset bo'laklarda o'qiladi: har bir bo'lak
+alohida qisqa so'rov, shuning uchun eksport butun vaqt davomida bazani
+band qilib turmaydi va xotira hajmi bo'lak o'lchamidan oshmaydi.
+"""
+import csv
+import datetime
+import io
+import json
+import zlib
+
+from django.utils import timezone
+
+from .models import Order
+
+FORMATS = ('csv', 'jsonl')
+FIELDS = [
+    'id', 'created_at', 'user_id', 'full_name', 'direction', 'date',
+    'phone', 'trip_type', 'car', 'address', 'comment',
+]
+
+
+def _day_start(day):
+    """Mahalliy sana boshini (aware datetime) qaytaradi - created_at indeksi ishlatilishi uchun"""
+    return timezone.make_aware(datetime.datetime.combine(day, datetime.time.min))
+
+
+def iter_order_chunks(start=None, end=None, route=None, chunk_size=1000):
+    """Buyurtmalarni ``chunk_size`` bo'laklarda (ro'yxat) qaytaradi.
+
+    ``start``/``end`` - yaratilgan sana (ikkalasi ham kiradi), ``route`` - yo'nalish nomi.
+    """
+    queryset = Order.objects.select_related('user').order_by('id')
+    if start is not None:
+        queryset = queryset.filter(created_at__gte=_day_start(start))
+    if end is not None:
+        queryset = queryset.filter(created_at__lt=_day_start(end + datetime.timedelta(days=1)))
+    if route:
+        queryset = queryset.filter(direction=route)
+
+    last_id = 0
+    while True:
+        chunk = list(queryset.filter(id__gt=last_id)[:chunk_size].iterator(chunk_size=chunk_size))
+        if not chunk:
+            return
+        yield chunk
+        last_id = chunk[-1].id
+
+
+def _row(order):
+    return {
+        'id': order.id,
+        'created_at': timezone.localtime(order.created_at).isoformat(),
+        'user_id': order.user.user_id,
+        'full_name': order.user.full_name,
+        'direction': order.direction,
+        'date': order.date.isoformat(),
+        'phone': order.phone,
+        'trip_type': order.trip_type,
+        'car': order.car,
+        'address': order.address,
+        'comment': order.comment or '',
+    }
+
+
+def render(chunks, fmt='csv'):
+    """Har bir bo'lak uchun bitta matn qismini qaytaradi"""
+    if fmt == 'csv':
+        buffer = io.StringIO()
+        writer = csv.DictWriter(buffer, fieldnames=FIELDS)
+        writer.writeheader()
+        yield buffer.getvalue()
+        for chunk in chunks:
+            buffer.seek(0)
+            buffer.truncate()
+            writer.writerows(_row(order) for order in chunk)
+            yield buffer.getvalue()
+    elif fmt == 'jsonl':
+        for chunk in chunks:
+            yield ''.join(json.dumps(_row(order), ensure_ascii=False) + '\n' for order in chunk)
+    else:
+        raise ValueError(f"Noma'lum format: {fmt}")
+
+
+def encode(parts, compress=False):
+    """Matn qismlarini baytlarga aylantiradi, kerak bo'lsa gzip bilan siqadi"""
+    if not compress:
+        for part in parts:
+            yield part.encode()
+        return
+    # wbits=31 - gzip sarlavhasi va CRC bilan
+    compressor = zlib.compressobj(wbits=31)
+    for part in parts:
+        data = compressor.compress(part.encode())
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def export_orders(fmt='csv', start=None, end=None, route=None, compress=False, chunk_size=1000):
+    """Eksport fayli baytlarini bo'laklab qaytaradi"""
+    if fmt not in FORMATS:
+        raise ValueError(f"Noma'lum format: {fmt}")
+    chunks = iter_order_chunks(start=start, end=end, route=route, chunk_size=chunk_size)
+    return encode(render(chunks, fmt), compress=compress)
@@ -1,11 +1,16 @@
 import os
-import shutil
 from datetime import datetime
 from django.core.management.base import BaseCommand
 from django.conf import settings
+from django.utils import timezone
+
+from set_main.backup import (
+    COMPRESSIONS, EXTENSIONS, BackupSet, check_compression, compress_file, copy_database, integrity_check,
+    remove_quietly,
+)
 
 class Command(BaseCommand):
-    help = 'SQLite ma\'lumotlar bazasini zaxiraga olish'
+    help = 'SQLite ma\'lumotlar bazasini zaxiraga olish (bot to\'xtatilmasdan)'
 
     def add_arguments(self, parser):
         parser.add_argument(
@@ -13,43 +18,159 @@ class Command(BaseCommand):
             type=str,
             help='Zaxira fayl nomi (ixtiyoriy)',
         )
+        parser.add_argument(
+            '--compress',
+            choices=COMPRESSIONS,
+            help='Zaxirani siqish (gzip yoki zstd)',
+        )
+        parser.add_argument(
+            '--step-pages',
+            type=int,
+            default=1024,
+            help='Bir qadamda nusxalanadigan sahifalar soni',
+        )
+        parser.add_argument(
+            '--incremental',
+            action='store_true',
+            help='BACKUP_DIR katalogiga faqat o\'zgargan sahifalarni saqlash (manifest va saqlash siyosati bilan)',
+        )
+        parser.add_argument(
+            '--keep-hourly',
+            type=int,
+            default=settings.BACKUP_KEEP_HOURLY,
+            help='--incremental: oxirgi N soat uchun zaxira saqlanadi',
+        )
+        parser.add_argument(
+            '--keep-daily',
+            type=int,
+            default=settings.BACKUP_KEEP_DAILY,
+            help='--incremental: oxirgi N kun uchun zaxira saqlanadi',
+        )
+        parser.add_argument(
+            '--no-verify',
+            action='store_true',
+            help='PRAGMA integrity_check tekshiruvini o\'tkazib yuborish',
+        )
+
+    def progress(self):
+        last_percent = -1
+
+        def report(copied, total):
+            nonlocal last_percent
+            percent = copied * 100 // total if total else 100
+            if percent // 10 != last_percent // 10:
+                last_percent = percent
+                self.stdout.write(f'  {percent}% ({copied}/{total} sahifa)')
+
+        return report
 
     def handle(self, *args, **options):
         db_path = settings.DATABASES['default']['NAME']
-        
+
         if not os.path.exists(db_path):
             self.stdout.write(
                 self.style.ERROR('Ma\'lumotlar bazasi fayli topilmadi!')
             )
             return
-        
+
+        compression = options['compress']
+        try:
+            check_compression(compression)
+        except RuntimeError as e:
+            self.stdout.write(self.style.ERROR(str(e)))
+            return
+
+        if options['incremental']:
+            self.handle_incremental(db_path, compression, options)
+            return
+
         # Zaxira fayl nomini belgilash
         if options['output']:
             backup_name = options['output']
         else:
             timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-            backup_name = f'backup_{timestamp}.sqlite3'
-        
+            backup_name = f'backup_{timestamp}.sqlite3' + (EXTENSIONS[compression] if compression else '')
+
         # Zaxira fayl yo'lini belgilash
         backup_path = os.path.join(settings.BASE_DIR, backup_name)
-        
+        # Nusxa avval vaqtinchalik faylga olinadi: tekshiruvdan o'tmagan yoki chala zaxira qolmasligi uchun
+        copy_path = backup_path + '.tmp'
+
         try:
-            # Ma'lumotlar bazasini nusxalash
-            shutil.copy2(db_path, backup_path)
-            
+            result = copy_database(db_path, copy_path, step_pages=options['step_pages'], progress=self.progress())
+
+            if not options['no_verify']:
+                errors = integrity_check(copy_path)
+                if errors:
+                    self.stdout.write(
+                        self.style.ERROR('Zaxira integrity_check tekshiruvidan o\'tmadi:\n' + '\n'.join(errors[:20]))
+                    )
+                    return
+
+            if compression:
+                compress_file(copy_path, copy_path + '.part', compression)
+                os.replace(copy_path + '.part', backup_path)
+            else:
+                os.replace(copy_path, backup_path)
+
             # Fayl hajmini olish
             size = os.path.getsize(backup_path)
             size_mb = size / (1024 * 1024)
-            
+
             self.stdout.write(
                 self.style.SUCCESS(
                     f'Ma\'lumotlar bazasi muvaffaqiyatli zaxiraga olindi!\n'
                     f'Fayl: {backup_name}\n'
                     f'Hajm: {size_mb:.2f} MB'
+                    + (f' (siqilmagan: {result.size / (1024 * 1024):.2f} MB)' if compression else '') + '\n'
+                    f'Vaqt: {result.elapsed:.2f} s, tezlik: {result.throughput:.1f} MB/s'
                 )
             )
-            
+
         except Exception as e:
             self.stdout.write(
                 self.style.ERROR(f'Zaxiraga olishda xatolik: {e}')
-            ) 
\ No newline at end of file
+            )
+        finally:
+            remove_quietly(copy_path)
+            remove_quietly(copy_path + '.part')
+
+    def handle_incremental(self, db_path, compression, options):
+        backups = BackupSet(settings.BACKUP_DIR)
+        os.makedirs(backups.directory, exist_ok=True)
+        copy_path = backups.path('snapshot.sqlite3.tmp')
+
+        try:
+            result = copy_database(db_path, copy_path, step_pages=options['step_pages'], progress=self.progress())
+
+            if not options['no_verify']:
+                errors = integrity_check(copy_path)
+                if errors:
+                    self.stdout.write(
+                        self.style.ERROR('Zaxira integrity_check tekshiruvidan o\'tmadi:\n' + '\n'.join(errors[:20]))
+                    )
+                    return
+
+            entry = backups.add(
+                copy_path, timezone.now(), result.page_size,
+                compression=compression, max_chain=settings.BACKUP_MAX_CHAIN,
+            )
+            removed = backups.prune(options['keep_hourly'], options['keep_daily'], tz=timezone.get_current_timezone())
+
+            kind = 'To\'liq' if entry['type'] == 'full' else 'Inkremental'
+            self.stdout.write(
+                self.style.SUCCESS(
+                    f'{kind} zaxira olindi: {entry["file"]}\n'
+                    f'O\'zgargan sahifalar: {entry["changed"]}/{entry["pages"]}, '
+                    f'hajm: {entry["size"] / (1024 * 1024):.2f} MB\n'
+                    f'Vaqt: {result.elapsed:.2f} s, tezlik: {result.throughput:.1f} MB/s\n'
+                    f'O\'chirilgan eski zaxiralar: {len(removed)}'
+                )
+            )
+
+        except Exception as e:
+            self.stdout.write(
+                self.style.ERROR(f'Zaxiraga olishda xatolik: {e}')
+            )
+        finally:
+            remove_quietly(copy_path)
@@ -0,0 +1,95 @@
+import asyncio
+import time
+
+from asgiref.sync import sync_to_async
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from bot import queries
+from set_main.models import BotSettings, Order, User
+
+ORDER_DATA = {
+    'direction': 'Xorazmdan Buxoroga',
+    'date': '2026-01-15',
+    'phone': '+998901234567',
+    'trip_type': 'person',
+    'car': 'Cobalt',
+    'address': 'Urganch',
+    'comment': '',
+}
+
+
+async def legacy_confirm(user_id):
+    user = await sync_to_async(User.objects.get)(user_id=user_id)
+    order = await sync_to_async(Order.objects.create)(user=user, **ORDER_DATA)
+    await sync_to_async(BotSettings.objects.first)()
+    return order
+
+
+async def native_confirm(user_id):
+    user = await User.objects.aget(user_id=user_id)
+    order = await Order.objects.acreate(user=user, **ORDER_DATA)
+    await BotSettings.objects.afirst()
+    return order
+
+
+async def queries_confirm(user_id):
+    user, order, _ = await queries.create_order(user_id, 'Bench', ORDER_DATA)
+    return order
+
+
+async def legacy_count(user_id):
+    return await sync_to_async(Order.objects.count)()
+
+
+async def native_count(user_id):
+    return await Order.objects.acount()
+
+
+async def queries_count(user_id):
+    return await queries.count_orders()
+
+
+class Command(BaseCommand):
+    help = 'Bot ORM yo\'llarini solishtirish: sync_to_async, Django async API va bot.queries'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=500, help='Har bir usul uchun chaqiruvlar soni')
+        parser.add_argument('--concurrency', type=int, default=8, help='Bir vaqtda bajariladigan chaqiruvlar')
+        parser.add_argument('--users', type=int, default=100, help='Test foydalanuvchilar soni')
+
+    def handle(self, *args, **options):
+        # Benchmark vaqtinchalik test bazasida ishlaydi, asosiy bazaga tegmaydi
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, keepdb=False)
+        try:
+            User.objects.bulk_create(
+                User(user_id=i, full_name=f'Bench {i}') for i in range(1, options['users'] + 1)
+            )
+            asyncio.run(self.run(options))
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+
+    async def run(self, options):
+        iterations = options['iterations']
+        concurrency = options['concurrency']
+        users = options['users']
+        scenarios = [
+            ('confirm_order', [('sync_to_async', legacy_confirm), ('async ORM', native_confirm), ('bot.queries', queries_confirm)]),
+            ('count', [('sync_to_async', legacy_count), ('async ORM', native_count), ('bot.queries', queries_count)]),
+        ]
+        for title, variants in scenarios:
+            self.stdout.write(f'\n{title} ({iterations} ta, parallel {concurrency}):')
+            for name, func in variants:
+                await func(1)  # isitish
+                semaphore = asyncio.Semaphore(concurrency)
+
+                async def call(i):
+                    async with semaphore:
+                        await func(i % users + 1)
+
+                start = time.perf_counter()
+                await asyncio.gather(*(call(i) for i in range(iterations)))
+                elapsed = time.perf_counter() - start
+                self.stdout.write(
+                    f'  {name:<14} {elapsed * 1e6 / iterations:9.1f} µs/chaqiruv  {iterations / elapsed:9.0f} chaqiruv/s'
+                )
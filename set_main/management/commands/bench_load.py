@@ -0,0 +1,84 @@
+import asyncio
+import os
+import tempfile
+
+from aiogram.fsm.storage.memory import MemoryStorage
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import connection, connections
+
+from set_main.backup import copy_database, running_bot_pid
+from bot.db import close_connections
+from bot.loadtest import LoadTest
+from bot.storage import SQLiteStorage
+
+
+class Command(BaseCommand):
+    help = 'Soxta Bot API serveri bilan yuklama testi: N foydalanuvchi Form oqimidan o\'tadi'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=50, help='Bir vaqtdagi foydalanuvchilar soni')
+        parser.add_argument('--latency', type=float, default=0, help='Bot API javobining kechikishi (ms)')
+        parser.add_argument('--think', type=float, default=0, help='Foydalanuvchining qadamlar orasidagi pauzasi (ms)')
+        parser.add_argument(
+            '--storage', choices=['sqlite', 'memory'], default='sqlite',
+            help='FSM storage: sqlite (vaqtinchalik faylda, bot bilan bir xil) yoki memory',
+        )
+
+    def handle(self, *args, **options):
+        database = settings.DATABASES['default']
+        live_name = str(database['NAME'])
+        pid = running_bot_pid(live_name)
+        if pid is not None:
+            self.stdout.write(self.style.ERROR(f'Bot (pid {pid}) ishlab turibdi: yuklama testidan oldin uni to\'xtating'))
+            return
+        with tempfile.TemporaryDirectory() as directory:
+            # Yuklama testi bazaning vaqtinchalik nusxasida ishlaydi: asosiy bazaga hech narsa yozilmaydi
+            copy_path = os.path.join(directory, 'db.sqlite3')
+            copy_database(live_name, copy_path)
+            connections.close_all()
+            database['NAME'] = connection.settings_dict['NAME'] = copy_path
+            try:
+                call_command('migrate', verbosity=0, interactive=False)
+                if options['storage'] == 'sqlite':
+                    storage = SQLiteStorage(
+                        os.path.join(directory, 'fsm.sqlite3'),
+                        flush_interval=settings.BOT_FSM_FLUSH_INTERVAL,
+                        ttl=settings.BOT_FSM_TTL,
+                    )
+                else:
+                    storage = MemoryStorage()
+                result = asyncio.run(self.run(options, storage))
+            finally:
+                connections.close_all()
+                database['NAME'] = connection.settings_dict['NAME'] = live_name
+
+        self.stdout.write(
+            f'\n{result.users} foydalanuvchi, Bot API kechikishi {options["latency"]:.0f} ms, '
+            f'storage: {options["storage"]}'
+        )
+        self.stdout.write(f'  {"qadam":<10} {"soni":>6} {"p50 ms":>9} {"p95 ms":>9} {"p99 ms":>9}')
+        for step, count, p50, p95, p99 in result.summary():
+            self.stdout.write(f'  {step:<10} {count:>6} {p50:>9.2f} {p95:>9.2f} {p99:>9.2f}')
+        self.stdout.write(
+            f'\nBot API chaqiruvlari: ' + ', '.join(f'{k}={v}' for k, v in sorted(result.api_calls.items()))
+        )
+        for error in result.errors[:10]:
+            self.stdout.write(self.style.WARNING(error))
+        message = (
+            f'{result.completed}/{result.users} buyurtma {result.elapsed:.2f} s da: '
+            f'{result.orders_per_second:.1f} buyurtma/s'
+        )
+        self.stdout.write(self.style.SUCCESS(message) if not result.errors else self.style.ERROR(message))
+
+    async def run(self, options, storage):
+        try:
+            return await LoadTest(
+                options['users'], storage,
+                latency=options['latency'] / 1000,
+                think=options['think'] / 1000,
+            ).run()
+        finally:
+            # Pul oqimlaridagi ulanishlar vaqtinchalik nusxaga ochilgan
+            await close_connections()
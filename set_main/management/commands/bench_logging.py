@@ -0,0 +1,107 @@
+import asyncio
+import logging
+import logging.handlers
+import os
+import queue
+import tempfile
+import time
+from types import SimpleNamespace
+
+from django.core.management.base import BaseCommand
+
+from bot.logs import TEXT_FORMAT, build_sinks
+from bot.middlewares.update_log import UpdateLogMiddleware
+
+
+async def legacy_update(update_id, user_id):
+    # Oldingi holat: handlerdagi f-string va aiogram'ning har bir update haqidagi yozuvi
+    logging.info(f"/start from user_id={user_id}")
+    logging.getLogger('aiogram.event').info(
+        f"Update id={update_id} is handled. Duration 3 ms by bot id=1"
+    )
+
+
+async def start_handler(event, data):
+    logging.debug("/start from user_id=%s", data['event_from_user'].id)
+
+
+def update_data(update_id, user_id):
+    return {
+        'handler': SimpleNamespace(callback=start_handler),
+        'event_update': SimpleNamespace(update_id=update_id),
+        'event_from_user': SimpleNamespace(id=user_id),
+        'raw_state': 'Form:phone',
+    }
+
+
+class Command(BaseCommand):
+    help = 'Bir update uchun loglash narxini o\'lchash: FileHandler (eski) va QueueHandler (matn/JSON)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--updates', type=int, default=20000, help='Har bir usul uchun update\'lar soni')
+
+    def handle(self, *args, **options):
+        root = logging.getLogger()
+        saved = root.handlers[:], root.level, logging.getLogger('aiogram.event').level
+        devnull = open(os.devnull, 'w')
+        try:
+            with tempfile.TemporaryDirectory() as directory:
+                asyncio.run(self.run(options['updates'], directory, devnull))
+        finally:
+            root.handlers, root.level = saved[0], saved[1]
+            logging.getLogger('aiogram.event').setLevel(saved[2])
+            devnull.close()
+
+    def configure(self, directory, name, use_queue, json_output=False):
+        root = logging.getLogger()
+        root.setLevel(logging.INFO)
+        logging.getLogger('aiogram.event').setLevel(logging.NOTSET if not use_queue else logging.WARNING)
+        log_file = os.path.join(directory, f'{name}.log')
+        if not use_queue:
+            formatter = logging.Formatter(TEXT_FORMAT)
+            handlers = [logging.FileHandler(log_file, encoding='utf-8'), logging.StreamHandler(self._devnull)]
+            for handler in handlers:
+                handler.setFormatter(formatter)
+            root.handlers = handlers
+            return None
+        sinks = build_sinks(log_file, json_output=json_output, console=False)
+        console = logging.StreamHandler(self._devnull)
+        console.setFormatter(sinks[0].formatter)
+        log_queue = queue.SimpleQueue()
+        listener = logging.handlers.QueueListener(log_queue, *sinks, console, respect_handler_level=True)
+        root.handlers = [logging.handlers.QueueHandler(log_queue)]
+        listener.start()
+        return listener
+
+    async def run(self, updates, directory, devnull):
+        self._devnull = devnull
+        variants = [
+            ('FileHandler (eski)', False, False, None),
+            ('Queue, matn', True, False, 'INFO'),
+            ('Queue, JSON', True, True, 'INFO'),
+            ('Queue, update DEBUG', True, False, 'DEBUG'),
+        ]
+        self.stdout.write(f'\n{updates} ta update (event loop oqimidagi vaqt):')
+        for name, use_queue, json_output, update_level in variants:
+            listener = self.configure(directory, name.replace(' ', '_'), use_queue, json_output)
+            middleware = UpdateLogMiddleware(level=update_level) if use_queue else None
+
+            start = time.perf_counter()
+            for i in range(updates):
+                if middleware:
+                    await middleware(start_handler, None, update_data(i, 1000 + i % 100))
+                else:
+                    await legacy_update(i, 1000 + i % 100)
+            elapsed = time.perf_counter() - start
+
+            drain = 0.0
+            if listener:
+                drain_start = time.perf_counter()
+                listener.stop()
+                drain = time.perf_counter() - drain_start
+            for handler in logging.getLogger().handlers + list(listener.handlers if listener else []):
+                handler.close()
+            self.stdout.write(
+                f'  {name:<22} {elapsed * 1e6 / updates:8.2f} µs/update'
+                + (f'  (fon oqimida yozish yakuni: {drain * 1000:.0f} ms)' if listener else '')
+            )
@@ -1,18 +1,43 @@
 import asyncio
 import logging
+from django.conf import settings
 from django.core.management.base import BaseCommand
 from bot.loader import main
+from bot.supervisor import Worker, run_supervisor, worker_socket_path
 
 class Command(BaseCommand):
     help = 'Telegram botni ishga tushirish'
 
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=settings.BOT_WORKERS,
+            help='Worker jarayonlari soni (1 dan ko\'p bo\'lsa supervisor rejimi, faqat webhook bilan)',
+        )
+        # Supervisor workerlarni shu argumentlar bilan ishga tushiradi
+        parser.add_argument('--worker-index', type=int, help='Ichki: worker raqami')
+        parser.add_argument('--socket-dir', type=str, help='Ichki: worker socketlari katalogi')
+
     def handle(self, *args, **options):
+        if options['worker_index'] is not None:
+            worker = Worker(
+                index=options['worker_index'],
+                count=options['workers'],
+                socket_path=worker_socket_path(options['socket_dir'], options['worker_index']),
+            )
+            asyncio.run(main(worker))
+            return
+
         self.stdout.write(
             self.style.SUCCESS('Bot ishga tushmoqda...')
         )
-        
+
         try:
-            asyncio.run(main())
+            if options['workers'] > 1:
+                asyncio.run(run_supervisor(options['workers']))
+            else:
+                asyncio.run(main())
         except KeyboardInterrupt:
             self.stdout.write(
                 self.style.WARNING('Bot to\'xtatildi')
@@ -20,4 +45,4 @@ class Command(BaseCommand):
         except Exception as e:
             self.stdout.write(
                 self.style.ERROR(f'Xatolik: {e}')
-            )
\ No newline at end of file
+            )
@@ -0,0 +1,50 @@
+import datetime
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from set_main.export import FORMATS, export_orders
+
+
+def _date(value):
+    try:
+        return datetime.date.fromisoformat(value)
+    except ValueError:
+        raise CommandError(f"Sana YYYY-MM-DD formatida bo'lishi kerak: {value}")
+
+
+class Command(BaseCommand):
+    help = 'Buyurtmalarni CSV yoki JSONL faylga eksport qilish'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--format', choices=FORMATS, default='csv', help='Fayl formati')
+        parser.add_argument('--from', dest='start', type=_date, help='Boshlang\'ich sana (YYYY-MM-DD)')
+        parser.add_argument('--to', dest='end', type=_date, help='Oxirgi sana (YYYY-MM-DD, kiradi)')
+        parser.add_argument('--route', help='Faqat shu yo\'nalish bo\'yicha')
+        parser.add_argument('--gzip', action='store_true', help='gzip bilan siqish')
+        parser.add_argument('--chunk-size', type=int, default=1000, help='Bitta so\'rovda o\'qiladigan buyurtmalar soni')
+        parser.add_argument('--output', '-o', help='Fayl nomi (berilmasa stdout)')
+
+    def handle(self, *args, **options):
+        stream = export_orders(
+            options['format'],
+            start=options['start'],
+            end=options['end'],
+            route=options['route'],
+            compress=options['gzip'],
+            chunk_size=options['chunk_size'],
+        )
+        if not options['output']:
+            for part in stream:
+                sys.stdout.buffer.write(part)
+            sys.stdout.buffer.flush()
+            return
+
+        size = 0
+        with open(options['output'], 'wb') as f:
+            for part in stream:
+                f.write(part)
+                size += len(part)
+        self.stdout.write(
+            self.style.SUCCESS(f'Buyurtmalar eksport qilindi: {options["output"]} ({size / 1024:.1f} KB)')
+        )
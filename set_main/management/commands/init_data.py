@@ -1,4 +1,5 @@
 from django.core.management.base import BaseCommand
+from set_main.catalog import DEFAULT_CARS, DEFAULT_ROUTES
 from set_main.models import Car, Route
 
 class Command(BaseCommand):
@@ -8,16 +9,7 @@ class Command(BaseCommand):
         self.stdout.write('Boshlang\'ich ma\'lumotlar qo\'shilmoqda...')
         
         # Default cars
-        default_cars = [
-            "Kaptiva",
-            "Malibu", 
-            "Cobalt",
-            "Gentra",
-            "Largus",
-            "Lasetti"
-        ]
-        
-        for car_name in default_cars:
+        for car_name in DEFAULT_CARS:
             car, created = Car.objects.get_or_create(name=car_name)
             if created:
                 self.stdout.write(f'  ✓ Mashina qo\'shildi: {car_name}')
@@ -25,12 +17,7 @@ class Command(BaseCommand):
                 self.stdout.write(f'  - Mashina mavjud: {car_name}')
         
         # Default routes
-        default_routes = [
-            "Xorazmdan Buxoroga",
-            "Buxorodan Xorazmga"
-        ]
-        
-        for route_name in default_routes:
+        for route_name in DEFAULT_ROUTES:
             route, created = Route.objects.get_or_create(name=route_name)
             if created:
                 self.stdout.write(f'  ✓ Marshrut qo\'shildi: {route_name}')
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from set_main.search import rebuild_index
+
+
+class Command(BaseCommand):
+    help = 'Buyurtmalar qidiruv indeksini (FTS5) qaytadan to\'ldirish'
+
+    def handle(self, *args, **options):
+        rebuild_index()
+        self.stdout.write(self.style.SUCCESS('Qidiruv indeksi qayta to\'ldirildi'))
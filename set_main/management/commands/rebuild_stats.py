@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from set_main.stats import rebuild_counters
+
+
+class Command(BaseCommand):
+    help = 'Statistika hisoblagichlarini jadvallardan qaytadan hisoblash'
+
+    def handle(self, *args, **options):
+        count = rebuild_counters()
+        self.stdout.write(
+            self.style.SUCCESS(f'Statistika hisoblagichlari qayta hisoblandi: {count} ta yozuv')
+        )
@@ -1,76 +1,197 @@
 import os
 import shutil
+import sqlite3
+import time
+from datetime import datetime
 from django.core.management.base import BaseCommand
 from django.conf import settings
+from django.utils import timezone
+
+from set_main.backup import (
+    CHUNK_SIZE, INCREMENT_MAGIC, BackupSet, check_schema, copy_database, integrity_check, open_backup,
+    remove_quietly, restore_ack_path, restore_lock_path, running_bot_pid, running_web_pids,
+)
 
 class Command(BaseCommand):
-    help = 'SQLite ma\'lumotlar bazasini zaxira fayldan tiklash'
+    help = (
+        'SQLite ma\'lumotlar bazasini zaxira fayldan tiklash (ishlab turgan bot bilan kelishgan holda). '
+        'Web (admin) jarayoni to\'xtatilgan bo\'lishi kerak'
+    )
 
     def add_arguments(self, parser):
         parser.add_argument(
             'backup_file',
             type=str,
-            help='Zaxira fayl nomi',
+            nargs='?',
+            help='Zaxira fayl nomi (.sqlite3, .gz yoki .zst)',
+        )
+        parser.add_argument(
+            '--point-in-time',
+            type=str,
+            help='BACKUP_DIR dagi zaxiralar zanjiridan shu vaqtdagi holatni tiklash '
+                 '("YYYY-MM-DD HH:MM[:SS]" yoki "latest")',
+        )
+        parser.add_argument(
+            '--wait',
+            type=float,
+            default=30,
+            help='Botning bazadan uzilishini kutish vaqti (soniya)',
+        )
+        parser.add_argument(
+            '--no-keep-current',
+            action='store_true',
+            help='Joriy bazaning nusxasini saqlamaslik',
         )
 
-    def handle(self, *args, **options):
-        backup_file = options['backup_file']
-        db_path = settings.DATABASES['default']['NAME']
-        
+    def build_point_in_time(self, value, dest_path):
+        """Zanjirni ``dest_path`` fayliga yig'adi; xatolikda False qaytaradi"""
+        backups = BackupSet(settings.BACKUP_DIR)
+        if value == 'latest':
+            entry = backups.entries[-1] if backups.entries else None
+        else:
+            try:
+                moment = datetime.fromisoformat(value)
+            except ValueError:
+                self.stdout.write(self.style.ERROR(f'Noto\'g\'ri vaqt formati: {value}'))
+                return False
+            if timezone.is_naive(moment):
+                moment = timezone.make_aware(moment)
+            entry = backups.at(moment)
+        if entry is None:
+            self.stdout.write(self.style.ERROR(f'{value} gacha olingan zaxira topilmadi'))
+            return False
+
+        chain = backups.restore(entry, dest_path)
+        self.stdout.write(
+            f'Zaxira {entry["name"]} ({entry["created_at"]}) yig\'ildi: '
+            f'{chain[0]["file"]} + {len(chain) - 1} inkrement'
+        )
+        return True
+
+    def extract(self, backup_file, dest_path):
+        """Zaxirani (siqilgan bo'lsa ochib) bo'laklab ``dest_path`` ga yozadi; xatolikda False"""
         # Zaxira fayl yo'lini tekshirish
         if not os.path.isabs(backup_file):
             backup_file = os.path.join(settings.BASE_DIR, backup_file)
-        
+
         if not os.path.exists(backup_file):
             self.stdout.write(
                 self.style.ERROR(f'Zaxira fayli topilmadi: {backup_file}')
             )
+            return False
+
+        with open_backup(backup_file) as src, open(dest_path, 'wb') as dest:
+            head = src.read(len(INCREMENT_MAGIC))
+            if head == INCREMENT_MAGIC:
+                self.stdout.write(self.style.ERROR('Bu inkremental zaxira: --point-in-time bilan tiklang'))
+                return False
+            dest.write(head)
+            shutil.copyfileobj(src, dest, CHUNK_SIZE)
+        return True
+
+    def verify(self, path):
+        errors = integrity_check(path)
+        schema_errors, warnings = check_schema(path) if not errors else ([], [])
+        for warning in warnings:
+            self.stdout.write(self.style.WARNING(warning))
+        if errors or schema_errors:
+            self.stdout.write(
+                self.style.ERROR('Zaxira tekshiruvdan o\'tmadi:\n' + '\n'.join((errors + schema_errors)[:20]))
+            )
+            return False
+        return True
+
+    def web_stopped(self, db_path):
+        """Web jarayoni bazaga yozishni to'xtatish protokolida qatnashmaydi - u ishlamasligi kerak"""
+        pids = running_web_pids(db_path)
+        if pids:
+            self.stdout.write(self.style.ERROR(
+                f'Web jarayoni ishlayapti (pid {", ".join(map(str, pids))}): uni to\'xtatib, qayta urinib ko\'ring'
+            ))
+            return False
+        return True
+
+    def pause_bot(self, db_path, wait):
+        """Lock faylini yaratadi va bot (ishlayotgan bo'lsa) bazadan uzilishini kutadi"""
+        lock_path = restore_lock_path(db_path)
+        with open(lock_path, 'w') as f:
+            f.write(str(os.getpid()))
+        pid = running_bot_pid(db_path)
+        if pid is None:
+            return True
+        self.stdout.write(f'Bot (pid {pid}) to\'xtatilishi kutilmoqda...')
+        deadline = time.monotonic() + wait
+        while time.monotonic() < deadline:
+            if os.path.exists(restore_ack_path(db_path)):
+                return True
+            time.sleep(0.1)
+        self.stdout.write(self.style.ERROR(f'Bot {wait:.0f} soniya ichida bazadan uzilmadi, tiklash bekor qilindi'))
+        return False
+
+    def handle(self, *args, **options):
+        db_path = str(settings.DATABASES['default']['NAME'])
+        if not options['point_in_time'] and not options['backup_file']:
+            self.stdout.write(self.style.ERROR('Zaxira fayl nomi yoki --point-in-time ko\'rsatilishi kerak'))
             return
-        
-        # Joriy ma'lumotlar bazasini zaxiraga olish
-        current_backup = None
-        if os.path.exists(db_path):
-            current_backup = f'current_backup_{os.path.basename(db_path)}'
-            current_backup_path = os.path.join(settings.BASE_DIR, current_backup)
-            shutil.copy2(db_path, current_backup_path)
-            self.stdout.write(f'Joriy ma\'lumotlar bazasi zaxiraga olindi: {current_backup}')
-        
+
+        # Vaqtinchalik fayl baza bilan bir katalogda: os.replace atomar bo'lishi uchun
+        tmp_path = f'{db_path}.restore-tmp'
+        lock_path = restore_lock_path(db_path)
         try:
-            # Zaxira fayldan tiklash
-            shutil.copy2(backup_file, db_path)
-            
+            if options['point_in_time']:
+                ready = self.build_point_in_time(options['point_in_time'], tmp_path)
+            else:
+                ready = self.extract(options['backup_file'], tmp_path)
+            if not ready or not self.verify(tmp_path):
+                return
+
+            if not self.web_stopped(db_path) or not self.pause_bot(db_path, options['wait']):
+                return
+
+            # Joriy ma'lumotlar bazasini zaxiraga olish
+            current_backup = None
+            if os.path.exists(db_path):
+                if not options['no_keep_current']:
+                    current_backup = f'current_backup_{os.path.basename(db_path)}'
+                    copy_database(db_path, os.path.join(settings.BASE_DIR, current_backup))
+                    self.stdout.write(f'Joriy ma\'lumotlar bazasi zaxiraga olindi: {current_backup}')
+                # WAL'dagi barcha yozuvlar asosiy faylga o'tkaziladi, so'ng eski -wal/-shm keraksiz
+                connection = sqlite3.connect(db_path)
+                try:
+                    connection.execute('PRAGMA wal_checkpoint(TRUNCATE)')
+                finally:
+                    connection.close()
+
+            # Bot kutilayotganda web ishga tushirilgan bo'lishi mumkin
+            if not self.web_stopped(db_path):
+                return
+            os.replace(tmp_path, db_path)
+            remove_quietly(f'{db_path}-wal')
+            remove_quietly(f'{db_path}-shm')
+
             # Fayl hajmini olish
             size = os.path.getsize(db_path)
             size_mb = size / (1024 * 1024)
-            
+
             self.stdout.write(
                 self.style.SUCCESS(
                     f'Ma\'lumotlar bazasi muvaffaqiyatli tiklandi!\n'
-                    f'Fayl: {os.path.basename(backup_file)}\n'
                     f'Hajm: {size_mb:.2f} MB'
                 )
             )
-            
+
             if current_backup:
                 self.stdout.write(
                     self.style.WARNING(
                         f'Eslatma: Joriy ma\'lumotlar bazasi {current_backup} faylida saqlandi'
                     )
                 )
-            
+
         except Exception as e:
             self.stdout.write(
                 self.style.ERROR(f'Tiklashda xatolik: {e}')
             )
-            
-            # Xatolik bo'lsa, joriy ma'lumotlar bazasini tiklash
-            if current_backup and os.path.exists(current_backup_path):
-                try:
-                    shutil.copy2(current_backup_path, db_path)
-                    self.stdout.write(
-                        self.style.SUCCESS('Joriy ma\'lumotlar bazasi tiklandi')
-                    )
-                except Exception as restore_error:
-                    self.stdout.write(
-                        self.style.ERROR(f'Joriy ma\'lumotlar bazasini tiklashda xatolik: {restore_error}')
-                    ) 
\ No newline at end of file
+        finally:
+            remove_quietly(tmp_path)
+            # Lock olib tashlangach bot yangi bazaga ulanib ishni davom ettiradi
+            remove_quietly(lock_path)
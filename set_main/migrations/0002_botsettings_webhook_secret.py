@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-18 11:58
+
+import django.core.validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('set_main', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='botsettings',
+            name='webhook_secret',
+            field=models.CharField(blank=True, default='', max_length=256, validators=[django.core.validators.RegexValidator('^[A-Za-z0-9_-]{1,256}$', 'Faqat A-Z, a-z, 0-9, _ va - belgilari (1-256 ta)')], verbose_name='Webhook Secret'),
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 6.1.2 on 2026-10-18 12:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('set_main', '0002_botsettings_webhook_secret'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ChatCommandScope',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('chat_id', models.BigIntegerField(unique=True, verbose_name='Chat ID')),
+                ('commands_hash', models.CharField(max_length=64, verbose_name='Buyruqlar xeshi')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Chat buyruqlari',
+                'verbose_name_plural': 'Chat buyruqlari',
+            },
+        ),
+    ]
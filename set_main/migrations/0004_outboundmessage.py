@@ -0,0 +1,28 @@
+# Generated by Django 6.1.2 on 2026-10-18 12:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('set_main', '0003_chatcommandscope'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OutboundMessage',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('chat_id', models.BigIntegerField(verbose_name='Chat ID')),
+                ('text', models.TextField(verbose_name='Matn')),
+                ('parse_mode', models.CharField(blank=True, default='', max_length=20, verbose_name='Parse mode')),
+                ('attempts', models.PositiveIntegerField(default=0, verbose_name='Urinishlar')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'Navbatdagi xabar',
+                'verbose_name_plural': 'Navbatdagi xabarlar',
+            },
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 6.1.2 on 2026-10-18 12:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('set_main', '0004_outboundmessage'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Broadcast',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('text', models.TextField(blank=True, verbose_name='Matn')),
+                ('from_chat_id', models.BigIntegerField(verbose_name='Manba chat')),
+                ('message_id', models.BigIntegerField(verbose_name='Manba xabar')),
+                ('status', models.CharField(choices=[('running', 'Yuborilmoqda'), ('done', 'Tugallandi')], default='running', max_length=10, verbose_name='Holat')),
+                ('last_user_pk', models.BigIntegerField(default=0, verbose_name='Oxirgi foydalanuvchi (checkpoint)')),
+                ('sent', models.PositiveIntegerField(default=0, verbose_name='Yuborildi')),
+                ('failed', models.PositiveIntegerField(default=0, verbose_name='Xatolik')),
+                ('blocked', models.PositiveIntegerField(default=0, verbose_name='Bloklagan')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True, verbose_name='Tugagan vaqt')),
+            ],
+            options={
+                'verbose_name': 'Xabar tarqatish',
+                'verbose_name_plural': 'Xabar tarqatishlar',
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.AddField(
+            model_name='user',
+            name='is_blocked',
+            field=models.BooleanField(default=False, verbose_name='Botni bloklagan'),
+        ),
+    ]
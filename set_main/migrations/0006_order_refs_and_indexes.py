@@ -0,0 +1,36 @@
+# Generated by Django 6.1.2 on 2026-10-18 12:08
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('set_main', '0005_broadcast'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='order',
+            name='car_ref',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='orders', to='set_main.car', verbose_name="Mashina (bog'langan)"),
+        ),
+        migrations.AddField(
+            model_name='order',
+            name='route_ref',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='orders', to='set_main.route', verbose_name="Marshrut (bog'langan)"),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['date', 'direction'], name='order_date_direction_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['user', 'created_at'], name='order_user_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['created_at'], name='order_created_idx'),
+        ),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 6.1.2 on 2026-10-18 12:08
+
+from django.db import migrations
+
+BATCH_SIZE = 5000
+
+
+def backfill_order_refs(apps, schema_editor):
+    Order = apps.get_model('set_main', 'Order')
+    Route = apps.get_model('set_main', 'Route')
+    Car = apps.get_model('set_main', 'Car')
+    routes = dict(Route.objects.values_list('name', 'id'))
+    cars = dict(Car.objects.values_list('name', 'id'))
+
+    last_pk = 0
+    while True:
+        # pk bo'yicha bo'laklab: har bir bo'lak alohida tranzaksiyada yangilanadi
+        pks = list(
+            Order.objects.filter(pk__gt=last_pk).order_by('pk').values_list('pk', flat=True)[:BATCH_SIZE]
+        )
+        if not pks:
+            break
+        batch = Order.objects.filter(pk__gte=pks[0], pk__lte=pks[-1])
+        for name, route_id in routes.items():
+            batch.filter(route_ref__isnull=True, direction=name).update(route_ref=route_id)
+        for name, car_id in cars.items():
+            batch.filter(car_ref__isnull=True, car=name).update(car_ref=car_id)
+        last_pk = pks[-1]
+
+
+class Migration(migrations.Migration):
+    # Katta jadvalda bazani butun migratsiya davomida qulflamaslik uchun
+    atomic = False
+
+    dependencies = [
+        ('set_main', '0006_order_refs_and_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_order_refs, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,53 @@
+# Generated by Django 6.1.2 on 2026-10-18 12:10
+
+from django.db import migrations, models
+from django.db.models import Count, F
+from django.db.models.functions import TruncDate
+
+
+def build_counters(apps, schema_editor):
+    # set_main.stats.rebuild_counters ning shu migratsiya vaqtidagi muzlatilgan nusxasi:
+    # keyingi o'zgarishlar bu migratsiya bajaradigan ishni o'zgartirmasligi uchun
+    Counter = apps.get_model('set_main', 'StatCounter')
+    Order = apps.get_model('set_main', 'Order')
+    rows = [
+        Counter(name=name, value=apps.get_model('set_main', model).objects.count())
+        for name, model in (('orders', 'Order'), ('users', 'User'), ('cars', 'Car'), ('routes', 'Route'))
+    ]
+    fields = {'route': 'direction', 'car': 'car', 'trip_type': 'trip_type'}
+    for dimension, bucket in (('day', TruncDate('created_at')), *((d, F(f)) for d, f in fields.items())):
+        queryset = Order.objects.annotate(bucket=bucket).values_list('bucket')
+        for value_bucket, value in queryset.annotate(value=Count('id')).order_by():
+            rows.append(Counter(name='orders', dimension=dimension, bucket=str(value_bucket), value=value))
+    for dimension, field in fields.items():
+        queryset = Order.objects.annotate(day=TruncDate('created_at')).values_list('day', field)
+        for day, bucket, value in queryset.annotate(value=Count('id')).order_by():
+            rows.append(Counter(name='orders', dimension=f'day_{dimension}', bucket=f'{day}|{bucket}', value=value))
+    Counter.objects.all().delete()
+    Counter.objects.bulk_create(rows + [Counter(name='version', value=1)])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('set_main', '0007_backfill_order_refs'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StatCounter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=20, verbose_name='Nomi')),
+                ('dimension', models.CharField(blank=True, default='', max_length=20, verbose_name='Guruhlash')),
+                ('bucket', models.CharField(blank=True, default='', max_length=255, verbose_name='Qiymat')),
+                ('value', models.BigIntegerField(default=0, verbose_name='Soni')),
+            ],
+            options={
+                'verbose_name': 'Statistika hisoblagichi',
+                'verbose_name_plural': 'Statistika hisoblagichlari',
+                'constraints': [models.UniqueConstraint(fields=('name', 'dimension', 'bucket'), name='statcounter_unique_key')],
+            },
+        ),
+        migrations.RunPython(build_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 6.1.2 on 2026-10-18 12:12
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('set_main', '0008_statcounter'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='statcounter',
+            name='updated_at',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+    ]
@@ -0,0 +1,69 @@
+from django.db import migrations
+
+TABLE = 'order_search'
+
+# Migratsiya o'z nusxasini muzlatib saqlaydi; ishlab turgan kod
+# set_main.search.rebuild_sql() dan foydalanadi
+
+REBUILD_SQL = f"""
+INSERT INTO {TABLE}(rowid, address, comment, phone, direction, car, full_name)
+SELECT o.id, o.address, o.comment, o.phone, o.direction, o.car, u.full_name
+FROM set_main_order o JOIN set_main_user u ON u.id = o.user_id
+"""
+
+CREATE_SQL = [
+    f"""
+    CREATE VIRTUAL TABLE {TABLE} USING fts5(
+        address, comment, phone, direction, car, full_name,
+        tokenize = 'trigram'
+    )
+    """,
+    f"""
+    CREATE TRIGGER order_search_insert AFTER INSERT ON set_main_order BEGIN
+        INSERT INTO {TABLE}(rowid, address, comment, phone, direction, car, full_name)
+        VALUES (new.id, new.address, new.comment, new.phone, new.direction, new.car,
+                (SELECT full_name FROM set_main_user WHERE id = new.user_id));
+    END
+    """,
+    f"""
+    CREATE TRIGGER order_search_update
+    AFTER UPDATE OF address, comment, phone, direction, car, user_id ON set_main_order BEGIN
+        DELETE FROM {TABLE} WHERE rowid = old.id;
+        INSERT INTO {TABLE}(rowid, address, comment, phone, direction, car, full_name)
+        VALUES (new.id, new.address, new.comment, new.phone, new.direction, new.car,
+                (SELECT full_name FROM set_main_user WHERE id = new.user_id));
+    END
+    """,
+    f"""
+    CREATE TRIGGER order_search_delete AFTER DELETE ON set_main_order BEGIN
+        DELETE FROM {TABLE} WHERE rowid = old.id;
+    END
+    """,
+    f"""
+    CREATE TRIGGER order_search_user_update
+    AFTER UPDATE OF full_name ON set_main_user WHEN old.full_name IS NOT new.full_name BEGIN
+        UPDATE {TABLE} SET full_name = new.full_name
+        WHERE rowid IN (SELECT id FROM set_main_order WHERE user_id = new.id);
+    END
+    """,
+    REBUILD_SQL,
+]
+
+DROP_SQL = [
+    'DROP TRIGGER IF EXISTS order_search_user_update',
+    'DROP TRIGGER IF EXISTS order_search_delete',
+    'DROP TRIGGER IF EXISTS order_search_update',
+    'DROP TRIGGER IF EXISTS order_search_insert',
+    f'DROP TABLE IF EXISTS {TABLE}',
+]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('set_main', '0009_statcounter_updated_at'),
+    ]
+
+    operations = [
+        migrations.RunSQL(CREATE_SQL, DROP_SQL),
+    ]
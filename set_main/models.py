@@ -1,3 +1,4 @@
+from django.core.validators import RegexValidator
 from django.db import models
 from django.utils import timezone
 
@@ -27,6 +28,7 @@ class User(models.Model):
     user_id = models.BigIntegerField(verbose_name='Telegram ID', unique=True)
     full_name = models.CharField(max_length=200, verbose_name='To\'liq ism')
     phone = models.CharField(max_length=20, verbose_name='Telefon raqam', blank=True, null=True)
+    is_blocked = models.BooleanField(verbose_name='Botni bloklagan', default=False)
     created_at = models.DateTimeField(auto_now_add=True)
     
     def __str__(self) -> str:
@@ -48,8 +50,12 @@ class Order(models.Model):
     phone = models.CharField(max_length=20, verbose_name='Telefon raqam')
     trip_type = models.CharField(max_length=10, choices=TRIP_TYPE_CHOICES, verbose_name='Sayohat turi')
     car = models.CharField(max_length=100, verbose_name='Mashina')
+    route_ref = models.ForeignKey(Route, on_delete=models.SET_NULL, null=True, blank=True, related_name='orders', verbose_name='Marshrut (bog\'langan)')
+    car_ref = models.ForeignKey(Car, on_delete=models.SET_NULL, null=True, blank=True, related_name='orders', verbose_name='Mashina (bog\'langan)')
     address = models.TextField(verbose_name='Manzil')
     comment = models.TextField(verbose_name='Izoh', blank=True, null=True)
+    # Bitta forma ikki marta tasdiqlansa, ikkinchi buyurtma yaratilmaydi
+    idempotency_key = models.CharField(max_length=64, blank=True, null=True, editable=False, verbose_name='Forma kaliti')
     created_at = models.DateTimeField(auto_now_add=True)
     
     def __str__(self) -> str:
@@ -59,12 +65,29 @@ class Order(models.Model):
         verbose_name = 'Buyurtma'
         verbose_name_plural = 'Buyurtmalar'
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['date', 'direction'], name='order_date_direction_idx'),
+            models.Index(fields=['user', 'created_at'], name='order_user_created_idx'),
+            models.Index(fields=['created_at'], name='order_created_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['idempotency_key'],
+                condition=models.Q(idempotency_key__isnull=False),
+                name='order_idempotency_key_uniq',
+            ),
+        ]
 
 class BotSettings(models.Model):
     bot_token = models.CharField(max_length=200, verbose_name='Bot Token')
     admin_id = models.BigIntegerField(verbose_name='Admin ID')
     webhook_url = models.CharField(max_length=200, verbose_name='Webhook URL', blank=True, null=True)
     webhook_path = models.CharField(max_length=50, verbose_name='Webhook Path', default='/webhook')
+    webhook_secret = models.CharField(
+        max_length=256, verbose_name='Webhook Secret', blank=True, default='',
+        # Telegram secret_token uchun faqat shu belgilarni qabul qiladi
+        validators=[RegexValidator(r'^[A-Za-z0-9_-]{1,256}$', "Faqat A-Z, a-z, 0-9, _ va - belgilari (1-256 ta)")],
+    )
     webapp_host = models.CharField(max_length=50, verbose_name='WebApp Host', default='0.0.0.0')
     webapp_port = models.IntegerField(verbose_name='WebApp Port', default=8080)
     
@@ -74,3 +97,71 @@ class BotSettings(models.Model):
     class Meta:
         verbose_name = 'Bot sozlamalari'
         verbose_name_plural = 'Bot sozlamalari'
+
+class ChatCommandScope(models.Model):
+    chat_id = models.BigIntegerField(verbose_name='Chat ID', unique=True)
+    commands_hash = models.CharField(max_length=64, verbose_name='Buyruqlar xeshi')
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    def __str__(self) -> str:
+        return f"{self.chat_id}"
+    
+    class Meta:
+        verbose_name = 'Chat buyruqlari'
+        verbose_name_plural = 'Chat buyruqlari'
+
+class OutboundMessage(models.Model):
+    chat_id = models.BigIntegerField(verbose_name='Chat ID')
+    text = models.TextField(verbose_name='Matn')
+    parse_mode = models.CharField(max_length=20, verbose_name='Parse mode', blank=True, default='')
+    attempts = models.PositiveIntegerField(verbose_name='Urinishlar', default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    def __str__(self) -> str:
+        return f"Xabar #{self.id} -> {self.chat_id}"
+    
+    class Meta:
+        verbose_name = 'Navbatdagi xabar'
+        verbose_name_plural = 'Navbatdagi xabarlar'
+
+class Broadcast(models.Model):
+    STATUS_CHOICES = [
+        ('running', 'Yuborilmoqda'),
+        ('done', 'Tugallandi'),
+    ]
+    
+    text = models.TextField(verbose_name='Matn', blank=True)
+    from_chat_id = models.BigIntegerField(verbose_name='Manba chat')
+    message_id = models.BigIntegerField(verbose_name='Manba xabar')
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='running', verbose_name='Holat')
+    last_user_pk = models.BigIntegerField(verbose_name='Oxirgi foydalanuvchi (checkpoint)', default=0)
+    sent = models.PositiveIntegerField(verbose_name='Yuborildi', default=0)
+    failed = models.PositiveIntegerField(verbose_name='Xatolik', default=0)
+    blocked = models.PositiveIntegerField(verbose_name='Bloklagan', default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(verbose_name='Tugagan vaqt', blank=True, null=True)
+    
+    def __str__(self) -> str:
+        return f"Xabar tarqatish #{self.id}"
+    
+    class Meta:
+        verbose_name = 'Xabar tarqatish'
+        verbose_name_plural = 'Xabar tarqatishlar'
+        ordering = ['-created_at']
+
+class StatCounter(models.Model):
+    name = models.CharField(max_length=20, verbose_name='Nomi')
+    dimension = models.CharField(max_length=20, verbose_name='Guruhlash', blank=True, default='')
+    bucket = models.CharField(max_length=255, verbose_name='Qiymat', blank=True, default='')
+    value = models.BigIntegerField(verbose_name='Soni', default=0)
+    updated_at = models.DateTimeField(default=timezone.now)
+    
+    def __str__(self) -> str:
+        return f"{self.name}:{self.dimension}:{self.bucket} = {self.value}"
+    
+    class Meta:
+        verbose_name = 'Statistika hisoblagichi'
+        verbose_name_plural = 'Statistika hisoblagichlari'
+        constraints = [
+            models.UniqueConstraint(fields=['name', 'dimension', 'bucket'], name='statcounter_unique_key'),
+        ]
@@ -0,0 +1,64 @@
+"""Buyurtmalar bo'yicha to'liq matnli qidiruv (SQLite FTS5).
+
+``order_search`` virtual jadvali (0010 migratsiyasi) Order.address, comment,
+phone, direction, car va foydalanuvchi full_name maydonlarini saqlaydi; rowid =
+Order.id. Jadval triggerlar bilan yangilanadi, shuning uchun bulk va
+boshqa jarayondagi yozuvlar ham indeksga tushadi. Trigram tokenizer
+``LIKE '%...%'`` kabi so'z o'rtasidan (masalan, telefon qismidan) qidiradi.
+"""
+from django.db import connection, transaction
+from django.db.models.expressions import RawSQL
+
+TABLE = 'order_search'
+# Indeksdagi Order maydonlari (ustunlar tartibi 0010 migratsiyasidagi jadval bilan bir xil);
+# oxirgi ustun - foydalanuvchining full_name maydoni
+ORDER_COLUMNS = ('address', 'comment', 'phone', 'direction', 'car')
+# Trigram tokenizer 3 belgidan qisqa so'zlarni topa olmaydi
+MIN_TERM_LENGTH = 3
+
+
+def match_expression(query):
+    """Qidiruv matnidan FTS5 MATCH ifodasini yasaydi; mos so'z bo'lmasa None"""
+    terms = [term for term in query.split() if len(term) >= MIN_TERM_LENGTH]
+    if not terms:
+        return None
+    # Har bir so'z alohida iqtibos ichida - FTS5 sintaksisi (OR, NEAR, *, ...) ishlamaydi
+    return ' AND '.join('"' + term.replace('"', '""') + '"' for term in terms)
+
+
+def matching_ids(expression):
+    """Order querysetini filtrlash uchun ``id__in`` subquery"""
+    return RawSQL(f'SELECT rowid FROM {TABLE} WHERE {TABLE} MATCH %s', [expression])
+
+
+def search_order_ids(query, limit=10):
+    """Mos buyurtmalar id'larini moslik darajasi (bm25) bo'yicha qaytaradi"""
+    expression = match_expression(query)
+    if expression is None:
+        return []
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'SELECT rowid FROM {TABLE} WHERE {TABLE} MATCH %s ORDER BY rank LIMIT %s',
+            [expression, limit],
+        )
+        return [row[0] for row in cursor.fetchall()]
+
+
+def rebuild_sql():
+    """Order va User jadvallaridan indeksni to'ldiruvchi INSERT ... SELECT"""
+    columns = ', '.join(ORDER_COLUMNS)
+    values = ', '.join(f'o.{column}' for column in ORDER_COLUMNS)
+    return (
+        f'INSERT INTO {TABLE}(rowid, {columns}, full_name) '
+        f'SELECT o.id, {values}, u.full_name '
+        'FROM set_main_order o JOIN set_main_user u ON u.id = o.user_id'
+    )
+
+
+def rebuild_index():
+    """Indeksni Order va User jadvallaridan qaytadan to'ldiradi"""
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {TABLE}')
+        cursor.execute(rebuild_sql())
+        cursor.execute(f"INSERT INTO {TABLE}({TABLE}) VALUES ('optimize')")
+
@@ -0,0 +1,103 @@
+"""Jarayonlar orasidagi umumiy holat (alohida SQLite fayli).
+
+Bot bir nechta worker jarayonida ishlaganda (``manage.py bot --workers N``)
+sozlamalar va katalog keshlarini bekor qilish hamda Bot API'ning umumiy
+yuborish limiti shu fayl orqali kelishiladi. Versiyalarni admin panel
+(web jarayoni) ham oshiradi, shuning uchun u yerdagi o'zgarishlar botga
+kesh TTL'ini kutmasdan yetib boradi.
+"""
+import sqlite3
+import time
+
+from django.conf import settings
+
+
+class SharedState:
+    def __init__(self, path):
+        self.path = str(path)
+        self._ready = False
+
+    def _connect(self):
+        # Har bir chaqiruv o'z ulanishida: funksiyalar turli oqim va jarayonlardan chaqiriladi
+        conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+        if not self._ready:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("CREATE TABLE IF NOT EXISTS versions (name TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS buckets ("
+                " name TEXT PRIMARY KEY,"
+                " tokens REAL NOT NULL,"
+                " updated_at REAL NOT NULL,"
+                " paused_until REAL NOT NULL DEFAULT 0)"
+            )
+            self._ready = True
+        return conn
+
+    # --- Versiyalar ---
+    def bump(self, name: str):
+        conn = self._connect()
+        try:
+            conn.execute(
+                "INSERT INTO versions (name, value) VALUES (?, 1) "
+                "ON CONFLICT(name) DO UPDATE SET value = value + 1",
+                (name,),
+            )
+        finally:
+            conn.close()
+
+    def versions(self) -> dict[str, int]:
+        conn = self._connect()
+        try:
+            return dict(conn.execute("SELECT name, value FROM versions"))
+        finally:
+            conn.close()
+
+    # --- Umumiy token bucket ---
+    def take(self, name: str, rate: float, capacity: float) -> float:
+        """Token olinsa 0, aks holda kutish vaqtini qaytaradi (``pause`` ham hisobga olinadi)"""
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            now = time.time()
+            row = conn.execute(
+                "SELECT tokens, updated_at, paused_until FROM buckets WHERE name = ?", (name,)
+            ).fetchone()
+            tokens, updated_at, paused_until = row if row else (capacity, now, 0.0)
+            if paused_until > now:
+                conn.execute("ROLLBACK")
+                return paused_until - now
+            tokens = min(capacity, tokens + (now - updated_at) * rate)
+            wait = 0.0
+            if tokens >= 1:
+                tokens -= 1
+            else:
+                wait = (1 - tokens) / rate
+            conn.execute(
+                "INSERT INTO buckets (name, tokens, updated_at, paused_until) VALUES (?, ?, ?, 0) "
+                "ON CONFLICT(name) DO UPDATE SET tokens = excluded.tokens, updated_at = excluded.updated_at",
+                (name, tokens, now),
+            )
+            conn.execute("COMMIT")
+            return wait
+        except BaseException:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+
+    def pause(self, name: str, seconds: float):
+        """429 javobidan keyin barcha jarayonlarda yuborishni to'xtatib turadi"""
+        conn = self._connect()
+        try:
+            until = time.time() + seconds
+            conn.execute(
+                "INSERT INTO buckets (name, tokens, updated_at, paused_until) VALUES (?, 0, ?, ?) "
+                "ON CONFLICT(name) DO UPDATE SET paused_until = MAX(paused_until, excluded.paused_until)",
+                (name, time.time(), until),
+            )
+        finally:
+            conn.close()
+
+
+shared_state = SharedState(settings.BOT_SHARED_STATE_PATH)
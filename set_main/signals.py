@@ -0,0 +1,69 @@
+from collections import Counter
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from . import stats
+from .cache import catalog_version, settings_cache
+from .models import BotSettings, Car, Order, Route, User
+from .shared import shared_state
+
+
+@receiver([post_save, post_delete], sender=BotSettings)
+def invalidate_bot_settings(sender, **kwargs):
+    settings_cache.invalidate()
+    # Boshqa jarayonlar (bot workerlari) o'zgarish commit bo'lgach qayta o'qiydi
+    transaction.on_commit(lambda: shared_state.bump('settings'))
+
+
+@receiver([post_save, post_delete], sender=Car)
+@receiver([post_save, post_delete], sender=Route)
+def bump_catalog_version(sender, **kwargs):
+    catalog_version.bump()
+    transaction.on_commit(lambda: shared_state.bump('catalog'))
+
+
+# --- Statistika hisoblagichlari ---
+COUNTER_NAMES = {User: 'users', Car: 'cars', Route: 'routes'}
+
+
+@receiver(post_save, sender=User)
+@receiver(post_save, sender=Car)
+@receiver(post_save, sender=Route)
+def count_created(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        stats.apply_deltas({(COUNTER_NAMES[sender], '', ''): 1})
+
+
+@receiver(post_delete, sender=User)
+@receiver(post_delete, sender=Car)
+@receiver(post_delete, sender=Route)
+def count_deleted(sender, instance, **kwargs):
+    stats.apply_deltas({(COUNTER_NAMES[sender], '', ''): -1})
+
+
+@receiver(pre_save, sender=Order)
+def remember_order_keys(sender, instance, raw=False, **kwargs):
+    # Tahrirlashda eski guruhlardan ayirish uchun avvalgi qiymatlar saqlanadi
+    if instance.pk and not raw:
+        old = Order.objects.filter(pk=instance.pk).first()
+        instance._old_stat_keys = stats.order_keys(old) if old else None
+
+
+@receiver(post_save, sender=Order)
+def count_order_saved(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    deltas = Counter(stats.order_keys(instance))
+    if not created:
+        old_keys = getattr(instance, '_old_stat_keys', None)
+        if old_keys is None:
+            return
+        deltas.subtract(old_keys)
+    stats.apply_deltas(deltas)
+
+
+@receiver(post_delete, sender=Order)
+def count_order_deleted(sender, instance, **kwargs):
+    stats.apply_deltas({key: -1 for key in stats.order_keys(instance)})
@@ -0,0 +1,126 @@
+from django.apps import apps as django_apps
+from django.db import transaction
+from django.db.models import Count, F
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .models import StatCounter
+
+# Order uchun guruhlashlar: dimension -> buyurtmadan qiymat olish
+ORDER_DIMENSIONS = {
+    'day': lambda order: timezone.localdate(order.created_at).isoformat(),
+    'route': lambda order: order.direction,
+    'car': lambda order: order.car,
+    'trip_type': lambda order: order.trip_type,
+}
+# Vaqt oralig'i bo'yicha guruhlash uchun kun bilan birga saqlanadigan guruhlar:
+# dimension 'day_route', bucket 'YYYY-MM-DD|<yo'nalish>'
+WINDOW_DIMENSIONS = ('route', 'car', 'trip_type')
+WINDOW_SEPARATOR = '|'
+# Har qanday hisoblagich o'zgarganda oshiriladigan versiya (API keshi va ETag uchun)
+VERSION_KEY = ('version', '', '')
+
+
+def order_keys(order):
+    keys = [('orders', '', '')]
+    keys += [('orders', dimension, get(order)) for dimension, get in ORDER_DIMENSIONS.items()]
+    day = ORDER_DIMENSIONS['day'](order)
+    keys += [
+        ('orders', f'day_{dimension}', f'{day}{WINDOW_SEPARATOR}{ORDER_DIMENSIONS[dimension](order)}')
+        for dimension in WINDOW_DIMENSIONS
+    ]
+    return keys
+
+
+def apply_deltas(deltas):
+    """{(name, dimension, bucket): delta} bo'yicha hisoblagichlarni o'zgartiradi"""
+    deltas = {key: delta for key, delta in deltas.items() if delta}
+    if not deltas:
+        return
+    deltas[VERSION_KEY] = 1
+    now = timezone.now()
+    with transaction.atomic():
+        for (name, dimension, bucket), delta in deltas.items():
+            updated = StatCounter.objects.filter(name=name, dimension=dimension, bucket=bucket).update(
+                value=F('value') + delta, updated_at=now
+            )
+            if not updated:
+                StatCounter.objects.create(name=name, dimension=dimension, bucket=bucket, value=delta, updated_at=now)
+
+
+def version():
+    """(versiya, oxirgi o'zgarish vaqti) - hisoblagichlar o'zgarmagan bo'lsa bir xil qoladi"""
+    name, dimension, bucket = VERSION_KEY
+    row = StatCounter.objects.filter(name=name, dimension=dimension, bucket=bucket).values_list(
+        'value', 'updated_at'
+    ).first()
+    return row or (0, None)
+
+
+def totals():
+    """{'orders': .., 'users': .., 'cars': .., 'routes': ..} - bitta so'rov bilan"""
+    counts = dict(StatCounter.objects.filter(dimension='').values_list('name', 'value'))
+    return {name: counts.get(name, 0) for name in ('orders', 'users', 'cars', 'routes')}
+
+
+def breakdown(dimension, name='orders', start=None, end=None):
+    """{bucket: value} ko'rinishida guruhlangan hisoblagichlar.
+
+    ``start``/``end`` (ISO sana, ikkalasi ham kiradi) berilsa, faqat shu
+    oraliqdagi kunlar hisobga olinadi.
+    """
+    if start is None and end is None:
+        return dict(
+            StatCounter.objects.filter(name=name, dimension=dimension).order_by('bucket').values_list('bucket', 'value')
+        )
+    queryset = StatCounter.objects.filter(name=name)
+    if dimension != 'day':
+        queryset = queryset.filter(dimension=f'day_{dimension}')
+    else:
+        queryset = queryset.filter(dimension='day')
+    # Bucket ISO sana bilan boshlanadi, shuning uchun oraliq satrlar solishtiruvi bilan olinadi
+    if start is not None:
+        queryset = queryset.filter(bucket__gte=start)
+    if end is not None:
+        queryset = queryset.filter(bucket__lt=f'{end}{WINDOW_SEPARATOR}\uffff')
+    result = {}
+    for bucket, value in queryset.values_list('bucket', 'value'):
+        if dimension != 'day':
+            bucket = bucket.split(WINDOW_SEPARATOR, 1)[1]
+        result[bucket] = result.get(bucket, 0) + value
+    return dict(sorted(result.items()))
+
+
+def rebuild_counters(get_model=django_apps.get_model):
+    """Barcha hisoblagichlarni jadvallardan qaytadan hisoblaydi"""
+    Counter = get_model('set_main', 'StatCounter')
+    Order = get_model('set_main', 'Order')
+    rows = [
+        Counter(name=name, value=get_model('set_main', model).objects.count())
+        for name, model in (('orders', 'Order'), ('users', 'User'), ('cars', 'Car'), ('routes', 'Route'))
+    ]
+    fields = {'route': 'direction', 'car': 'car', 'trip_type': 'trip_type'}
+    groupings = {
+        'day': Order.objects.annotate(bucket=TruncDate('created_at')),
+        'route': Order.objects.annotate(bucket=F('direction')),
+        'car': Order.objects.annotate(bucket=F('car')),
+        'trip_type': Order.objects.annotate(bucket=F('trip_type')),
+    }
+    for dimension, queryset in groupings.items():
+        for bucket, value in queryset.values_list('bucket').annotate(value=Count('id')).order_by():
+            rows.append(Counter(name='orders', dimension=dimension, bucket=str(bucket), value=value))
+    for dimension in WINDOW_DIMENSIONS:
+        queryset = Order.objects.annotate(day=TruncDate('created_at')).values_list('day', fields[dimension])
+        for day, bucket, value in queryset.annotate(value=Count('id')).order_by():
+            rows.append(Counter(
+                name='orders', dimension=f'day_{dimension}', bucket=f'{day}{WINDOW_SEPARATOR}{bucket}', value=value
+            ))
+    name, dimension, bucket = VERSION_KEY
+    with transaction.atomic():
+        # Versiya nolga qaytarilmaydi, aks holda eski ETag'lar yana mos kelib qolishi mumkin
+        old_version = Counter.objects.filter(name=name, dimension=dimension, bucket=bucket).values_list(
+            'value', flat=True
+        ).first() or 0
+        Counter.objects.all().delete()
+        Counter.objects.bulk_create(rows + [Counter(name=name, value=old_version + 1)])
+    return len(rows)
@@ -1,3 +1,864 @@
-from django.test import TestCase
+import asyncio
+import csv
+import gzip
+import io
+import json
+import logging
+import os
+import sqlite3
+import tempfile
+import warnings
+from collections import Counter
+from datetime import datetime, timedelta, timezone as dt_timezone
+from io import StringIO
+from unittest.mock import AsyncMock, patch
 
-# Create your tests here.
+from aiogram import Bot, Dispatcher
+from aiogram.exceptions import TelegramForbiddenError, TelegramRetryAfter
+from aiogram.fsm.storage.base import StorageKey
+from aiogram.fsm.storage.memory import MemoryStorage
+from aiogram.types import Update
+from django.contrib.auth.models import User as AuthUser
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.core.management import call_command
+from django.db import connection
+from django.db.models import Count
+from django.test import SimpleTestCase, TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import reverse
+
+from bot import queries
+from bot.broadcast import BroadcastEngine
+from bot.commands import ADMIN_COMMANDS, CommandScopeManager
+from bot.keyboards import inline
+from bot.handler.users.private_user import block_text, choose_day, enter_comment, find_orders
+from bot.loadtest import FORM_FLOW, LoadTest
+from bot.logs import build_sinks, setup_logging
+from bot.supervisor import shard_of, update_chat_id
+from bot.middlewares.dedup import UpdateDedupMiddleware
+from bot.middlewares.fsm import FSMBufferMiddleware
+from bot.middlewares.throttling import ThrottlingMiddleware
+from bot.outbox import Outbox, _Message
+from bot.states.user_state import Form
+from bot.storage import ChatLockIsolation, SQLiteStorage
+from bot.webhook import run_webhook
+from set_main import search, stats
+from set_main.cache import BotSettingsCache, settings_cache
+from set_main.backup import (
+    BackupSet, copy_database, integrity_check, register_web_process, remove_quietly, web_pids_dir,
+)
+from set_main.models import BotSettings, Broadcast, Car, ChatCommandScope, Order, OutboundMessage, Route, StatCounter, User
+from set_main.shared import SharedState
+
+
+class CountingStorage(MemoryStorage):
+    def __init__(self):
+        super().__init__()
+        self.calls = Counter()
+
+    async def set_state(self, key, state=None):
+        self.calls['set_state'] += 1
+        await super().set_state(key, state)
+
+    async def get_state(self, key):
+        self.calls['get_state'] += 1
+        return await super().get_state(key)
+
+    async def set_data(self, key, data):
+        self.calls['set_data'] += 1
+        await super().set_data(key, data)
+
+    async def get_data(self, key):
+        self.calls['get_data'] += 1
+        return await super().get_data(key)
+
+
+class RecordCountingStorage(CountingStorage):
+    async def set_record(self, key, state, data):
+        self.calls['set_record'] += 1
+        await MemoryStorage.set_state(self, key, state)
+        await MemoryStorage.set_data(self, key, data)
+
+
+class WebhookSecretTests(SimpleTestCase):
+    def test_only_telegram_secret_token_characters_are_accepted(self):
+        field = BotSettings._meta.get_field('webhook_secret')
+        field.run_validators('Abc_123-xyz')
+        for value in ('bad secret', 'maxfiy!', 'a' * 257):
+            with self.assertRaises(ValidationError):
+                field.run_validators(value)
+
+
+class WebhookMetricsTests(SimpleTestCase):
+    async def test_metrics_are_not_served_on_the_public_webhook_app(self):
+        sites = []
+
+        def site(runner, **kwargs):
+            sites.append(runner)
+            return AsyncMock()
+
+        settings = BotSettings(bot_token='123:abc', webhook_path='/webhook', webapp_host='0.0.0.0', webapp_port=8080)
+        with patch('bot.webhook.web.TCPSite', site):
+            task = asyncio.create_task(run_webhook(Dispatcher(), Bot('123:abc'), settings))
+            while not sites:
+                await asyncio.sleep(0)
+            paths = {resource.canonical for resource in sites[0].app.router.resources()}
+            task.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await task
+        self.assertIn('/webhook', paths)
+        self.assertNotIn('/metrics', paths)
+
+
+class QueueLoggingTests(SimpleTestCase):
+    def test_message_is_formatted_before_it_is_queued(self):
+        root = logging.getLogger()
+        handlers, level = root.handlers, root.level
+        sinks = lambda *args, **kwargs: build_sinks(*args, console=False, **kwargs)
+        with tempfile.TemporaryDirectory() as tmp, patch('bot.logs.build_sinks', sinks):
+            listener = setup_logging(os.path.join(tmp, 'bot.log'))
+            try:
+                state = ['eski']
+                record = logging.LogRecord('bot', logging.WARNING, __file__, 1, 'Holat: %s', (state,), None)
+                prepared = root.handlers[0].prepare(record)
+                state[0] = 'yangi'
+            finally:
+                listener.stop()
+                root.handlers = handlers
+                root.setLevel(level)
+        self.assertEqual(prepared.getMessage(), "Holat: ['eski']")
+        self.assertIsNone(prepared.args)
+
+
+class FSMBufferMiddlewareTests(SimpleTestCase):
+    key = StorageKey(bot_id=1, chat_id=10, user_id=10)
+
+    async def run_step(self, storage, handler, event, raw_state):
+        data = {'state': AsyncMock(storage=storage, key=self.key), 'raw_state': raw_state}
+
+        async def call_handler(event, data):
+            return await handler(event, data['state'])
+
+        await FSMBufferMiddleware()(call_handler, event, data)
+
+    async def test_choose_day_reads_once_and_writes_once(self):
+        storage = RecordCountingStorage()
+        await MemoryStorage.set_state(storage, self.key, Form.day)
+        await MemoryStorage.set_data(storage, self.key, {'year': 2026, 'month': 11})
+
+        callback = AsyncMock(data='day_05')
+        await self.run_step(storage, choose_day, callback, Form.day.state)
+
+        self.assertEqual(storage.calls, Counter(get_data=1, set_record=1))
+        self.assertEqual(await MemoryStorage.get_state(storage, self.key), Form.phone.state)
+        self.assertEqual(
+            await MemoryStorage.get_data(storage, self.key),
+            {'year': 2026, 'month': 11, 'day': 5, 'date': '2026-11-05'},
+        )
+
+    async def test_enter_comment_without_set_record(self):
+        storage = CountingStorage()
+        form = {
+            'direction': 'A', 'date': '2026-11-05', 'phone': '998901234567',
+            'trip_type': 'person', 'car': 'Cobalt', 'address': 'X',
+        }
+        await MemoryStorage.set_data(storage, self.key, form)
+
+        message = AsyncMock(text=' salom ')
+        await self.run_step(storage, enter_comment, message, Form.comment.state)
+
+        self.assertEqual(storage.calls, Counter(get_data=1, set_state=1, set_data=1))
+        self.assertEqual((await MemoryStorage.get_data(storage, self.key))['comment'], 'salom')
+
+    async def test_unchanged_state_is_not_written(self):
+        storage = CountingStorage()
+
+        async def read_only(event, state):
+            await state.get_state()
+            await state.get_data()
+
+        await self.run_step(storage, read_only, AsyncMock(), None)
+
+        self.assertEqual(storage.calls, Counter(get_data=1))
+
+    async def test_failed_handler_changes_are_discarded(self):
+        storage = CountingStorage()
+        await MemoryStorage.set_state(storage, self.key, Form.phone)
+
+        async def failing(event, state):
+            await state.set_state(Form.trip_type)
+            await state.update_data(phone='998901234567')
+            raise RuntimeError('handler xatosi')
+
+        with self.assertRaises(RuntimeError), self.assertLogs(level='WARNING'):
+            await self.run_step(storage, failing, AsyncMock(), Form.phone.state)
+
+        self.assertEqual(storage.calls, Counter(get_data=1))
+        self.assertEqual(await MemoryStorage.get_state(storage, self.key), Form.phone.state)
+        self.assertEqual(await MemoryStorage.get_data(storage, self.key), {})
+
+
+class OrderAdminChangelistTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = AuthUser.objects.create_superuser('admin', 'admin@example.com', 'password')
+
+    def create_orders(self, count):
+        for i in range(count):
+            user = User.objects.create(user_id=1000 + Order.objects.count(), full_name=f'User {i}')
+            Order.objects.create(
+                user=user, direction='A', date='2026-11-05', phone='998901234567',
+                trip_type='person', car='Cobalt', address='X',
+            )
+
+    def changelist_queries(self, query=''):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(reverse('admin:set_main_order_changelist') + query)
+        self.assertEqual(response.status_code, 200)
+        return [q['sql'] for q in ctx.captured_queries]
+
+    def test_query_count_does_not_depend_on_page_size(self):
+        self.client.force_login(self.admin)
+        self.create_orders(10)
+        small = len(self.changelist_queries())
+        self.create_orders(90)
+        queries = self.changelist_queries()
+        self.assertEqual(len(queries), small)
+        # Filtrsiz ro'yxatda jami son hisoblagichdan olinadi
+        self.assertFalse([sql for sql in queries if 'COUNT(*)' in sql and '"set_main_order"' in sql])
+        self.assertEqual(len(self.changelist_queries('?trip_type__exact=person')), small)
+
+
+class OrderSearchTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(user_id=501, full_name='Aziz Karimov')
+
+    def create_order(self, **fields):
+        values = {
+            'user': self.user, 'direction': 'Toshkent - Samarqand', 'date': '2026-11-05',
+            'phone': '998901234567', 'trip_type': 'person', 'car': 'Cobalt', 'address': 'Yunusobod 4',
+        }
+        values.update(fields)
+        return Order.objects.create(**values)
+
+    def test_triggers_keep_the_index_in_sync(self):
+        order = self.create_order()
+        # Trigram: so'z va telefon o'rtasidan ham topiladi
+        self.assertEqual(search.search_order_ids('nusob 90123'), [order.id])
+
+        order.address = 'Chilonzor 9'
+        order.save()
+        self.assertEqual(search.search_order_ids('nusob'), [])
+        self.assertEqual(search.search_order_ids('chilon'), [order.id])
+
+        self.user.full_name = 'Bobur Aliyev'
+        self.user.save()
+        self.assertEqual(search.search_order_ids('karim'), [])
+        self.assertEqual(search.search_order_ids('bobur'), [order.id])
+
+        order.delete()
+        self.assertEqual(search.search_order_ids('chilon'), [])
+
+    def test_ranking_rebuild_admin_and_find_command(self):
+        weak = self.create_order(address='Sergeli, Qo\'yliq bozori yonidagi uzun ko\'cha', comment='Sergeli')
+        strong = self.create_order(address='Sergeli Sergeli Sergeli')
+        self.assertEqual(search.search_order_ids('sergeli'), [strong.id, weak.id])
+        self.assertEqual(search.search_order_ids('ab'), [])
+
+        search.rebuild_index()
+        self.assertEqual(search.search_order_ids('sergeli'), [strong.id, weak.id])
+
+        admin = AuthUser.objects.create_superuser('admin', 'admin@example.com', 'password')
+        self.client.force_login(admin)
+        response = self.client.get(reverse('admin:set_main_order_changelist') + '?q=liq+bozor')
+        self.assertEqual([order.id for order in response.context['cl'].result_list], [weak.id])
+
+        message = AsyncMock(from_user=AsyncMock(id=501))
+        found = queries._find_orders('sergeli', 10)
+        with patch('bot.handler.users.private_user.settings_cache.get_admin_id', AsyncMock(return_value=501)), \
+                patch('bot.handler.users.private_user.queries.find_orders', AsyncMock(return_value=found)):
+            asyncio.run(find_orders(message, AsyncMock(args='sergeli')))
+        text = message.answer.await_args.args[0]
+        self.assertLess(text.index(f'#{strong.id}'), text.index(f'#{weak.id}'))
+
+    def test_admin_search_is_ordered_by_rank(self):
+        # Eskiroq, lekin mosroq buyurtma yangisidan oldin chiqadi
+        strong = self.create_order(address='Sergeli Sergeli Sergeli')
+        weak = self.create_order(address='Sergeli, Qo\'yliq bozori yonidagi uzun ko\'cha')
+        admin = AuthUser.objects.create_superuser('admin', 'admin@example.com', 'password')
+        self.client.force_login(admin)
+        url = reverse('admin:set_main_order_changelist')
+        response = self.client.get(url + '?q=sergeli')
+        self.assertEqual([order.id for order in response.context['cl'].result_list], [strong.id, weak.id])
+        # Ustun bo'yicha tanlangan tartib (id, o'sish) moslikdan ustun
+        response = self.client.get(url + '?q=sergeli&o=1')
+        self.assertEqual([order.id for order in response.context['cl'].result_list], [strong.id, weak.id])
+        response = self.client.get(url + '?q=sergeli&o=-1')
+        self.assertEqual([order.id for order in response.context['cl'].result_list], [weak.id, strong.id])
+
+    def test_find_reply_is_split_within_telegram_limit(self):
+        orders = [
+            Order(id=i, user=self.user, direction='Toshkent - Samarqand', date='2026-11-05',
+                  phone='998901234567', address='<Sergeli> ' * 500)
+            for i in range(1, 41)
+        ]
+        message = AsyncMock(from_user=AsyncMock(id=501))
+        with patch('bot.handler.users.private_user.settings_cache.get_admin_id', AsyncMock(return_value=501)), \
+                patch('bot.handler.users.private_user.queries.find_orders', AsyncMock(return_value=orders)):
+            asyncio.run(find_orders(message, AsyncMock(args='sergeli')))
+        texts = [call.args[0] for call in message.answer.await_args_list]
+        self.assertGreater(len(texts), 1)
+        self.assertTrue(all(len(text) <= 4096 for text in texts))
+        self.assertEqual(sum(text.count('\n#') + text.startswith('#') for text in texts), len(orders))
+
+
+class LoadTestTests(TransactionTestCase):
+    async def test_users_complete_form_flow(self):
+        await Route.objects.acreate(name='Toshkent - Samarqand')
+        await Car.objects.acreate(name='Cobalt')
+        result = await LoadTest(3, MemoryStorage(), timeout=10).run()
+        self.assertEqual(result.errors, [])
+        self.assertEqual(result.completed, 3)
+        self.assertEqual([row[1] for row in result.summary()], [3] * len(FORM_FLOW))
+        self.assertEqual(await Order.objects.filter(direction='Toshkent - Samarqand', car='Cobalt').acount(), 3)
+
+
+class SupervisorRoutingTests(SimpleTestCase):
+    def test_message_and_callback_of_a_chat_go_to_the_same_worker(self):
+        message = {'update_id': 1, 'message': {'chat': {'id': 42}, 'from': {'id': 7}}}
+        callback = {'update_id': 2, 'callback_query': {'from': {'id': 7}, 'message': {'chat': {'id': 42}}}}
+        self.assertEqual(update_chat_id(message), 42)
+        self.assertEqual(update_chat_id(callback), 42)
+        self.assertEqual(update_chat_id({'update_id': 3, 'inline_query': {'from': {'id': 7}}}), 7)
+        self.assertEqual({shard_of(chat_id, 4) for chat_id in range(1000)}, {0, 1, 2, 3})
+
+    def test_shared_bucket_limits_all_processes_together(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'shared.sqlite3')
+            first, second = SharedState(path), SharedState(path)
+            self.assertEqual([first.take('outbox', 1, 2), second.take('outbox', 1, 2)], [0, 0])
+            self.assertGreater(first.take('outbox', 1, 2), 0)
+            second.pause('outbox', 60)
+            self.assertGreater(first.take('outbox', 1000, 1000), 59)
+
+
+class DuplicateUpdateTests(SimpleTestCase):
+    async def test_chat_updates_run_one_at_a_time_and_lock_table_is_bounded(self):
+        isolation = ChatLockIsolation(max_size=2)
+        key = StorageKey(bot_id=1, chat_id=10, user_id=10)
+        running = []
+
+        async def handle():
+            async with isolation.lock(key):
+                running.append(1)
+                self.assertEqual(len(running), 1)
+                await asyncio.sleep(0.01)
+                running.pop()
+
+        await asyncio.gather(handle(), handle(), handle())
+        for chat_id in range(20, 30):
+            async with isolation.lock(StorageKey(bot_id=1, chat_id=chat_id, user_id=chat_id)):
+                pass
+        self.assertEqual(len(isolation._locks), 2)
+
+    async def test_redelivered_update_is_dropped_after_restart(self):
+        update = Update.model_validate({'update_id': 5, 'callback_query': {
+            'id': 'cb1', 'chat_instance': '1', 'data': 'confirm', 'from': {'id': 7, 'is_bot': False, 'first_name': 'A'},
+        }})
+        calls = []
+
+        async def handler(event, data):
+            calls.append(event.update_id)
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'fsm.sqlite3')
+            storage = SQLiteStorage(path)
+            middleware = UpdateDedupMiddleware(storage)
+            await middleware(handler, update, {})
+            await middleware(handler, update, {})
+            await storage.close()
+
+            storage = SQLiteStorage(path)
+            await UpdateDedupMiddleware(storage)(handler, update, {})
+            await storage.close()
+        self.assertEqual(calls, [5])
+
+
+class OutboxOrderTests(SimpleTestCase):
+    @patch('bot.outbox.db_write', AsyncMock())
+    async def test_chat_messages_keep_their_order_across_retries(self):
+        sent = []
+        failures = {'1': TelegramRetryAfter(method=None, message='Too Many Requests', retry_after=0),
+                    '12': RuntimeError('kutilmagan xatolik')}
+
+        async def send_message(chat_id, text, **kwargs):
+            if text in failures:
+                raise failures.pop(text)
+            await asyncio.sleep(0)
+            sent.append((chat_id, text))
+
+        outbox = Outbox(global_rate=1000, chat_rate=1000, chat_burst=1000, workers=4, max_attempts=3)
+        await outbox.start(AsyncMock(send_message=send_message), load_pending=False)
+        for i in range(1, 5):
+            outbox._enqueue(_Message(i, 10, str(i), ''))
+            outbox._enqueue(_Message(10 + i, 20, str(10 + i), ''))
+        while outbox.metrics()['queue_depth']:
+            await asyncio.sleep(0.01)
+        await outbox.stop()
+        self.assertEqual([text for chat_id, text in sent if chat_id == 10], ['1', '2', '3', '4'])
+        self.assertEqual([text for chat_id, text in sent if chat_id == 20], ['11', '12', '13', '14'])
+        self.assertEqual(outbox.retried, 1)
+
+
+class ThrottlingTests(SimpleTestCase):
+    def test_buckets_refill_per_group_and_idle_users_are_swept(self):
+        throttling = ThrottlingMiddleware({'block': (0.5, 2), 'callback': (0, 1)})
+        self.assertEqual([throttling.take(7, 'block', 0) for _ in range(3)], [True, True, False])
+        self.assertTrue(all(throttling.take(7, 'callback', 0) for _ in range(10)))
+        self.assertTrue(throttling.take(8, 'block', 0))
+        self.assertTrue(throttling.take(7, 'block', 2))
+        self.assertFalse(throttling.take(7, 'block', 2))
+        throttling.sweep(4)
+        self.assertEqual(list(throttling._buckets), [7])
+        throttling.sweep(10)
+        self.assertEqual(throttling._buckets, {})
+
+    @patch('bot.middlewares.throttling.settings_cache.get_admin_id', AsyncMock(return_value=1))
+    async def test_flooding_user_is_dropped_before_the_handler(self):
+        throttling = ThrottlingMiddleware({'block': (0.1, 2), 'text': (1, 5), 'callback': (2, 10)})
+        handler = AsyncMock()
+        for user_id in (7, 1):
+            user = AsyncMock(id=user_id)
+            for _ in range(5):
+                await throttling(handler, object(), {'event_from_user': user, 'handler': AsyncMock(callback=block_text)})
+        # 7 - ikkitasi o'tadi, admin (1) cheklanmaydi
+        self.assertEqual(handler.await_count, 7)
+
+
+class IdempotentOrderTests(TestCase):
+    def test_confirming_the_same_form_twice_creates_one_order(self):
+        data = {
+            'form_id': 'f' * 32, 'direction': 'A', 'date': '2026-11-05', 'phone': '998901234567',
+            'trip_type': 'person', 'car': 'Cobalt', 'address': 'X', 'comment': '',
+        }
+        notify = lambda user, order: [(user.user_id, f'#{order.id}', ''), (1, 'admin', 'HTML')]
+        _, first, messages = queries._create_order(77, 'User', data, notify)
+        _, second, messages_again = queries._create_order(77, 'User', data, notify)
+        self.assertEqual(messages_again, None)
+        self.assertEqual(first.pk, second.pk)
+        self.assertEqual(Order.objects.count(), 1)
+        # Bildirishnomalar buyurtma bilan birga yozilgan, takroriy tasdiqlashda qo'shilmaydi
+        self.assertEqual(
+            list(OutboundMessage.objects.order_by('id').values_list('id', 'chat_id', 'text')),
+            [(message.id, message.chat_id, message.text) for message in messages],
+        )
+        self.assertEqual([message.text for message in messages], [f'#{first.pk}', 'admin'])
+
+
+def make_database(path, rows, migrations=(('set_main', '0001_initial'),)):
+    """Zaxira testlari uchun kichik loyiha bazasi (WAL rejimida)"""
+    db = sqlite3.connect(path)
+    db.execute('PRAGMA journal_mode=WAL')
+    db.execute('CREATE TABLE IF NOT EXISTS django_migrations (app TEXT, name TEXT)')
+    db.execute('CREATE TABLE IF NOT EXISTS items (id INTEGER PRIMARY KEY, body TEXT)')
+    db.execute('DELETE FROM django_migrations')
+    db.executemany('INSERT INTO django_migrations VALUES (?, ?)', migrations)
+    db.executemany('INSERT OR REPLACE INTO items VALUES (?, ?)', rows)
+    db.commit()
+    return db
+
+
+def read_items(path):
+    db = sqlite3.connect(path)
+    try:
+        return db.execute('SELECT id, body FROM items ORDER BY id').fetchall()
+    finally:
+        db.close()
+
+
+class BackupTests(SimpleTestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+
+    def path(self, name):
+        return os.path.join(self.directory.name, name)
+
+    def test_copy_includes_uncheckpointed_wal_pages(self):
+        rows = [(i, f'qator {i}' * 50) for i in range(500)]
+        db = make_database(self.path('db.sqlite3'), rows)
+        # Ulanish ochiq: yozuvlar hali faqat -wal faylida
+        result = copy_database(self.path('db.sqlite3'), self.path('copy.sqlite3'), step_pages=7)
+        db.close()
+        self.assertEqual(read_items(self.path('copy.sqlite3')), rows)
+        self.assertEqual(integrity_check(self.path('copy.sqlite3')), [])
+        self.assertFalse(os.path.exists(self.path('copy.sqlite3-wal')))
+        self.assertEqual(result.size, os.path.getsize(self.path('copy.sqlite3')))
+
+    def snapshot(self, rows, name):
+        db = make_database(self.path('db.sqlite3'), rows)
+        db.close()
+        result = copy_database(self.path('db.sqlite3'), self.path(name))
+        return result.page_size
+
+    def test_increment_chain_restores_identical_bytes(self):
+        backups = BackupSet(self.path('backups'))
+        started = datetime(2026, 10, 1, 9, 0, tzinfo=dt_timezone.utc)
+        page_size = self.snapshot([(i, 'a' * 200) for i in range(300)], 'first.sqlite3')
+        full = backups.add(self.path('first.sqlite3'), started, page_size, compression='gzip')
+        self.snapshot([(5, 'b' * 200), (1000, 'yangi')], 'second.sqlite3')
+        increment = backups.add(self.path('second.sqlite3'), started + timedelta(hours=1), page_size)
+
+        self.assertEqual((full['type'], increment['type'], increment['parent']), ('full', 'incremental', full['name']))
+        self.assertLess(increment['changed'], increment['pages'])
+        # Manifest qayta o'qilganda ham zanjir saqlanadi
+        backups = BackupSet(self.path('backups'))
+        self.assertEqual(backups.restore(backups.get(increment['name']), self.path('restored.sqlite3')),
+                         [full, increment])
+        with open(self.path('restored.sqlite3'), 'rb') as a, open(self.path('second.sqlite3'), 'rb') as b:
+            self.assertEqual(a.read(), b.read())
+        self.assertEqual(read_items(self.path('restored.sqlite3'))[5], (5, 'b' * 200))
+        backups.restore(backups.get(full['name']), self.path('restored.sqlite3'))
+        self.assertEqual(read_items(self.path('restored.sqlite3')), read_items(self.path('first.sqlite3')))
+
+    def test_chain_length_retention_and_point_in_time(self):
+        backups = BackupSet(self.path('backups'))
+        started = datetime(2026, 10, 1, 9, 0, tzinfo=dt_timezone.utc)
+        page_size = self.snapshot([(1, 'a')], 'snap.sqlite3')
+        # Har 2 soatda, 3 kun davomida; zanjir ko'pi bilan 3 zaxira
+        moments = [started + timedelta(hours=2 * i) for i in range(36)]
+        for i, moment in enumerate(moments):
+            self.snapshot([(1, str(i))], 'snap.sqlite3')
+            backups.add(self.path('snap.sqlite3'), moment, page_size, max_chain=3)
+        self.assertEqual([e['type'] for e in backups.entries[:4]], ['full', 'incremental', 'incremental', 'full'])
+        self.assertTrue(all(len(backups.chain(entry)) <= 3 for entry in backups.entries))
+
+        self.assertIsNone(backups.at(started - timedelta(minutes=1)))
+        self.assertEqual(backups.at(moments[10] + timedelta(minutes=59))['created_at'], moments[10].isoformat())
+
+        removed = backups.prune(keep_hourly=2, keep_daily=2, tz=dt_timezone.utc)
+        kept = {entry['name'] for entry in backups.entries}
+        self.assertTrue(removed)
+        # Oxirgi ikki soat, oxirgi ikki kunning oxirgi zaxirasi va ular bog'liq zanjirlar qoladi
+        for moment in (moments[-1], moments[-2], moments[31]):
+            entry = backups.at(moment)
+            self.assertEqual(entry['created_at'], moment.isoformat())
+            self.assertTrue({e['name'] for e in backups.chain(entry)} <= kept)
+        files = set(os.listdir(self.path('backups')))
+        self.assertEqual({e['file'] for e in removed} & files, set())
+        self.assertTrue({e['file'] for e in backups.entries} <= files)
+        self.assertEqual(BackupSet(self.path('backups')).entries, backups.entries)
+        backups.restore(backups.entries[-1], self.path('restored.sqlite3'))
+        self.assertEqual(read_items(self.path('restored.sqlite3')), [(1, '35')])
+
+    def restore(self, *args):
+        out = StringIO()
+        db_path = self.path('live.sqlite3')
+        databases = {'default': {'ENGINE': 'django.db.backends.sqlite3', 'NAME': db_path}}
+        # restore_db faqat settings.DATABASES dagi yo'lni o'qiydi; ulanishlar o'zgarmaydi
+        with warnings.catch_warnings(), override_settings(DATABASES=databases, BACKUP_DIR=self.path('backups')):
+            warnings.simplefilter('ignore')
+            call_command('restore_db', *args, '--no-keep-current', stdout=out)
+        return out.getvalue()
+
+    def test_restore_db_rejects_bad_files_and_running_web(self):
+        make_database(self.path('live.sqlite3'), [(1, 'joriy')]).close()
+        make_database(self.path('good.sqlite3'), [(1, 'zaxira')]).close()
+        make_database(self.path('future.sqlite3'), [(1, 'x')], [('set_main', '9999_future')]).close()
+        sqlite3.connect(self.path('foreign.sqlite3')).execute('CREATE TABLE t (x)').connection.close()
+        with open(self.path('good.sqlite3'), 'rb') as f:
+            corrupt = bytearray(f.read())
+        corrupt[len(corrupt) // 2:] = b'\xff' * (len(corrupt) - len(corrupt) // 2)
+        with open(self.path('corrupt.sqlite3'), 'wb') as f:
+            f.write(corrupt)
+
+        for name in ('corrupt.sqlite3', 'future.sqlite3', 'foreign.sqlite3'):
+            output = self.restore(self.path(name))
+            self.assertIn('xatolik' if name == 'corrupt.sqlite3' else 'tekshiruvdan o\'tmadi', output.lower())
+            self.assertEqual(read_items(self.path('live.sqlite3')), [(1, 'joriy')])
+
+        register_web_process(self.path('live.sqlite3'))
+        self.addCleanup(remove_quietly, os.path.join(web_pids_dir(self.path('live.sqlite3')), str(os.getpid())))
+        self.assertIn('Web jarayoni ishlayapti', self.restore(self.path('good.sqlite3')))
+        self.assertEqual(read_items(self.path('live.sqlite3')), [(1, 'joriy')])
+
+        remove_quietly(os.path.join(web_pids_dir(self.path('live.sqlite3')), str(os.getpid())))
+        self.assertIn('muvaffaqiyatli tiklandi', self.restore(self.path('good.sqlite3')))
+        self.assertEqual(read_items(self.path('live.sqlite3')), [(1, 'zaxira')])
+        self.assertFalse(os.path.exists(self.path('live.sqlite3.restore-lock')))
+
+    def test_restore_db_point_in_time(self):
+        make_database(self.path('live.sqlite3'), [(1, 'joriy')]).close()
+        backups = BackupSet(self.path('backups'))
+        started = datetime(2026, 10, 1, 9, 0, tzinfo=dt_timezone.utc)
+        for hour in range(3):
+            page_size = self.snapshot([(1, f'soat {hour}')], 'snap.sqlite3')
+            backups.add(self.path('snap.sqlite3'), started + timedelta(hours=hour), page_size)
+        self.restore('--point-in-time', '2026-10-01T10:30:00+00:00')
+        self.assertEqual(read_items(self.path('live.sqlite3')), [(1, 'soat 1')])
+        self.assertIn('topilmadi', self.restore('--point-in-time', '2026-10-01T08:00:00+00:00'))
+        self.assertEqual(read_items(self.path('live.sqlite3')), [(1, 'soat 1')])
+
+
+class StatCounterTests(TestCase):
+    def counters(self):
+        return {
+            (c.name, c.dimension, c.bucket): c.value
+            for c in StatCounter.objects.exclude(name='version') if c.value
+        }
+
+    def test_signals_keep_counters_equal_to_a_full_recount(self):
+        users = [User.objects.create(user_id=600 + i, full_name=f'U{i}') for i in range(3)]
+        Car.objects.create(name='Cobalt')
+        Route.objects.create(name='A - B')
+        orders = [
+            Order.objects.create(
+                user=users[i % 3], direction='A - B' if i % 2 else 'C - D', date='2026-11-05',
+                phone='998901234567', trip_type='person' if i < 3 else 'mail', car='Cobalt', address='X',
+            )
+            for i in range(5)
+        ]
+        orders[0].direction = 'A - B'
+        orders[0].save()
+        orders[1].delete()
+        users[2].delete()
+
+        totals = stats.totals()
+        self.assertEqual(totals, {
+            'orders': Order.objects.count(), 'users': User.objects.count(),
+            'cars': Car.objects.count(), 'routes': Route.objects.count(),
+        })
+        self.assertEqual(stats.breakdown('route'), {
+            row['direction']: row['n'] for row in Order.objects.values('direction').annotate(n=Count('id'))
+        })
+        version, _ = stats.version()
+        maintained = self.counters()
+        stats.rebuild_counters()
+        self.assertEqual(self.counters(), maintained)
+        # Qayta hisoblash versiyani orqaga qaytarmaydi
+        self.assertGreater(stats.version()[0], version)
+
+
+class StatsApiTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        user = User.objects.create(user_id=700, full_name='U')
+        for day, direction in ((1, 'A - B'), (2, 'A - B'), (3, 'C - D')):
+            with patch('django.utils.timezone.now', return_value=datetime(2026, 10, day, 12, tzinfo=dt_timezone.utc)):
+                Order.objects.create(
+                    user=user, direction=direction, date='2026-11-05', phone='998901234567',
+                    trip_type='person', car='Cobalt', address='X',
+                )
+
+    def setUp(self):
+        cache.clear()
+
+    def get(self, params='', **headers):
+        return self.client.get(reverse('set_main:api_stats') + params, headers=headers)
+
+    def test_conditional_get_and_version_change(self):
+        response = self.get()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['orders'], 3)
+        etag, last_modified = response['ETag'], response['Last-Modified']
+        self.assertEqual(self.get(**{'If-None-Match': etag}).status_code, 304)
+        self.assertEqual(self.get(**{'If-Modified-Since': last_modified}).status_code, 304)
+        # Parametrlar ETag'ga kiradi
+        self.assertEqual(self.get('?group=route', **{'If-None-Match': etag}).status_code, 200)
+
+        Order.objects.create(
+            user=User.objects.get(user_id=700), direction='A - B', date='2026-11-05', phone='998901234567',
+            trip_type='person', car='Cobalt', address='X',
+        )
+        response = self.get(**{'If-None-Match': etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['orders'], 4)
+
+    def test_group_and_date_window(self):
+        self.assertEqual(self.get('?group=route').json()['breakdown'], {'A - B': 2, 'C - D': 1})
+        data = self.get('?group=route&from=2026-10-02&to=2026-10-03').json()
+        self.assertEqual((data['from'], data['to'], data['breakdown']), ('2026-10-02', '2026-10-03', {'A - B': 1, 'C - D': 1}))
+        data = self.get('?from=2026-10-01&to=2026-10-02').json()
+        self.assertEqual((data['group'], data['breakdown']), ('day', {'2026-10-01': 1, '2026-10-02': 1}))
+        with self.assertLogs('django.request', 'WARNING'):
+            self.assertEqual(self.get('?group=phone').status_code, 400)
+            self.assertEqual(self.get('?from=01.10.2026').status_code, 400)
+
+
+class ExportOrdersTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.staff = AuthUser.objects.create_user('staff', password='password', is_staff=True)
+        cls.customer = AuthUser.objects.create_user('customer', password='password')
+        user = User.objects.create(user_id=800, full_name='Ali "Vali", Karimov')
+        cls.orders = []
+        for day, direction in ((1, 'A - B'), (2, 'A - B'), (2, 'C - D'), (3, 'A - B')):
+            with patch('django.utils.timezone.now', return_value=datetime(2026, 10, day, 12, tzinfo=dt_timezone.utc)):
+                cls.orders.append(Order.objects.create(
+                    user=user, direction=direction, date='2026-11-05', phone='998901234567',
+                    trip_type='person', car='Cobalt', address='Yunusobod,\n4-uy', comment=None,
+                ))
+
+    def export(self, params):
+        response = self.client.get(reverse('set_main:export_orders') + params)
+        return response, b''.join(response.streaming_content) if response.streaming else response.content
+
+    def test_staff_gets_filtered_csv_and_jsonl_rows(self):
+        self.client.force_login(self.staff)
+        response, body = self.export('?route=A+-+B&from=2026-10-02&to=2026-10-03')
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        rows = list(csv.DictReader(io.StringIO(body.decode())))
+        self.assertEqual([int(row['id']) for row in rows], [self.orders[1].id, self.orders[3].id])
+        self.assertEqual((rows[0]['full_name'], rows[0]['address'], rows[0]['comment']),
+                         ('Ali "Vali", Karimov', 'Yunusobod,\n4-uy', ''))
+
+        response, body = self.export('?format=jsonl&gzip=1')
+        self.assertEqual(response['Content-Disposition'], 'attachment; filename="orders.jsonl.gz"')
+        rows = [json.loads(line) for line in gzip.decompress(body).decode().splitlines()]
+        self.assertEqual([row['id'] for row in rows], [order.id for order in self.orders])
+        self.assertEqual(rows[0]['user_id'], 800)
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'orders.jsonl')
+            call_command('export_orders', '--format', 'jsonl', '--chunk-size', '3', '-o', path, stdout=StringIO())
+            with open(path) as f:
+                self.assertEqual([json.loads(line) for line in f], rows)
+
+    def test_non_staff_is_forbidden(self):
+        with self.assertLogs('django.request', 'WARNING'):
+            self.assertEqual(self.export('')[0].status_code, 403)
+            self.client.force_login(self.customer)
+            self.assertEqual(self.export('?format=jsonl')[0].status_code, 403)
+
+
+class BroadcastResumeTests(TransactionTestCase):
+    async def test_resume_after_stop_neither_resends_nor_skips(self):
+        users = [await User.objects.acreate(user_id=900 + i, full_name=f'U{i}') for i in range(10)]
+        delivered = []
+        stall_at = {904}
+        stalled = asyncio.Event()
+
+        async def copy_message(chat_id, from_chat_id, message_id):
+            if chat_id == 903:
+                raise TelegramForbiddenError(method=None, message='Forbidden: bot was blocked by the user')
+            if chat_id in stall_at:
+                # Bot shu xabarni yuborayotganda to'xtatiladi
+                stall_at.clear()
+                stalled.set()
+                await asyncio.Event().wait()
+            delivered.append(chat_id)
+
+        bot = AsyncMock(copy_message=copy_message)
+        engine = BroadcastEngine(chunk_size=4, workers=1, checkpoint_size=3)
+        broadcast_id = await engine.start(bot, 'salom', 1, 1, None)
+        await stalled.wait()
+        await engine.stop()
+
+        broadcast = await Broadcast.objects.aget(id=broadcast_id)
+        self.assertEqual((broadcast.last_user_pk, broadcast.sent, broadcast.blocked), (users[3].pk, 3, 1))
+        self.assertTrue((await User.objects.aget(user_id=903)).is_blocked)
+
+        engine = BroadcastEngine(chunk_size=4, workers=1, checkpoint_size=3)
+        await engine.resume(bot)
+        await asyncio.gather(*engine._tasks.values())
+
+        self.assertEqual(delivered, [user.user_id for user in users if user.user_id != 903])
+        broadcast = await Broadcast.objects.aget(id=broadcast_id)
+        self.assertEqual((broadcast.status, broadcast.sent, broadcast.blocked, broadcast.failed), ('done', 9, 1, 0))
+
+
+class BotSettingsCacheTests(TestCase):
+    def test_value_is_reused_until_ttl_expires(self):
+        first, second = BotSettings(admin_id=1), BotSettings(admin_id=2)
+        cache_ = BotSettingsCache(ttl=60, loader=AsyncMock(side_effect=[first, second]))
+        with patch('set_main.cache.time.monotonic', return_value=100):
+            self.assertEqual(asyncio.run(cache_.get_admin_id()), 1)
+            self.assertEqual(asyncio.run(cache_.get_admin_id()), 1)
+        with patch('set_main.cache.time.monotonic', return_value=161):
+            self.assertEqual(asyncio.run(cache_.get_admin_id()), 2)
+        self.assertEqual(cache_.loader.await_count, 2)
+
+    def test_saving_settings_invalidates_the_cache(self):
+        loader = AsyncMock(return_value=BotSettings(admin_id=1))
+        with patch.object(settings_cache, 'loader', loader):
+            settings_cache.invalidate()
+            asyncio.run(settings_cache.get())
+            asyncio.run(settings_cache.get())
+            self.assertEqual(loader.await_count, 1)
+
+            bot_settings = BotSettings.objects.create(bot_token='123:abc', admin_id=2)
+            loader.return_value = bot_settings
+            self.assertEqual(asyncio.run(settings_cache.get_admin_id()), 2)
+            bot_settings.delete()
+            loader.return_value = None
+            self.assertIsNone(asyncio.run(settings_cache.get_admin_id()))
+        self.assertEqual(loader.await_count, 3)
+
+    def test_value_loaded_during_invalidation_is_not_kept(self):
+        cache_ = BotSettingsCache(ttl=60)
+
+        async def load():
+            # Yuklash paytida sozlamalar saqlandi
+            cache_.invalidate()
+            return BotSettings(admin_id=1)
+
+        cache_.loader = AsyncMock(side_effect=load)
+        asyncio.run(cache_.get())
+        asyncio.run(cache_.get())
+        self.assertEqual(cache_.loader.await_count, 2)
+
+
+class CatalogKeyboardTests(TransactionTestCase):
+    def setUp(self):
+        inline._catalog_kb_cache.clear()
+
+    @staticmethod
+    def names(markup):
+        return [button.text for row in markup.inline_keyboard for button in row]
+
+    async def test_catalog_change_rebuilds_keyboards(self):
+        await Route.objects.acreate(name='Toshkent - Samarqand')
+        await Car.objects.acreate(name='Cobalt')
+        self.assertEqual(self.names(await inline.get_direction_kb()), ['Toshkent - Samarqand'])
+        self.assertEqual(self.names(await inline.get_car_kb()), ['Cobalt'])
+
+        # Signalsiz o'zgarish versiyani oshirmaydi: keshdagi klaviatura qaytadi
+        await Route.objects.abulk_create([Route(name='Toshkent - Buxoro')])
+        self.assertEqual(self.names(await inline.get_direction_kb()), ['Toshkent - Samarqand'])
+
+        await Car.objects.acreate(name='Nexia')
+        self.assertEqual(self.names(await inline.get_car_kb()), ['Cobalt', 'Nexia'])
+        self.assertEqual(
+            self.names(await inline.get_direction_kb()), ['Toshkent - Samarqand', 'Toshkent - Buxoro']
+        )
+        await Route.objects.filter(name='Toshkent - Samarqand').adelete()
+        self.assertEqual(self.names(await inline.get_direction_kb()), ['Toshkent - Buxoro'])
+
+
+class CommandScopeTests(TransactionTestCase):
+    async def test_commands_are_set_once_per_chat_and_role(self):
+        bot = AsyncMock()
+        manager = CommandScopeManager()
+        await manager.sync(bot, 1, is_admin=True)
+        await manager.sync(bot, 1, is_admin=True)
+        await manager.sync(bot, 2, is_admin=False)
+        self.assertEqual(bot.set_my_commands.await_count, 1)
+        self.assertEqual(bot.set_my_commands.await_args.args[0], ADMIN_COMMANDS)
+        bot.delete_my_commands.assert_not_awaited()
+
+        # Qayta ishga tushgandan keyin ham jadvaldagi holat ishlatiladi
+        manager = CommandScopeManager()
+        for _ in range(3):
+            manager.schedule(bot, 1, is_admin=True)
+        self.assertEqual(len(manager._tasks), 1)
+        await asyncio.gather(*manager._tasks)
+        self.assertEqual(bot.set_my_commands.await_count, 1)
+
+        await manager.sync_admin(bot, 3)
+        self.assertEqual(bot.delete_my_commands.await_args.kwargs['scope'].chat_id, 1)
+        self.assertEqual(bot.set_my_commands.await_args.kwargs['scope'].chat_id, 3)
+        self.assertEqual(
+            [chat_id async for chat_id in ChatCommandScope.objects.values_list('chat_id', flat=True)], [3]
+        )
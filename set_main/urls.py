@@ -7,4 +7,5 @@ app_name = 'set_main'
 urlpatterns = [
     path('', views.index, name='index'),
     path('api/stats/', views.api_stats, name='api_stats'),
+    path('api/orders/export/', views.export_orders, name='export_orders'),
 ]
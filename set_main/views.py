@@ -1,25 +1,118 @@
+import datetime
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
 from django.shortcuts import render
-from django.http import JsonResponse
-from .models import Order, User, Car, Route
+from django.http import JsonResponse, StreamingHttpResponse
+from django.views.decorators.http import condition, require_safe
+from . import export, stats
 
 # Create your views here.
 
+STATS_GROUPS = ('day', 'route', 'car', 'trip_type')
+
+
 def index(request):
     """Asosiy sahifa"""
+    totals = stats.totals()
     context = {
-        'total_orders': Order.objects.count(),
-        'total_users': User.objects.count(),
-        'total_cars': Car.objects.count(),
-        'total_routes': Route.objects.count(),
+        'total_orders': totals['orders'],
+        'total_users': totals['users'],
+        'total_cars': totals['cars'],
+        'total_routes': totals['routes'],
     }
     return render(request, 'set_main/index.html', context)
 
+
+def _stats_version(request):
+    # ETag va Last-Modified ikkalasi uchun bitta so'rov
+    if not hasattr(request, '_stats_version'):
+        request._stats_version = stats.version()
+    return request._stats_version
+
+
+def _stats_etag(request):
+    version, _ = _stats_version(request)
+    params = request.GET.urlencode()
+    return hashlib.sha256(f"{version}?{params}".encode()).hexdigest()[:32]
+
+
+def _stats_last_modified(request):
+    return _stats_version(request)[1]
+
+
+def _parse_date(value):
+    if value is None:
+        return None
+    return datetime.date.fromisoformat(value)
+
+
+@require_safe
+@condition(etag_func=_stats_etag, last_modified_func=_stats_last_modified)
 def api_stats(request):
-    """API endpoint for statistics"""
-    stats = {
-        'orders': Order.objects.count(),
-        'users': User.objects.count(),
-        'cars': Car.objects.count(),
-        'routes': Route.objects.count(),
-    }
-    return JsonResponse(stats)
+    """API endpoint for statistics
+
+    Ixtiyoriy parametrlar: ``group`` (day, route, car, trip_type) hamda
+    ``from``/``to`` (YYYY-MM-DD). Javob ma'lumotlar versiyasi bo'yicha
+    keshlanadi; o'zgarish bo'lmasa, ETag/Last-Modified orqali 304 qaytadi.
+    """
+    group = request.GET.get('group')
+    try:
+        start = _parse_date(request.GET.get('from'))
+        end = _parse_date(request.GET.get('to'))
+    except ValueError:
+        return JsonResponse({'error': "Sana YYYY-MM-DD formatida bo'lishi kerak"}, status=400)
+    start = start and start.isoformat()
+    end = end and end.isoformat()
+    if group is None and (start or end):
+        group = 'day'
+    if group is not None and group not in STATS_GROUPS:
+        return JsonResponse({'error': f"group quyidagilardan biri bo'lishi kerak: {', '.join(STATS_GROUPS)}"}, status=400)
+
+    version, _ = _stats_version(request)
+    key = f"api_stats:{version}:{group}:{start}:{end}"
+    data = cache.get(key)
+    if data is None:
+        data = stats.totals()
+        if group is not None:
+            data['group'] = group
+            data['from'] = start
+            data['to'] = end
+            data['breakdown'] = stats.breakdown(group, start=start, end=end)
+        cache.set(key, data, settings.STATS_API_CACHE_TTL)
+    return JsonResponse(data)
+
+
+@require_safe
+def export_orders(request):
+    """Buyurtmalarni CSV/JSONL fayl sifatida oqim bilan yuklab berish (faqat xodimlar uchun)
+
+    Parametrlar: ``format`` (csv, jsonl), ``from``/``to`` (YYYY-MM-DD),
+    ``route`` va ``gzip=1``.
+    """
+    # API: login sahifasiga yo'naltirish o'rniga 403
+    if not (request.user.is_active and request.user.is_staff):
+        return JsonResponse({'error': "Faqat admin xodimlari uchun"}, status=403)
+    fmt = request.GET.get('format', 'csv')
+    if fmt not in export.FORMATS:
+        return JsonResponse({'error': f"format quyidagilardan biri bo'lishi kerak: {', '.join(export.FORMATS)}"}, status=400)
+    try:
+        start = _parse_date(request.GET.get('from'))
+        end = _parse_date(request.GET.get('to'))
+    except ValueError:
+        return JsonResponse({'error': "Sana YYYY-MM-DD formatida bo'lishi kerak"}, status=400)
+    compress = request.GET.get('gzip') == '1'
+
+    stream = export.export_orders(
+        fmt,
+        start=start,
+        end=end,
+        route=request.GET.get('route'),
+        compress=compress,
+    )
+    filename = f"orders.{fmt}" + ('.gz' if compress else '')
+    content_type = 'application/gzip' if compress else ('text/csv' if fmt == 'csv' else 'application/x-ndjson')
+    response = StreamingHttpResponse(stream, content_type=content_type)
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response